@@ -0,0 +1,150 @@
+"""Cold start check for the API process.
+
+Starts the app in fresh interpreters (import main + run the startup
+handlers), reports the time from process start to ready, resident memory,
+the slowest imports (from python -X importtime) and any heavy
+dependency that got imported. Exits non-zero when the median cold start
+exceeds the budget, memory exceeds its budget, or a heavy dependency is
+loaded at startup, so it can gate deploys in CI.
+
+Run from the backend directory:
+
+    python -m benchmarks.cold_start                    # budgets from COLD_START_BUDGET / COLD_START_RSS_BUDGET_MB
+    python -m benchmarks.cold_start --budget 2.5 --rss-budget 150 --runs 7
+
+The default budgets (2 s, 120 MB) leave about twice the headroom over a
+measured 0.97 s / 60 MB start, so a heavy import creeping back in fails
+the check rather than only showing in its output.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Any, Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child: bring the app up exactly like uvicorn would, then report
+CHILD_SCRIPT = """
+import json, asyncio
+import main
+from services.startup import heavy_modules_loaded
+
+async def start():
+    async with main.app.router.lifespan_context(main.app):
+        pass
+
+asyncio.run(start())
+report = main.startup_report.report()
+report["heavy_modules_loaded"] = heavy_modules_loaded()
+print("COLD_START " + json.dumps(report))
+"""
+
+def parse_importtime(stderr: str, top: int = 10) -> List[Tuple[str, float]]:
+    """Slowest imports (cumulative seconds) from -X importtime output.
+
+    Top-level imports and their direct children are kept, which puts the
+    packages main.py pulls in next to main itself.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+        except ValueError:
+            continue
+        # Each nesting level adds two spaces of indentation
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth > 1:
+            continue
+        entries.append((name.strip(), int(cumulative) / 1e6))
+    return sorted(entries, key=lambda entry: entry[1], reverse=True)[:top]
+
+def run_once() -> Dict[str, Any]:
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    lines = [line for line in process.stdout.splitlines() if line.startswith("COLD_START ")]
+    if process.returncode != 0 or not lines:
+        raise RuntimeError(f"App failed to start:\n{process.stderr[-2000:]}")
+
+    result = json.loads(lines[-1][len("COLD_START "):])
+    result["slowest_imports"] = parse_importtime(process.stderr)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API cold start against a budget")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes to start; the median is checked")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=float(os.getenv("COLD_START_BUDGET", "2.0")),
+        help="Maximum median seconds from process start to ready"
+    )
+    parser.add_argument(
+        "--rss-budget",
+        type=float,
+        default=float(os.getenv("COLD_START_RSS_BUDGET_MB", "120")),
+        help="Maximum median RSS in MB after startup, 0 to disable"
+    )
+    parser.add_argument("--allow-heavy", action="store_true", help="Don't fail when heavy dependencies load at startup")
+    parser.add_argument("--output", help="Write the full results as JSON to this file")
+    args = parser.parse_args()
+
+    runs = []
+    for index in range(args.runs):
+        try:
+            runs.append(run_once())
+        except RuntimeError as e:
+            print(f"FAIL {e}")
+            return 1
+        print(f"Run {index + 1}: ready {runs[-1]['ready_seconds']}s, import {runs[-1]['import_seconds']}s, RSS {runs[-1]['rss_mb']} MB")
+
+    ready_values = [run["ready_seconds"] for run in runs if run["ready_seconds"] is not None]
+    ready = statistics.median(ready_values) if ready_values else None
+    imported = statistics.median(run["import_seconds"] for run in runs)
+    rss_values = [run["rss_mb"] for run in runs if run["rss_mb"] is not None]
+    rss = statistics.median(rss_values) if rss_values else None
+    heavy = sorted({name for run in runs for name in run["heavy_modules_loaded"]})
+
+    print()
+    print("Median ready:  " + (f"{ready:.3f}s" if ready is not None else "not measured") + f" (budget {args.budget:.3f}s)")
+    print(f"Median import: {imported:.3f}s")
+    if rss is not None:
+        print(f"Median RSS:    {rss:.1f} MB" + (f" (budget {args.rss_budget:.0f} MB)" if args.rss_budget else ""))
+    print(f"Heavy modules loaded at startup: {', '.join(heavy) or 'none'}")
+    print("\nSlowest imports (last run):")
+    for name, seconds in runs[-1]["slowest_imports"]:
+        print(f"  {seconds:>8.3f}s  {name}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"ready_seconds": ready, "import_seconds": imported, "rss_mb": rss, "heavy_modules": heavy, "runs": runs}, f, indent=2)
+
+    failures = []
+    # A budget that can't be measured (psutil missing) fails rather than passing unchecked
+    if ready is None:
+        failures.append("cold start not measured (psutil is required)")
+    elif ready > args.budget:
+        failures.append(f"cold start {ready:.3f}s exceeds budget {args.budget:.3f}s")
+    if args.rss_budget and rss is None:
+        failures.append("RSS not measured (psutil is required)")
+    elif args.rss_budget and rss > args.rss_budget:
+        failures.append(f"RSS {rss:.1f} MB exceeds budget {args.rss_budget:.0f} MB")
+    if heavy and not args.allow_heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy)}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if not failures:
+        print("OK cold start within budget")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
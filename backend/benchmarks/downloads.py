@@ -0,0 +1,175 @@
+"""Concurrent download benchmark for /download.
+
+Starts the API under uvicorn (or uses --url), places a synthetic output file
+under outputs/ and measures many clients at once fetching it whole, seeking
+with 1 MiB Range requests like a video player, and revalidating with
+If-None-Match. Reports requests per second, throughput and latency
+percentiles per scenario and concurrency level.
+
+Run from the backend directory:
+
+    python -m benchmarks.downloads
+    python -m benchmarks.downloads --size-mb 256 --concurrency 1,16,64 --requests 200
+    python -m benchmarks.downloads --url http://localhost:8000 --scenarios range
+"""
+import os
+import sys
+import json
+import time
+import socket
+import random
+import asyncio
+import argparse
+import statistics
+import subprocess
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RANGE_BYTES = 1024 * 1024
+SEED = 1234
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def create_file(size_mb: int) -> str:
+    """Random (incompressible) bytes under outputs/, where /download serves from"""
+    name = f"bench_download_{size_mb}mb.bin"
+    path = os.path.join(BACKEND_DIR, "outputs", name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+    return name
+
+def start_server(port: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR
+    )
+    import httpx
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Server did not become ready within 60s")
+
+async def run_scenario(base_url: str, name: str, scenario: str, size: int, concurrency: int, requests: int) -> Dict[str, Any]:
+    import httpx
+
+    url = f"{base_url}/download/{name}"
+    rng = random.Random(SEED)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=None) as client:
+        etag = (await client.head(url)).headers.get("etag")
+
+        def request_headers() -> Dict[str, str]:
+            if scenario == "range":
+                start = rng.randrange(0, max(size - RANGE_BYTES, 1))
+                return {"Range": f"bytes={start}-{start + RANGE_BYTES - 1}"}
+            if scenario == "revalidate":
+                return {"If-None-Match": etag}
+            return {}
+
+        expected_status = {"full": 200, "range": 206, "revalidate": 304}[scenario]
+        queue: asyncio.Queue = asyncio.Queue()
+        for _ in range(requests):
+            queue.put_nowait(request_headers())
+
+        latencies: List[float] = []
+        received = 0
+
+        async def worker():
+            nonlocal received
+            while not queue.empty():
+                headers = queue.get_nowait()
+                started = time.perf_counter()
+                async with client.stream("GET", url, headers=headers) as response:
+                    if response.status_code != expected_status:
+                        raise RuntimeError(f"{scenario}: expected {expected_status}, got {response.status_code}")
+                    async for chunk in response.aiter_raw():
+                        received += len(chunk)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": requests,
+        "seconds": elapsed,
+        "requests_per_second": requests / elapsed,
+        "mb_per_second": received / 1024 / 1024 / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000,
+    }
+
+def print_report(results: List[Dict[str, Any]]):
+    header = f"{'scenario':<12}{'clients':>9}{'requests':>10}{'req/s':>10}{'MB/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(
+            f"{result['scenario']:<12}{result['concurrency']:>9}{result['requests']:>10}{result['requests_per_second']:>10.0f}"
+            f"{result['mb_per_second']:>10.1f}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /download under concurrent clients")
+    parser.add_argument("--url", help="Base URL of a running server; by default one is started with uvicorn")
+    parser.add_argument("--size-mb", type=int, default=64, help="Size of the synthetic file")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma separated client counts")
+    parser.add_argument("--scenarios", default="full,range,revalidate", help="Comma separated: full, range, revalidate")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per scenario and concurrency level")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+    unknown = [scenario for scenario in scenarios if scenario not in ("full", "range", "revalidate")]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    # With --url the file must exist on that server's outputs/ too, i.e. run on the same host
+    name = create_file(args.size_mb)
+    size = args.size_mb * 1024 * 1024
+    server = None
+    base_url = args.url
+    if not base_url:
+        port = _free_port()
+        server = start_server(port)
+        base_url = f"http://127.0.0.1:{port}"
+
+    results = []
+    try:
+        for scenario in scenarios:
+            for concurrency in levels:
+                print(f"Running {scenario} with {concurrency} clients...")
+                results.append(asyncio.run(run_scenario(base_url, name, scenario, size, concurrency, max(args.requests, concurrency))))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        os.remove(os.path.join(BACKEND_DIR, "outputs", name))
+
+    print()
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"size_mb": args.size_mb, "results": results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
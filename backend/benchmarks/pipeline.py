@@ -0,0 +1,330 @@
+"""Offline benchmark suite for the processing pipeline.
+
+Generates synthetic media with FFmpeg's lavfi sources, runs each pipeline
+stage in a fresh process and reports wall time, throughput, real-time
+factor (processing time / media duration) and peak memory of the Python
+process and of its FFmpeg children. Results are compared against a stored
+baseline to catch regressions.
+
+Run from the backend directory:
+
+    python -m benchmarks.pipeline                      # compare with baseline
+    python -m benchmarks.pipeline --update-baseline    # record a new baseline
+    python -m benchmarks.pipeline --cases srt,extract_audio --repeat 5
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+import multiprocessing
+from typing import Dict, Any, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join("temp", "bench")
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, "benchmarks", "baseline.json")
+
+# Synthetic media parameters; changing these invalidates stored baselines
+MEDIA_SECONDS = 30
+MEDIA_SIZE = "1280x720"
+MEDIA_RATE = 30
+SRT_CUES = 10000
+SEED = 1234
+
+# Memory figures are noisy at the few-MB level, so allow this much on top of the tolerance
+MEMORY_SLACK_MB = 8
+
+def _ffmpeg_version() -> str:
+    try:
+        output = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True).stdout
+        return output.splitlines()[0] if output else "unknown"
+    except FileNotFoundError:
+        return "not installed"
+
+def generate_media(seconds: int = MEDIA_SECONDS) -> str:
+    """Render a deterministic test video (testsrc2 + sine tone) once and reuse it"""
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DIR, f"synthetic_{MEDIA_SIZE}_{MEDIA_RATE}fps_{seconds}s.mp4")
+    if os.path.exists(path):
+        return path
+
+    subprocess.run([
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={MEDIA_SIZE}:rate={MEDIA_RATE}:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", "-threads", "1",
+        "-c:a", "aac", "-fflags", "+bitexact", "-shortest", path
+    ], check=True)
+    return path
+
+def synthetic_subtitles(count: int, spacing: float = 2.0) -> List[dict]:
+    """Subtitle dicts in the shape the frontend sends to /api/export-video"""
+    rng = random.Random(SEED)
+    words = ["video", "subtitle", "speech", "frame", "audio", "caption", "timeline", "export", "render", "sample"]
+    subtitles = []
+    for i in range(count):
+        start = i * spacing
+        subtitles.append({
+            "id": str(i + 1),
+            "startTime": start,
+            "endTime": start + spacing * 0.8,
+            "text": " ".join(rng.choice(words) for _ in range(rng.randint(3, 9)))
+        })
+    return subtitles
+
+# Cases: each returns the measured seconds plus the units of work it processed
+
+def case_extract_audio() -> Dict[str, Any]:
+    import main
+    video_path = generate_media()
+    start = time.perf_counter()
+    audio_path = main.extract_audio(video_path)
+    elapsed = time.perf_counter() - start
+    os.remove(audio_path)
+    return {"seconds": elapsed, "media_seconds": MEDIA_SECONDS, "bytes": os.path.getsize(video_path)}
+
+def case_srt() -> Dict[str, Any]:
+    import main
+    subtitles = synthetic_subtitles(SRT_CUES)
+    start = time.perf_counter()
+    srt_path = main.create_srt_file(subtitles, "en")
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(srt_path)
+    os.remove(srt_path)
+    return {"seconds": elapsed, "items": SRT_CUES, "bytes": size}
+
+def case_format_srt_time() -> Dict[str, Any]:
+    import main
+    rng = random.Random(SEED)
+    values = [rng.uniform(0, 36000) for _ in range(100000)]
+    start = time.perf_counter()
+    for value in values:
+        main.format_srt_time(value)
+    return {"seconds": time.perf_counter() - start, "items": len(values)}
+
+def case_burn_subtitles() -> Dict[str, Any]:
+    import main
+    video_path = generate_media()
+    srt_path = main.create_srt_file(synthetic_subtitles(MEDIA_SECONDS // 2), "en")
+    settings = {"quality": "low", "fontSize": "medium", "fontColor": "#ffffff", "position": "bottom"}
+    start = time.perf_counter()
+    output_path = asyncio.run(main.video_processor.burn_subtitles(video_path, srt_path, settings))
+    elapsed = time.perf_counter() - start
+    os.remove(output_path)
+    os.remove(srt_path)
+    return {"seconds": elapsed, "media_seconds": MEDIA_SECONDS, "frames": MEDIA_SECONDS * MEDIA_RATE}
+
+def case_extract_video_info() -> Dict[str, Any]:
+    import main
+    video_path = generate_media()
+    runs = 20
+    start = time.perf_counter()
+    for _ in range(runs):
+        asyncio.run(main.video_processor.extract_video_info(video_path))
+    return {"seconds": time.perf_counter() - start, "items": runs}
+
+def case_create_thumbnail() -> Dict[str, Any]:
+    import main
+    video_path = generate_media()
+    runs = 10
+    paths = []
+    start = time.perf_counter()
+    for i in range(runs):
+        paths.append(asyncio.run(main.video_processor.create_thumbnail(video_path, timestamp=i * 2.5)))
+    elapsed = time.perf_counter() - start
+    for path in set(paths):
+        if os.path.exists(path):
+            os.remove(path)
+    return {"seconds": elapsed, "items": runs}
+
+def case_transcribe_endpoint() -> Dict[str, Any]:
+    import main
+    from fastapi.testclient import TestClient
+
+    # Offline: bypass remote STT backends with the dummy transcription
+    main.get_whisper_model = lambda: "dummy_transcription"
+    client = TestClient(main.app)
+    video_path = generate_media()
+    runs = 5
+
+    start = time.perf_counter()
+    for i in range(runs):
+        with open(video_path, "rb") as f:
+            response = client.post(
+                "/api/transcribe",
+                files={"video": (f"bench_{i}.mp4", f, "video/mp4")},
+                data={"language": "en"}
+            )
+        if response.status_code != 200:
+            raise Exception(f"/api/transcribe returned {response.status_code}: {response.text}")
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "items": runs, "media_seconds": MEDIA_SECONDS * runs}
+
+CASES = {
+    "extract_audio": case_extract_audio,
+    "srt": case_srt,
+    "format_srt_time": case_format_srt_time,
+    "burn_subtitles": case_burn_subtitles,
+    "extract_video_info": case_extract_video_info,
+    "create_thumbnail": case_create_thumbnail,
+    "transcribe_endpoint": case_transcribe_endpoint,
+}
+
+def _run_case(name: str) -> Dict[str, Any]:
+    """Run one case in the current (fresh) process and attach memory figures"""
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+
+    # Import the app before measuring so its import cost is not charged to the case
+    import main  # noqa: F401
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+    result = CASES[name]()
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    result["peak_rss_mb"] = peak_rss / 1024 / 1024
+    result["rss_growth_mb"] = max(peak_rss - rss_before, 0) / 1024 / 1024
+    result["child_peak_rss_mb"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale / 1024 / 1024
+    return result
+
+def run_case(name: str, repeat: int) -> Dict[str, Any]:
+    """Run a case `repeat` times, each in a fresh process, and keep the median timing"""
+    context = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(repeat):
+        with context.Pool(1) as pool:
+            runs.append(pool.apply(_run_case, (name,)))
+
+    runs.sort(key=lambda r: r["seconds"])
+    result = dict(runs[len(runs) // 2])
+    result["seconds_min"] = runs[0]["seconds"]
+    result["seconds_stdev"] = statistics.pstdev(r["seconds"] for r in runs)
+    result["peak_rss_mb"] = max(r["peak_rss_mb"] for r in runs)
+    result["rss_growth_mb"] = max(r["rss_growth_mb"] for r in runs)
+    result["child_peak_rss_mb"] = max(r["child_peak_rss_mb"] for r in runs)
+
+    if result.get("media_seconds"):
+        result["realtime_factor"] = result["seconds"] / result["media_seconds"]
+    if result.get("items"):
+        result["items_per_second"] = result["items"] / result["seconds"]
+    if result.get("bytes"):
+        result["mb_per_second"] = result["bytes"] / 1024 / 1024 / result["seconds"]
+    if result.get("frames"):
+        result["fps"] = result["frames"] / result["seconds"]
+    return result
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return a description of every case that got slower or hungrier than the baseline allows"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get("cases", {}).get(name)
+        if not reference or "error" in result:
+            continue
+        for metric in ("seconds", "rss_growth_mb", "child_peak_rss_mb"):
+            if metric not in reference or metric not in result:
+                continue
+            limit = reference[metric] * (1 + tolerance)
+            if metric != "seconds":
+                limit += MEMORY_SLACK_MB
+            if result[metric] > limit:
+                regressions.append(
+                    f"{name}: {metric} {result[metric]:.3f} exceeds baseline {reference[metric]:.3f} "
+                    f"(+{tolerance:.0%} allowed)"
+                )
+    return regressions
+
+def print_report(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any]):
+    header = f"{'case':<22}{'seconds':>10}{'vs base':>10}{'RTF':>8}{'items/s':>12}{'MB/s':>9}{'RSS MB':>9}{'+RSS MB':>9}{'child MB':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:<22}ERROR: {result['error']}")
+            continue
+        reference = baseline.get("cases", {}).get(name, {}).get("seconds")
+        delta = f"{(result['seconds'] / reference - 1):+.0%}" if reference else "-"
+        rtf = f"{result['realtime_factor']:.3f}" if "realtime_factor" in result else "-"
+        items = f"{result['items_per_second']:.0f}" if "items_per_second" in result else "-"
+        mbps = f"{result['mb_per_second']:.1f}" if "mb_per_second" in result else "-"
+        print(
+            f"{name:<22}{result['seconds']:>10.3f}{delta:>10}{rtf:>8}{items:>12}{mbps:>9}"
+            f"{result['peak_rss_mb']:>9.1f}{result['rss_growth_mb']:>9.1f}{result['child_peak_rss_mb']:>10.1f}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the video subtitle processing pipeline")
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma separated list of cases to run")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the median is reported")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--output", help="Write the full results as JSON to this file")
+    args = parser.parse_args()
+
+    os.chdir(BACKEND_DIR)
+    names = [name.strip() for name in args.cases.split(",") if name.strip()]
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(unknown)}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    # Render the shared media up front so it is not charged to the first case
+    generate_media()
+
+    results = {}
+    for name in names:
+        print(f"Running {name}...")
+        try:
+            results[name] = run_case(name, args.repeat)
+        except Exception as e:
+            results[name] = {"error": str(e)}
+
+    environment = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": _ffmpeg_version(),
+    }
+
+    print()
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment, "cases": results}, f, indent=2)
+
+    if args.update_baseline:
+        cases = dict(baseline.get("cases", {}))
+        cases.update({name: result for name, result in results.items() if "error" not in result})
+        with open(args.baseline, "w") as f:
+            json.dump({"environment": environment, "cases": cases}, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    failed = [name for name, result in results.items() if "error" in result]
+    if not baseline:
+        print("\nNo baseline found; run with --update-baseline to record one")
+    elif baseline.get("environment", {}).get("cpu_count") != environment["cpu_count"]:
+        print("\nWarning: baseline was recorded on a machine with a different CPU count")
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    return 1 if regressions or failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
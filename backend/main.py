@@ -1,27 +1,49 @@
+import time
+# Start of module import, for the startup report
+_IMPORT_STARTED = time.perf_counter()
+
 import os
+import sys
 import tempfile
 import asyncio
 import gc
+import wave
+import contextvars
+import functools
+import hmac
 from typing import List, Optional
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, BackgroundTasks
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import PlainTextResponse, Response, JSONResponse, RedirectResponse
 from pydantic import BaseModel
-import whisper
 import ffmpeg
 import json
+import uuid
 from pathlib import Path
-import yt_dlp
-import torch
-import openai
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # Import translation services
 from services.translation import TranslationService
-from services.video_processor import VideoProcessor
-from models.subtitle import SubtitleSegment, TranscriptionRequest, TranslationRequest, VideoExportRequest
+from services.ffmpeg_scheduler import FFmpegScheduler
+from services.video_processor import VideoProcessor, THUMBNAIL_COUNT, THUMBNAIL_COLUMNS, THUMBNAIL_WIDTH
+from services.incremental_export import IncrementalExporter
+from services.live_transcriber import LiveTranscriber
+from services.ingest import StreamingIngest, IngestError
+from services.stt_audio import SpeechAudioEncoder, STT_AUDIO_COMPRESSION
+from services.batch import BatchTranscriber, expand_playlist, BATCH_MAX_ITEMS
+from services.admission import AdmissionController, AdmissionRejected
+from services.state import create_state_backend, file_fingerprint, unique_suffix, NODE_ID, WORKER_ID
+from services.uploads import ChunkedUploads, UploadError
+from services.file_serving import MediaFileResponse
+from services import metrics
+from services.startup import startup_report
+from services import profiler
+from services import waveform
+from models.subtitle import SubtitleSegment, TranscriptionRequest, TranslationRequest, VideoExportRequest, SubtitleFileRequest
+from models.subtitle_track import SubtitleTrack, SUPPORTED_FORMATS
+from models.upload import UploadCreateRequest, UploadStatus
 
 app = FastAPI(title="Video Subtitle Generator API", version="1.0.0")
 
@@ -40,16 +62,146 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Requests counted as in-flight jobs on /metrics
+JOB_ROUTES = {
+    "/api/transcribe": "transcribe",
+    # Admission covers accepting the batch; BatchTranscriber caps the batches running per client
+    "/api/transcribe/batch": "transcribe",
+    "/api/translate": "translate",
+    "/api/export-video": "export",
+    "/api/export-video/batch": "export",
+    "/api/export-video/abr": "export",
+}
+
+# Shared across workers and nodes: job status, cache indexes and output ownership
+state = create_state_backend()
+
+# Public base URL of this node, used to redirect downloads of files it owns
+NODE_PUBLIC_URL = os.getenv("NODE_PUBLIC_URL", "")
+
+# Job id of the request being handled, for recording output ownership
+current_job_id: contextvars.ContextVar = contextvars.ContextVar("current_job_id", default=None)
+
+# Per-request resource profiling, opted into with ?profile=1 or an X-Profile: 1 header.
+# Off by default: it turns on process-wide tracemalloc, which slows every concurrent request.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+# When set, profiling also requires this value in an X-Profile-Token header
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    flag = request.query_params.get("profile") or request.headers.get("X-Profile")
+    if not PROFILING_ENABLED or flag not in ("1", "true", "yes"):
+        return await call_next(request)
+    if PROFILING_TOKEN and not hmac.compare_digest(request.headers.get("X-Profile-Token", ""), PROFILING_TOKEN):
+        return await call_next(request)
+
+    profile = profiler.begin(request.method, request.url.path)
+    await run_blocking(profile.start)
+    status_code = None
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        report = await run_blocking(profile.finish, status_code)
+        await run_blocking(state.cache_set, "profile", profile.id, report)
+        print(f"Profile {profile.id}: {request.method} {request.url.path} {report['wall_seconds']}s, peak RSS {report['peak_rss_mb']} MB")
+
+    response.headers["X-Profile-ID"] = profile.id
+    response.headers["Server-Timing"] = profile.server_timing(report)
+    return response
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call (state backend, files, FFmpeg, STT) in the default executor with this request's context"""
+    return await profiler.run_in_executor(functools.partial(func, *args, **kwargs))
+
+async def record_job(job_id: str, **fields):
+    """Write a job record off the event loop; job status must never fail the request itself"""
+    try:
+        await run_blocking(state.set_job, job_id, **fields)
+    except Exception as e:
+        print(f"Failed to record job {job_id}: {e}")
+
+@app.middleware("http")
+async def track_jobs(request: Request, call_next):
+    job = JOB_ROUTES.get(request.url.path)
+    if job is None:
+        return await call_next(request)
+
+    job_id = uuid.uuid4().hex
+    current_job_id.set(job_id)
+    await record_job(job_id, type=job, status="running", worker=WORKER_ID, started=time.time())
+
+    metrics.JOBS_IN_FLIGHT.inc(job=job)
+    status = "error"
+    try:
+        response = await call_next(request)
+        if response.status_code < 400:
+            status = "ok"
+        response.headers["X-Job-ID"] = job_id
+        return response
+    finally:
+        metrics.JOBS_IN_FLIGHT.dec(job=job)
+        metrics.JOBS_TOTAL.inc(job=job, status=status)
+        await record_job(job_id, status=status, finished=time.time())
+
+# Transcriptions and exports wait for a slot (or get 429) instead of piling up FFmpeg/STT work
+admission = AdmissionController.from_env()
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    job = JOB_ROUTES.get(request.url.path)
+    if job not in admission.pools:
+        return await call_next(request)
+
+    client = request.client.host if request.client else "unknown"
+    try:
+        async with admission.admit(job, client):
+            return await call_next(request)
+    except AdmissionRejected as e:
+        print(f"Rejected {job} request from {client}: {e.reason}")
+        return JSONResponse(
+            status_code=429,
+            content={"detail": f"Server busy ({e.reason}), retry in {e.retry_after}s"},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
 # Global services
 whisper_model = None
 translation_service = TranslationService()
-video_processor = VideoProcessor()
+ffmpeg_scheduler = FFmpegScheduler.from_env()
+speech_audio = SpeechAudioEncoder(ffmpeg_scheduler)
+video_processor = VideoProcessor(ffmpeg_scheduler)
+incremental_exporter = IncrementalExporter(video_processor, state)
+chunked_uploads = ChunkedUploads(state, node_url=NODE_PUBLIC_URL)
 
 # Create necessary directories
 os.makedirs("uploads", exist_ok=True)
 os.makedirs("outputs", exist_ok=True)
 os.makedirs("temp", exist_ok=True)
 
+# Live transcription settings
+LIVE_WINDOW_SECONDS = float(os.getenv("LIVE_WINDOW_SECONDS", "10"))
+LIVE_PARTIAL_INTERVAL = float(os.getenv("LIVE_PARTIAL_INTERVAL", "3"))
+LIVE_MAX_CHUNK_BYTES = int(os.getenv("LIVE_MAX_CHUNK_BYTES", str(256 * 1024)))
+LIVE_MAX_QUEUED_CHUNKS = int(os.getenv("LIVE_MAX_QUEUED_CHUNKS", "32"))
+
+# Transcribe URL inputs while they download instead of after
+STREAMING_INGEST = os.getenv("STREAMING_INGEST", "true").lower() in ("1", "true", "yes")
+INGEST_CHUNK_SECONDS = float(os.getenv("INGEST_CHUNK_SECONDS", "30"))
+
+# Upper bound on variants rendered from one decode (each adds an encoder to the process)
+MAX_EXPORT_VARIANTS = int(os.getenv("MAX_EXPORT_VARIANTS", "6"))
+
+# Upper bound on tiles in one thumbnail sprite sheet
+MAX_THUMBNAILS = int(os.getenv("MAX_THUMBNAILS", "400"))
+
+# Upper bound on peaks returned by one waveform range request
+MAX_WAVEFORM_PIXELS = int(os.getenv("MAX_WAVEFORM_PIXELS", "20000"))
+
+# Translate merged sentence units instead of individual cues unless a request says otherwise
+TRANSLATION_SENTENCE_UNITS = os.getenv("TRANSLATION_SENTENCE_UNITS", "false").lower() in ("1", "true", "yes")
+
 def get_whisper_model():
     """Check which speech-to-text service to use"""
     openai_key = os.getenv("OPENAI_API_KEY")
@@ -83,6 +235,9 @@ def get_whisper_model():
             # Force CPU usage and minimal memory
             os.environ['CUDA_VISIBLE_DEVICES'] = ''  # Disable CUDA
             
+            # Heavy (torch); only imported when the local model is actually used
+            import whisper
+            
             # Load the smallest model with explicit CPU device
             whisper_model = whisper.load_model("tiny", device="cpu", download_root="./models")
             print(f"Whisper model loaded successfully! Model device: {next(whisper_model.parameters()).device}")
@@ -96,6 +251,7 @@ def get_whisper_model():
 def transcribe_with_openai_api(audio_path: str, language: str):
     """Transcribe audio using OpenAI Whisper API"""
     try:
+        import openai
         client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         
         with open(audio_path, "rb") as audio_file:
@@ -147,9 +303,14 @@ def transcribe_with_google_api(audio_path: str, language: str):
         with open(audio_path, "rb") as audio_file:
             content = audio_file.read()
         
+        # Parts from the STT audio encoder are FLAC; plain extracted audio is PCM
+        encodings = {
+            ".flac": speech.RecognitionConfig.AudioEncoding.FLAC,
+            ".ogg": speech.RecognitionConfig.AudioEncoding.OGG_OPUS,
+        }
         audio = speech.RecognitionAudio(content=content)
         config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            encoding=encodings.get(os.path.splitext(audio_path)[1].lower(), speech.RecognitionConfig.AudioEncoding.LINEAR16),
             sample_rate_hertz=16000,
             language_code=language if language != "auto" else "en-US",
             enable_word_time_offsets=True,
@@ -466,13 +627,61 @@ def create_dummy_transcription(audio_path: str, language: str):
     except Exception as e:
         raise Exception(f"Dummy transcription failed: {e}")
 
+def transcribe_audio(model, audio_path: str, language: str):
+    """Transcribe an audio file with the speech-to-text method returned by get_whisper_model"""
+    with metrics.stage("stt"):
+        if STT_AUDIO_COMPRESSION and isinstance(model, str) and speech_audio.supports(model) and audio_path.endswith(".wav"):
+            # Remote backends get compressed, size-compliant parts instead of one large PCM upload
+            return speech_audio.transcribe(
+                model,
+                audio_path,
+                language,
+                lambda part_path, lang: _transcribe_with_backend(model, part_path, lang)
+            )
+        return _transcribe_with_backend(model, audio_path, language)
+
+def _transcribe_with_backend(model, audio_path: str, language: str):
+    if model == "openai_api":
+        # Use OpenAI Whisper API (memory efficient)
+        return transcribe_with_openai_api(audio_path, language)
+    elif model == "assemblyai_api":
+        # Use AssemblyAI API (memory efficient)
+        return transcribe_with_assemblyai_api(audio_path, language)
+    elif model == "google_speech_api":
+        # Use Google Cloud Speech-to-Text API (memory efficient)
+        return transcribe_with_google_api(audio_path, language)
+    elif model == "free_google_speech":
+        # Use free Google Web Speech API (memory efficient)
+        return transcribe_with_free_google_api(audio_path, language)
+    elif model == "dummy_transcription":
+        # Emergency fallback for testing
+        return create_dummy_transcription(audio_path, language)
+    else:
+        # Use local model
+        return model.transcribe(
+            audio_path,
+            language=language if language != "auto" else None,
+            task="transcribe",
+            verbose=False  # Reduce console output
+        )
+
 @app.get("/")
 async def root():
     return {"message": "Video Subtitle Generator API"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "whisper_ready": True}
+    return {"status": "healthy", "whisper_ready": True, "admission": admission.status(), "ffmpeg": ffmpeg_scheduler.status()}
+
+@app.get("/startup")
+async def startup_info():
+    """Cold start report: import and ready times, memory, and which heavy dependencies are loaded"""
+    return startup_report.report()
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Per-stage timings, job counters and process memory in Prometheus format"""
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
 
 @app.get("/test-speech-method")
 async def test_speech_method():
@@ -554,16 +763,67 @@ async def test_whisper_model():
             "error_type": type(e).__name__
         }
 
+@app.post("/api/uploads", response_model=UploadStatus)
+async def create_upload(request: UploadCreateRequest):
+    """Start a resumable chunked upload; chunks go to PUT /api/uploads/{upload_id}"""
+    try:
+        return await run_blocking(chunked_uploads.create, request.filename, request.size, request.chunk_size)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+@app.get("/api/uploads/{upload_id}", response_model=UploadStatus)
+async def get_upload(upload_id: str):
+    """Upload progress; missing_offsets lists the chunks to (re)send after an interruption"""
+    try:
+        return await run_blocking(chunked_uploads.status, upload_id)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+@app.put("/api/uploads/{upload_id}", response_model=UploadStatus)
+async def upload_chunk(upload_id: str, offset: int, request: Request):
+    """Write one chunk (raw body) at the given byte offset; X-Chunk-SHA256 carries its checksum.
+
+    Chunks may be sent in any order and in parallel.
+    """
+    try:
+        redirect = upload_redirect(upload_id, request)
+        if redirect:
+            return redirect
+        with metrics.stage("upload"):
+            return await chunked_uploads.write_chunk(
+                upload_id,
+                offset,
+                request.stream(),
+                request.headers.get("X-Chunk-SHA256")
+            )
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+@app.post("/api/uploads/{upload_id}/finalize", response_model=UploadStatus)
+async def finalize_upload(upload_id: str, request: Request, sha256: Optional[str] = None):
+    """Assemble the upload once every chunk is in; the upload ID can then be passed
+    to /api/transcribe and /api/export-video instead of a file"""
+    try:
+        redirect = upload_redirect(upload_id, request)
+        if redirect:
+            return redirect
+        # Hashing and fsyncing a multi-GB file must not block the event loop
+        return await run_blocking(chunked_uploads.finalize, upload_id, sha256)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
 @app.post("/api/transcribe")
 async def transcribe_video(
     background_tasks: BackgroundTasks,
     video: Optional[UploadFile] = File(None),
     video_url: Optional[str] = Form(None),
-    language: str = Form("en")
+    language: str = Form("en"),
+    upload_id: Optional[str] = Form(None)
 ):
     """Transcribe video using OpenAI Whisper"""
-    if not video and not video_url:
-        raise HTTPException(status_code=400, detail="Either video file or video URL must be provided")
+    if not video and not video_url and not upload_id:
+        raise HTTPException(status_code=400, detail="Either video file, video URL or upload ID must be provided")
+    uploaded_path = resolve_upload(upload_id) if upload_id else None
     
     try:
         # Get Whisper model (lazy load)
@@ -574,58 +834,64 @@ async def transcribe_video(
         print(f"Failed to get Whisper model: {e}")
         raise HTTPException(status_code=500, detail=f"Whisper model initialization failed: {str(e)}")
     
+    # Cues the streaming attempt already finalized before it failed, reused below
+    streamed_partial = None
+    if video_url and not video and not uploaded_path and STREAMING_INGEST:
+        try:
+            return await transcribe_url_streaming(model, video_url, language, background_tasks)
+        except IngestError as e:
+            # e.g. MP4 with the index at the end, which can't be decoded from a pipe
+            print(f"{e}; falling back to download then extract")
+            if e.transcribed_seconds > 0:
+                streamed_partial = e
+    
     try:
-        # Handle video file or URL
-        if video:
+        # Handle chunked upload, video file or URL
+        if uploaded_path:
+            video_path = uploaded_path
+        elif video:
             # Save uploaded video file
-            video_path = f"uploads/{video.filename}"
-            with open(video_path, "wb") as buffer:
-                content = await video.read()
-                buffer.write(content)
+            video_path = upload_path(video.filename)
+            with metrics.stage("upload"):
+                with open(video_path, "wb") as buffer:
+                    content = await video.read()
+                    buffer.write(content)
         else:
             # Download video from URL
             video_path = await download_video_from_url(video_url)
         
         # Extract audio from video
         print(f"Extracting audio from: {video_path}")
-        audio_path = extract_audio(video_path)
+        audio_path = await run_blocking(extract_audio, video_path)
         print(f"Audio extracted to: {audio_path}")
         
         # Verify audio file exists and has size
         if not os.path.exists(audio_path) or os.path.getsize(audio_path) == 0:
             raise Exception("Audio extraction produced empty file")
         
+        # Timeline peaks come from the same WAV, computed while transcription runs
+        peaks_task = asyncio.ensure_future(run_blocking(build_waveform, audio_path, video_path))
+        
         # Transcribe with Whisper (API or local)
         print(f"Transcribing audio: {audio_path}")
         try:
-            if model == "openai_api":
-                # Use OpenAI Whisper API (memory efficient)
-                result = transcribe_with_openai_api(audio_path, language)
-            elif model == "assemblyai_api":
-                # Use AssemblyAI API (memory efficient)
-                result = transcribe_with_assemblyai_api(audio_path, language)
-            elif model == "google_speech_api":
-                # Use Google Cloud Speech-to-Text API (memory efficient)
-                result = transcribe_with_google_api(audio_path, language)
-            elif model == "free_google_speech":
-                # Use free Google Web Speech API (memory efficient)
-                result = transcribe_with_free_google_api(audio_path, language)
-            elif model == "dummy_transcription":
-                # Emergency fallback for testing
-                result = create_dummy_transcription(audio_path, language)
+            if streamed_partial:
+                result = await run_blocking(transcribe_audio_after, model, audio_path, language, streamed_partial)
             else:
-                # Use local model
-                result = model.transcribe(
-            audio_path, 
-            language=language if language != "auto" else None,
-                    task="transcribe",
-                    verbose=False  # Reduce console output
-        )
+                # Off the event loop: STT blocks, and its FFmpeg encode queues on this loop's scheduler
+                result = await run_blocking(transcribe_audio, model, audio_path, language)
             print(f"Transcription completed. Found {len(result.get('segments', []))} segments")
         except Exception as whisper_error:
             print(f"Whisper transcription error: {whisper_error}")
             raise Exception(f"Whisper transcription failed: {whisper_error}")
         
+        try:
+            peaks = await peaks_task
+        except Exception as peaks_error:
+            # The waveform is a convenience; never fail a transcription over it
+            print(f"Waveform peaks error: {peaks_error}")
+            peaks = None
+        
         # Convert to subtitle format
         segments = []
         for segment in result["segments"]:
@@ -635,34 +901,201 @@ async def transcribe_video(
                 "text": segment["text"].strip()
             })
         
-        # Cleanup temporary files
-        background_tasks.add_task(cleanup_file, video_path)
+        # Cleanup temporary files (chunked uploads stay until they expire)
+        if not uploaded_path:
+            background_tasks.add_task(cleanup_file, video_path)
         background_tasks.add_task(cleanup_file, audio_path)
         
         # Force garbage collection to free memory
         gc.collect()
-        if torch.cuda.is_available():
+        # Only a local model pulls in torch; don't import it just to clean up
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
             torch.cuda.empty_cache()
         
         return {
             "segments": segments,
             "language": result.get("language", language),
-            "duration": result.get("duration", 0)
+            "duration": result.get("duration", 0),
+            "waveform_id": peaks["waveform_id"] if peaks else None
         }
         
     except Exception as e:
         print(f"Transcription error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
 
+@app.post("/api/transcribe/batch")
+async def transcribe_batch(
+    request: Request,
+    videos: Optional[List[UploadFile]] = File(None),
+    video_urls: Optional[List[str]] = Form(None),
+    upload_ids: Optional[List[str]] = Form(None),
+    playlist_url: Optional[str] = Form(None),
+    language: str = Form("en")
+):
+    """Transcribe many videos or a playlist; poll /api/jobs/{batch_id} for per-item status"""
+    client = request.client.host if request.client else "unknown"
+    try:
+        batch_transcriber.check_client(client)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=f"Server busy ({e.reason}), retry in {e.retry_after}s", headers={"Retry-After": str(e.retry_after)})
+
+    videos = [video for video in videos or [] if video.filename]
+    video_urls = [url for url in video_urls or [] if url.strip()]
+    upload_ids = upload_ids or []
+    if not videos and not video_urls and not upload_ids and not playlist_url:
+        raise HTTPException(status_code=400, detail="Video files, video URLs, upload IDs or a playlist URL must be provided")
+    
+    items = [{"kind": "file", "source": resolve_upload(upload_id), "title": upload_id, "keep": True} for upload_id in upload_ids]
+    items += [{"kind": "url", "source": url, "title": url} for url in video_urls]
+    if playlist_url:
+        try:
+            entries = await run_blocking(expand_playlist, playlist_url, max(BATCH_MAX_ITEMS - len(items) - len(videos), 1))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to read playlist: {str(e)}")
+        items += [{"kind": "url", **entry} for entry in entries]
+    if len(items) + len(videos) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_ITEMS} videos can be transcribed in one batch")
+    
+    try:
+        model = get_whisper_model()
+    except Exception as e:
+        print(f"Failed to get Whisper model: {e}")
+        raise HTTPException(status_code=500, detail=f"Whisper model initialization failed: {str(e)}")
+    
+    # Uploads have to be read before the response; everything else happens in the background
+    for video in videos:
+        video_path = upload_path(video.filename)
+        with metrics.stage("upload"):
+            with open(video_path, "wb") as buffer:
+                while True:
+                    chunk = await video.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    buffer.write(chunk)
+        items.append({"kind": "file", "source": video_path, "title": video.filename})
+    
+    batch_id = await batch_transcriber.start(items, model, language, client)
+    return {
+        "batch_id": batch_id,
+        "status_url": f"/api/jobs/{batch_id}",
+        "items": [{"index": index, "title": item["title"]} for index, item in enumerate(items)]
+    }
+
+@app.get("/api/transcribe/batch/{batch_id}/items/{index}")
+async def get_batch_item(batch_id: str, index: int):
+    """Transcription of one finished batch item (its result_url in the batch status)"""
+    result = await run_blocking(state.cache_get, "batch_result", f"{batch_id}:{index}")
+    if result is None:
+        raise HTTPException(status_code=404, detail="Batch item result not found")
+    return result
+
+@app.websocket("/ws/transcribe")
+async def live_transcription(websocket: WebSocket, language: str = "en"):
+    """Transcribe a live audio stream incrementally.
+
+    Clients send raw 16 kHz mono pcm_s16le audio as binary messages and a
+    {"type": "end"} text message when the stream is over. The server answers
+    with "partial" events (tentative cues for the window being filled, which
+    replace the previous partial) and "final" events (cues that will not change).
+    """
+    await websocket.accept()
+
+    try:
+        model = get_whisper_model()
+    except Exception as e:
+        await websocket.send_json({"type": "error", "detail": f"Whisper model initialization failed: {str(e)}"})
+        await websocket.close(code=1011)
+        return
+
+    transcriber = LiveTranscriber(
+        lambda audio_path, lang: transcribe_audio(model, audio_path, lang),
+        language=language,
+        window_seconds=LIVE_WINDOW_SECONDS,
+        partial_interval=LIVE_PARTIAL_INTERVAL
+    )
+
+    # Bounded hand-off between the socket and the decoder: when STT falls behind,
+    # the receiver blocks on put() and stops reading, pushing back on the client
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=LIVE_MAX_QUEUED_CHUNKS)
+
+    async def receive_audio():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+
+                if message.get("bytes") is not None:
+                    chunk = message["bytes"]
+                    if len(chunk) > LIVE_MAX_CHUNK_BYTES:
+                        await websocket.send_json({
+                            "type": "error",
+                            "detail": f"Audio chunk exceeds {LIVE_MAX_CHUNK_BYTES} bytes"
+                        })
+                        break
+                    await chunks.put(chunk)
+                elif message.get("text") is not None:
+                    try:
+                        control = json.loads(message["text"])
+                    except ValueError:
+                        control = {}
+                    if control.get("type") == "end":
+                        break
+        finally:
+            await chunks.put(None)
+
+    receiver = asyncio.create_task(receive_audio())
+
+    try:
+        while True:
+            chunk = await chunks.get()
+            if chunk is None:
+                events = await transcriber.flush()
+            else:
+                transcriber.feed(chunk)
+                events = await transcriber.poll()
+
+            for event in events:
+                await websocket.send_json(event)
+
+            if chunk is None:
+                break
+
+        await websocket.send_json({"type": "done"})
+        await websocket.close()
+
+    except WebSocketDisconnect:
+        print("Live transcription client disconnected")
+    except Exception as e:
+        print(f"Live transcription error: {str(e)}")
+        try:
+            await websocket.send_json({"type": "error", "detail": f"Transcription failed: {str(e)}"})
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+    finally:
+        receiver.cancel()
+
 @app.post("/api/translate")
 async def translate_subtitles(request: TranslationRequest):
     """Translate subtitles using DeepL or Google Translate"""
     try:
-        translations = await translation_service.translate_batch(
-            texts=request.subtitles,
-            source_lang=request.source_language,
-            target_lang=request.target_language
-        )
+        sentence_units = TRANSLATION_SENTENCE_UNITS if request.sentence_units is None else request.sentence_units
+        with metrics.stage("translation"):
+            if sentence_units:
+                translations = await translation_service.translate_sentences(
+                    texts=request.subtitles,
+                    source_lang=request.source_language,
+                    target_lang=request.target_language,
+                    timings=request.timings
+                )
+            else:
+                translations = await translation_service.translate_batch(
+                    texts=request.subtitles,
+                    source_lang=request.source_language,
+                    target_lang=request.target_language
+                )
         
         return {"translations": translations}
         
@@ -670,6 +1103,60 @@ async def translate_subtitles(request: TranslationRequest):
         print(f"Translation error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Translation failed: {str(e)}")
 
+@app.post("/api/subtitles/import")
+async def import_subtitles(
+    file: UploadFile = File(...),
+    format: Optional[str] = Form(None),
+    language: str = Form("en"),
+    target_language: Optional[str] = Form(None),
+    sentence_units: Optional[bool] = Form(None)
+):
+    """Import an existing SRT, WebVTT or ASS file, optionally translating it"""
+    if format and format not in SUPPORTED_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported subtitle format: {format}")
+    
+    try:
+        content = (await file.read()).decode("utf-8-sig", errors="replace")
+        if not format and file.filename:
+            extension = file.filename.rsplit(".", 1)[-1].lower()
+            format = extension if extension in SUPPORTED_FORMATS else None
+        
+        track = SubtitleTrack.parse(content, format, language)
+        
+        if target_language and target_language != language:
+            with metrics.stage("translation"):
+                track = await translation_service.translate_track(
+                    track,
+                    language,
+                    target_language,
+                    sentence_units=TRANSLATION_SENTENCE_UNITS if sentence_units is None else sentence_units
+                )
+        
+        return {
+            "subtitles": track.to_dicts(),
+            "language": track.language,
+            "count": len(track)
+        }
+        
+    except Exception as e:
+        print(f"Subtitle import error: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Subtitle import failed: {str(e)}")
+
+@app.post("/api/subtitles/export")
+async def export_subtitles(request: SubtitleFileRequest):
+    """Serialize subtitles to an SRT, WebVTT or ASS file"""
+    if request.format not in SUPPORTED_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported subtitle format: {request.format}")
+    
+    track = SubtitleTrack.from_dicts(request.subtitles, request.language)
+    media_types = {"srt": "application/x-subrip", "vtt": "text/vtt", "ass": "text/x-ssa"}
+    
+    return Response(
+        content=track.serialize(request.format),
+        media_type=f"{media_types[request.format]}; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="subtitles_{request.language}.{request.format}"'}
+    )
+
 @app.post("/api/export-video")
 async def export_video_with_subtitles(
     background_tasks: BackgroundTasks,
@@ -677,11 +1164,146 @@ async def export_video_with_subtitles(
     video_url: Optional[str] = Form(None),
     subtitles: str = Form(...),
     settings: str = Form(...),
-    language: str = Form("en")
+    language: str = Form("en"),
+    upload_id: Optional[str] = Form(None)
 ):
     """Export video with burned-in subtitles using FFmpeg"""
+    if not video and not video_url and not upload_id:
+        raise HTTPException(status_code=400, detail="Either video file, video URL or upload ID must be provided")
+    uploaded_path = resolve_upload(upload_id) if upload_id else None
+    
+    try:
+        # Parse JSON data
+        subtitle_data = json.loads(subtitles)
+        video_settings = json.loads(settings)
+        
+        # Handle chunked upload, video file or URL
+        if uploaded_path:
+            video_path = uploaded_path
+        elif video:
+            video_path = upload_path(video.filename)
+            with metrics.stage("upload"):
+                with open(video_path, "wb") as buffer:
+                    content = await video.read()
+                    buffer.write(content)
+        else:
+            video_path = await download_video_from_url(video_url)
+        
+        # Create SRT file from subtitles
+        srt_path = create_srt_file(subtitle_data, language)
+        
+        # Process video with subtitles, re-encoding only the changed ranges
+        # when this source was exported before with the same settings
+        with metrics.stage("encode"):
+            render = await incremental_exporter.export(
+                video_path=video_path,
+                subtitle_path=srt_path,
+                subtitles=subtitle_data,
+                settings=video_settings
+            )
+        output_path = render["output_path"]
+        await run_blocking(register_output, output_path)
+        
+        # Cleanup temporary files (chunked uploads stay until they expire)
+        if not uploaded_path:
+            background_tasks.add_task(cleanup_file, video_path)
+        background_tasks.add_task(cleanup_file, srt_path)
+        
+        return {
+            "download_url": f"/download/{os.path.basename(output_path)}",
+            "filename": os.path.basename(output_path),
+            "render_mode": render["mode"],
+            "reencoded_segments": render["reencoded_segments"],
+            "total_segments": render["total_segments"]
+        }
+        
+    except Exception as e:
+        print(f"Video export error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Video export failed: {str(e)}")
+
+@app.post("/api/export-video/batch")
+async def export_video_variants(
+    background_tasks: BackgroundTasks,
+    video: Optional[UploadFile] = File(None),
+    video_url: Optional[str] = Form(None),
+    variants: str = Form(...)
+):
+    """Export several subtitle variants (languages or styles) of one video in a single FFmpeg pass"""
+    if not video and not video_url:
+        raise HTTPException(status_code=400, detail="Either video file or video URL must be provided")
+    
+    try:
+        # Parse JSON data: [{"subtitles": [...], "settings": {...}, "language": "en"}, ...]
+        variant_data = json.loads(variants)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid variants JSON: {str(e)}")
+    
+    if not isinstance(variant_data, list) or not variant_data:
+        raise HTTPException(status_code=400, detail="At least one export variant must be provided")
+    if len(variant_data) > MAX_EXPORT_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_EXPORT_VARIANTS} variants can be exported at once")
+    
+    try:
+        # Handle video file or URL
+        if video:
+            video_path = upload_path(video.filename)
+            with metrics.stage("upload"):
+                with open(video_path, "wb") as buffer:
+                    content = await video.read()
+                    buffer.write(content)
+        else:
+            video_path = await download_video_from_url(video_url)
+        
+        # Create one SRT file per variant
+        render_variants = []
+        for index, variant in enumerate(variant_data):
+            language = variant.get("language", "en")
+            srt_path = create_srt_file(variant["subtitles"], language, suffix=f"_{index}")
+            background_tasks.add_task(cleanup_file, srt_path)
+            render_variants.append({
+                "subtitle_path": srt_path,
+                "settings": variant.get("settings", {}),
+                "label": f"{language}_{index}"
+            })
+        
+        # Decode once, render every variant
+        with metrics.stage("encode"):
+            output_paths = await video_processor.burn_subtitles_batch(video_path, render_variants)
+        for output_path in output_paths:
+            await run_blocking(register_output, output_path)
+        
+        background_tasks.add_task(cleanup_file, video_path)
+        
+        return {
+            "outputs": [
+                {
+                    "download_url": f"/download/{os.path.basename(output_path)}",
+                    "filename": os.path.basename(output_path),
+                    "language": variant.get("language", "en")
+                }
+                for output_path, variant in zip(output_paths, variant_data)
+            ]
+        }
+        
+    except Exception as e:
+        print(f"Batch video export error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Video export failed: {str(e)}")
+
+@app.post("/api/export-video/abr")
+async def export_video_rendition_ladder(
+    background_tasks: BackgroundTasks,
+    video: Optional[UploadFile] = File(None),
+    video_url: Optional[str] = Form(None),
+    subtitles: str = Form(...),
+    settings: str = Form(...),
+    language: str = Form("en"),
+    packaging: str = Form("hls")
+):
+    """Export an HLS or DASH rendition ladder with burned-in subtitles in one pipeline run"""
     if not video and not video_url:
         raise HTTPException(status_code=400, detail="Either video file or video URL must be provided")
+    if packaging not in ("hls", "dash"):
+        raise HTTPException(status_code=400, detail="Packaging must be 'hls' or 'dash'")
     
     try:
         # Parse JSON data
@@ -690,74 +1312,350 @@ async def export_video_with_subtitles(
         
         # Handle video file or URL
         if video:
-            video_path = f"uploads/{video.filename}"
-            with open(video_path, "wb") as buffer:
-                content = await video.read()
-                buffer.write(content)
+            video_path = upload_path(video.filename)
+            with metrics.stage("upload"):
+                with open(video_path, "wb") as buffer:
+                    content = await video.read()
+                    buffer.write(content)
         else:
             video_path = await download_video_from_url(video_url)
         
         # Create SRT file from subtitles
         srt_path = create_srt_file(subtitle_data, language)
         
-        # Process video with subtitles
-        output_path = await video_processor.burn_subtitles(
-            video_path=video_path,
-            subtitle_path=srt_path,
-            settings=video_settings
-        )
+        with metrics.stage("encode"):
+            ladder = await video_processor.export_rendition_ladder(
+                video_path=video_path,
+                subtitle_path=srt_path,
+                settings=video_settings,
+                packaging=packaging
+            )
+        await run_blocking(register_output, os.path.join(video_processor.output_dir, ladder["output_dir"]))
         
         # Cleanup temporary files
         background_tasks.add_task(cleanup_file, video_path)
         background_tasks.add_task(cleanup_file, srt_path)
         
         return {
-            "download_url": f"/download/{os.path.basename(output_path)}",
-            "filename": os.path.basename(output_path)
+            "manifest_url": f"/download/{ladder['manifest']}",
+            "packaging": ladder["packaging"],
+            "renditions": ladder["renditions"]
         }
         
     except Exception as e:
-        print(f"Video export error: {str(e)}")
+        print(f"Rendition ladder export error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Video export failed: {str(e)}")
 
-@app.get("/download/{filename}")
+@app.post("/api/thumbnails")
+async def create_thumbnails(
+    background_tasks: BackgroundTasks,
+    video: Optional[UploadFile] = File(None),
+    video_url: Optional[str] = Form(None),
+    upload_id: Optional[str] = Form(None),
+    count: int = Form(THUMBNAIL_COUNT),
+    columns: int = Form(THUMBNAIL_COLUMNS),
+    width: int = Form(THUMBNAIL_WIDTH)
+):
+    """Scrubbing previews: a thumbnail sprite sheet plus a WebVTT index, cached per source file"""
+    if not video and not video_url and not upload_id:
+        raise HTTPException(status_code=400, detail="Either video file, video URL or upload ID must be provided")
+    if not 1 <= count <= MAX_THUMBNAILS or not 32 <= width <= 640 or columns < 1:
+        raise HTTPException(status_code=400, detail=f"count must be 1-{MAX_THUMBNAILS}, width 32-640 and columns at least 1")
+    uploaded_path = resolve_upload(upload_id) if upload_id else None
+    
+    try:
+        if uploaded_path:
+            video_path = uploaded_path
+        elif video:
+            video_path = upload_path(video.filename)
+            with metrics.stage("upload"):
+                with open(video_path, "wb") as buffer:
+                    content = await video.read()
+                    buffer.write(content)
+        else:
+            video_path = await download_video_from_url(video_url)
+        
+        if not uploaded_path:
+            background_tasks.add_task(cleanup_file, video_path)
+        
+        fingerprint = await run_blocking(file_fingerprint, video_path)
+        key = f"{fingerprint}:{count}:{columns}:{width}"
+        
+        sprites = await run_blocking(state.cache_get, "thumbnails", key)
+        hit = sprites is not None and os.path.exists(os.path.join(video_processor.output_dir, sprites["vtt"]))
+        metrics.record_cache("thumbnails", hit)
+        if not hit:
+            with metrics.stage("thumbnails"):
+                sprites = await video_processor.create_thumbnail_sprites(video_path, count, columns, width)
+            await run_blocking(register_output, os.path.join(video_processor.output_dir, sprites["output_dir"]))
+            await run_blocking(state.cache_set, "thumbnails", key, sprites)
+        
+        return {
+            "sprite_url": f"/download/{sprites['sprite']}",
+            "vtt_url": f"/download/{sprites['vtt']}",
+            "count": sprites["count"],
+            "columns": sprites["columns"],
+            "tile_width": sprites["tile_width"],
+            "tile_height": sprites["tile_height"],
+            "cached": hit
+        }
+        
+    except Exception as e:
+        print(f"Thumbnail generation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Thumbnail generation failed: {str(e)}")
+
+@app.post("/api/waveform")
+async def create_waveform(
+    background_tasks: BackgroundTasks,
+    video: Optional[UploadFile] = File(None),
+    video_url: Optional[str] = Form(None),
+    upload_id: Optional[str] = Form(None)
+):
+    """Multi-resolution min/max peaks for the timeline, cached per source file"""
+    if not video and not video_url and not upload_id:
+        raise HTTPException(status_code=400, detail="Either video file, video URL or upload ID must be provided")
+    uploaded_path = resolve_upload(upload_id) if upload_id else None
+    
+    try:
+        if uploaded_path:
+            video_path = uploaded_path
+        elif video:
+            video_path = upload_path(video.filename)
+            with metrics.stage("upload"):
+                with open(video_path, "wb") as buffer:
+                    content = await video.read()
+                    buffer.write(content)
+        else:
+            video_path = await download_video_from_url(video_url)
+        
+        if not uploaded_path:
+            background_tasks.add_task(cleanup_file, video_path)
+        
+        fingerprint = await run_blocking(file_fingerprint, video_path)
+        peaks = await run_blocking(state.cache_get, "waveform", fingerprint)
+        hit = peaks is not None and os.path.exists(os.path.join(video_processor.output_dir, peaks["waveform_id"]))
+        metrics.record_cache("waveform", hit)
+        if not hit:
+            audio_path = await run_blocking(extract_audio, video_path)
+            background_tasks.add_task(cleanup_file, audio_path)
+            peaks = await run_blocking(build_waveform, audio_path, video_path, fingerprint)
+        
+        return {**peaks, "cached": hit}
+        
+    except Exception as e:
+        print(f"Waveform error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Waveform generation failed: {str(e)}")
+
+@app.get("/api/waveform/{waveform_id}")
+async def get_waveform_range(request: Request, waveform_id: str, start: float = 0.0, end: Optional[float] = None, pixels: int = 1000):
+    """Peaks for [start, end) seconds at the zoom level closest to `pixels` peaks.
+
+    The body is raw (min, max) int8 pairs; X-Waveform-* headers give the
+    sample rate, samples per peak and index of the first peak.
+    """
+    if not 1 <= pixels <= MAX_WAVEFORM_PIXELS or start < 0 or (end is not None and end < start):
+        raise HTTPException(status_code=400, detail=f"pixels must be 1-{MAX_WAVEFORM_PIXELS} and 0 <= start <= end")
+    
+    outputs_dir = os.path.realpath(video_processor.output_dir)
+    peaks_path = os.path.realpath(os.path.join(outputs_dir, waveform_id))
+    if not peaks_path.startswith(outputs_dir + os.sep) or not peaks_path.endswith(".peaks"):
+        raise HTTPException(status_code=404, detail="Waveform not found")
+    
+    if not os.path.isfile(peaks_path):
+        owner = await run_blocking(state.file_owner, waveform_id)
+        if owner and owner.get("node") != NODE_ID and owner.get("url"):
+            return RedirectResponse(f"{owner['url'].rstrip('/')}{request.url.path}?{request.url.query}", status_code=307)
+        raise HTTPException(status_code=404, detail="Waveform not found")
+    
+    peaks = waveform.read_range(peaks_path, start, end, pixels)
+    return Response(
+        content=peaks["data"],
+        media_type="application/octet-stream",
+        headers={
+            "X-Waveform-Sample-Rate": str(peaks["sample_rate"]),
+            "X-Waveform-Samples-Per-Peak": str(peaks["samples_per_peak"]),
+            "X-Waveform-Start-Peak": str(peaks["start_peak"]),
+            "X-Waveform-Peak-Count": str(peaks["peak_count"]),
+            # Waveform files never change once written
+            "Cache-Control": "public, max-age=31536000, immutable"
+        }
+    )
+
+@app.api_route("/download/{filename:path}", methods=["GET", "HEAD"])
 async def download_file(filename: str):
-    """Download processed files"""
-    file_path = f"outputs/{filename}"
-    if not os.path.exists(file_path):
+    """Download processed files (nested paths serve HLS/DASH segments); supports Range and conditional requests"""
+    outputs_dir = os.path.realpath("outputs")
+    file_path = os.path.realpath(os.path.join(outputs_dir, filename))
+    if not file_path.startswith(outputs_dir + os.sep):
         raise HTTPException(status_code=404, detail="File not found")
     
-    return FileResponse(
-        file_path,
-        filename=filename,
-        media_type='application/octet-stream'
-    )
+    if not os.path.isfile(file_path):
+        # Written by another node: send the client there
+        owner = await run_blocking(state.file_owner, os.path.relpath(file_path, outputs_dir).split(os.sep)[0])
+        if owner and owner.get("node") != NODE_ID and owner.get("url"):
+            return RedirectResponse(f"{owner['url'].rstrip('/')}/download/{filename}", status_code=307)
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    return MediaFileResponse(file_path, filename=os.path.basename(filename))
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Status of a transcription, translation or export job (id from the X-Job-ID header)"""
+    job = await run_blocking(state.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """Resource profile of a request made with ?profile=1 (id from the X-Profile-ID header)"""
+    profile = await run_blocking(state.cache_get, "profile", profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
 
 # Helper functions
 
+def upload_path(filename: str) -> str:
+    """Unique path for an uploaded file so concurrent uploads with the same name never clash"""
+    name = Path(os.path.basename(filename or "upload"))
+    return f"uploads/{name.stem}_{unique_suffix()}{name.suffix}"
+
+def resolve_upload(upload_id: str) -> str:
+    """Local path of a finalized chunked upload, as an HTTP error when unusable"""
+    try:
+        return chunked_uploads.path_for(upload_id)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+def upload_redirect(upload_id: str, request: Request) -> Optional[RedirectResponse]:
+    """Send chunk writes for an upload created on another node to that node"""
+    meta = chunked_uploads.meta(upload_id)
+    if chunked_uploads.is_local(meta):
+        return None
+    if not meta.get("url"):
+        raise UploadError(409, f"Upload is stored on node {meta['node']}")
+    target = f"{meta['url'].rstrip('/')}{request.url.path}"
+    if request.url.query:
+        target += f"?{request.url.query}"
+    return RedirectResponse(target, status_code=307)
+
+def register_output(path: str):
+    """Record which node and job produced an output under outputs/; blocking, see run_blocking"""
+    name = os.path.relpath(path, video_processor.output_dir).split(os.sep)[0]
+    job_id = current_job_id.get()
+    try:
+        state.claim_file(name, {"node": NODE_ID, "worker": WORKER_ID, "url": NODE_PUBLIC_URL, "job_id": job_id})
+        if job_id:
+            job = state.get_job(job_id) or {}
+            state.set_job(job_id, outputs=job.get("outputs", []) + [name])
+    except Exception as e:
+        # Ownership is best effort; the file itself is already written
+        print(f"Failed to register output {name}: {e}")
+
+def build_waveform(audio_path: str, video_path: str, fingerprint: Optional[str] = None) -> dict:
+    """Write timeline peaks for an extracted WAV under outputs/ and cache them by source file"""
+    name = f"waveform_{unique_suffix()}.peaks"
+    with metrics.stage("waveform"):
+        info = waveform.write_peaks(audio_path, os.path.join(video_processor.output_dir, name))
+    register_output(os.path.join(video_processor.output_dir, name))
+    
+    peaks = {"waveform_id": name, **info}
+    state.cache_set("waveform", fingerprint or file_fingerprint(video_path), peaks)
+    return peaks
+
+async def transcribe_url_streaming(model, url: str, language: str, background_tasks: BackgroundTasks) -> dict:
+    """Transcribe a URL while it downloads; raises IngestError when the caller should fall back"""
+    audio_path = f"temp/stream_{unique_suffix()}_audio.wav"
+    background_tasks.add_task(cleanup_file, audio_path)
+    ingest = StreamingIngest(
+        lambda chunk_path, lang: transcribe_audio(model, chunk_path, lang),
+        language=language,
+        chunk_seconds=INGEST_CHUNK_SECONDS
+    )
+    
+    try:
+        with metrics.stage("ingest"):
+            result = await ingest.run(url, audio_path)
+    except IngestError:
+        raise
+    except Exception as e:
+        print(f"Transcription error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
+    
+    try:
+        peaks = await run_blocking(build_waveform, audio_path, audio_path)
+    except Exception as peaks_error:
+        print(f"Waveform peaks error: {peaks_error}")
+        peaks = None
+    
+    return {
+        "segments": result["segments"],
+        "language": result["language"],
+        "duration": result["duration"],
+        "waveform_id": peaks["waveform_id"] if peaks else None
+    }
+
+def transcribe_audio_after(model, audio_path: str, language: str, partial: IngestError) -> dict:
+    """Transcribe only the audio after what a failed streaming ingest already transcribed"""
+    samples, sample_rate = waveform.read_wav_samples(audio_path)
+    first = int(partial.transcribed_seconds * sample_rate)
+    segments = list(partial.segments)
+    detected = partial.language
+    
+    if len(samples) - first > sample_rate // 10:
+        rest_path = f"temp/rest_{unique_suffix()}_audio.wav"
+        try:
+            with wave.open(rest_path, "wb") as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(sample_rate)
+                wav_file.writeframes(samples[first:].tobytes())
+            result = transcribe_audio(model, rest_path, language)
+        finally:
+            if os.path.exists(rest_path):
+                os.remove(rest_path)
+        offset = first / sample_rate
+        segments += [
+            {"start": segment["start"] + offset, "end": segment["end"] + offset, "text": segment["text"]}
+            for segment in result.get("segments", [])
+        ]
+        detected = detected or result.get("language")
+    
+    print(f"Reused {len(partial.segments)} streamed cues covering {partial.transcribed_seconds:.1f}s")
+    return {"segments": segments, "language": detected or language, "duration": len(samples) / sample_rate}
+
 async def download_video_from_url(url: str) -> str:
     """Download video from URL using yt-dlp"""
     try:
-        output_path = f"temp/video_{int(asyncio.get_event_loop().time())}"
-        
-        ydl_opts = {
-            'outtmpl': f'{output_path}.%(ext)s',
-            'format': 'best[height<=720]/best/worst',  # More flexible format selection
-            'no_warnings': True,
-            'extract_flat': False,
-        }
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            filename = ydl.prepare_filename(info)
-            
-        return filename
-        
+        return await run_blocking(download_video, url)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to download video: {str(e)}")
 
+def download_video(url: str) -> str:
+    """Blocking yt-dlp download; returns the local path"""
+    import yt_dlp
+    output_path = f"temp/video_{unique_suffix()}"
+    
+    ydl_opts = {
+        'outtmpl': f'{output_path}.%(ext)s',
+        'format': 'best[height<=720]/best/worst',  # More flexible format selection
+        'no_warnings': True,
+        'extract_flat': False,
+    }
+    
+    with metrics.stage("download"), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=True)
+        filename = ydl.prepare_filename(info)
+        
+    return filename
+
 def extract_audio(video_path: str) -> str:
     """Extract audio from video using FFmpeg"""
+    with metrics.stage("extract_audio"):
+        return _extract_audio(video_path)
+
+def _extract_audio(video_path: str) -> str:
     audio_path = video_path.rsplit('.', 1)[0] + '_audio.wav'
     
     print(f"Extracting audio from: {video_path}")
@@ -822,27 +1720,24 @@ def extract_audio(video_path: str) -> str:
             print(f"Both extraction methods failed. FFmpeg error: {e2}")
             raise Exception(f"Audio extraction failed: {e2}")
 
-def create_srt_file(subtitles: List[dict], language: str) -> str:
+def create_srt_file(subtitles: List[dict], language: str, suffix: str = "") -> str:
     """Create SRT file from subtitle data"""
-    srt_path = f"temp/subtitles_{language}_{int(asyncio.get_event_loop().time())}.srt"
+    srt_path = f"temp/subtitles_{language}{suffix}_{unique_suffix()}.srt"
     
+    # Serialize the whole track in one vectorized pass and write it at once
+    content = SubtitleTrack.from_dicts(subtitles, language).to_srt()
     with open(srt_path, 'w', encoding='utf-8') as f:
-        for i, sub in enumerate(subtitles, 1):
-            start_time = format_srt_time(sub['startTime'])
-            end_time = format_srt_time(sub['endTime'])
-            
-            f.write(f"{i}\n")
-            f.write(f"{start_time} --> {end_time}\n")
-            f.write(f"{sub['text']}\n\n")
+        f.write(content)
     
     return srt_path
 
 def format_srt_time(seconds: float) -> str:
     """Format seconds to SRT time format"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    milliseconds = int((seconds % 1) * 1000)
+    # Round to whole milliseconds like SubtitleTrack does (1.001 must not become 1,000)
+    total_ms = int(round(max(seconds, 0) * 1000))
+    hours, total_ms = divmod(total_ms, 3600000)
+    minutes, total_ms = divmod(total_ms, 60000)
+    secs, milliseconds = divmod(total_ms, 1000)
     
     return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
 
@@ -854,6 +1749,18 @@ async def cleanup_file(file_path: str):
     except Exception as e:
         print(f"Failed to cleanup file {file_path}: {e}")
 
+# Built after the helpers it runs for each batch item
+batch_transcriber = BatchTranscriber(state, download_video, extract_audio, transcribe_audio, cleanup_file, admission=admission)
+
+@app.on_event("startup")
+async def log_startup():
+    # Lets worker threads (e.g. STT audio encoding) queue FFmpeg jobs on this loop
+    ffmpeg_scheduler.attach(asyncio.get_event_loop())
+    startup_report.mark_ready()
+    print(startup_report.summary())
+
+startup_report.mark_imported(_IMPORT_STARTED)
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, conlist, model_validator
 from typing import List, Optional
 
 class SubtitleSegment(BaseModel):
@@ -17,6 +17,20 @@ class TranslationRequest(BaseModel):
     subtitles: List[str]
     source_language: str
     target_language: str
+    # Merge cues into sentences before translating (None = server default)
+    sentence_units: Optional[bool] = None
+    # Optional [start, end] per subtitle, used to spread sentence translations over cues
+    timings: Optional[List[conlist(float, min_length=2, max_length=2)]] = None
+
+    @model_validator(mode="after")
+    def check_timings(self):
+        if self.timings is None:
+            return self
+        if len(self.timings) != len(self.subtitles):
+            raise ValueError("timings must have one [start, end] pair per subtitle")
+        if any(start > end for start, end in self.timings):
+            raise ValueError("every timing must have start <= end")
+        return self
 
 class VideoExportRequest(BaseModel):
     video_url: Optional[str] = None
@@ -24,6 +38,11 @@ class VideoExportRequest(BaseModel):
     settings: dict
     language: str = "en"
 
+class SubtitleFileRequest(BaseModel):
+    subtitles: List[dict]
+    format: str = "srt"  # srt, vtt, ass
+    language: str = "en"
+
 class VideoSettings(BaseModel):
     quality: str = "medium"  # low, medium, high
     font_size: str = "medium"  # small, medium, large
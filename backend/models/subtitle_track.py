@@ -0,0 +1,255 @@
+import re
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+
+SUPPORTED_FORMATS = ("srt", "vtt", "ass")
+
+_SRT_TIMING = re.compile(
+    r"^[ \t]*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})[ \t]*-->[ \t]*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})[^\n]*$",
+    re.M
+)
+_VTT_TIMING = re.compile(
+    r"^[ \t]*(?:(\d+):)?(\d{1,2}):(\d{1,2})\.(\d{1,3})[ \t]+-->[ \t]+(?:(\d+):)?(\d{1,2}):(\d{1,2})\.(\d{1,3})[^\n]*$",
+    re.M
+)
+_BLANK_LINE = re.compile(r"\n[ \t]*\n")
+_ASS_TIME = re.compile(r"(\d+):(\d{1,2}):(\d{1,2})\.(\d{1,2})")
+_ASS_OVERRIDE = re.compile(r"\{[^}]*\}")
+
+def _split_ms(ms: np.ndarray) -> Tuple[List[int], List[int], List[int], List[int]]:
+    """Split integer milliseconds into hour/minute/second/millisecond columns in one vectorized pass"""
+    hours, rest = np.divmod(ms, 3600000)
+    minutes, rest = np.divmod(rest, 60000)
+    seconds, millis = np.divmod(rest, 1000)
+    return hours.tolist(), minutes.tolist(), seconds.tolist(), millis.tolist()
+
+def _times_from_groups(groups: List[tuple]) -> np.ndarray:
+    """Convert (hours, minutes, seconds, fraction) digit groups to seconds.
+
+    All digits are parsed by numpy in a single call; the fraction is scaled by
+    its digit count ("5" -> 500 ms, "05" -> 50 ms).
+    """
+    digits = " ".join([" ".join(group) for group in groups])
+    values = np.fromstring(digits, dtype=np.int64, sep=" ").reshape(-1, 4)
+    widths = np.array([len(group[3]) for group in groups], dtype=np.int64)
+    ms = (
+        values[:, 0] * 3600000 + values[:, 1] * 60000 + values[:, 2] * 1000
+        + values[:, 3] * np.power(10, 3 - widths)
+    )
+    return ms / 1000.0
+
+class SubtitleTrack:
+    """Array-backed subtitle track.
+
+    Cue timings live in two contiguous float64 arrays (seconds) and the texts in
+    a plain list, so serializing or parsing thousands of cues is a handful of
+    vectorized numpy operations plus one string join instead of per-cue work.
+    """
+
+    def __init__(self, starts: Sequence[float], ends: Sequence[float], texts: Sequence[str], language: str = "en"):
+        self.starts = np.asarray(starts, dtype=np.float64)
+        self.ends = np.asarray(ends, dtype=np.float64)
+        self.texts = list(texts)
+        self.language = language
+
+        if not (len(self.starts) == len(self.ends) == len(self.texts)):
+            raise ValueError("Subtitle track arrays must have the same length")
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    # Conversions from and to the shapes used by the API
+
+    @classmethod
+    def from_dicts(cls, subtitles: List[dict], language: str = "en") -> "SubtitleTrack":
+        """Build a track from frontend subtitles ({"startTime", "endTime", "text"})"""
+        return cls(
+            [sub["startTime"] for sub in subtitles],
+            [sub["endTime"] for sub in subtitles],
+            [sub["text"] for sub in subtitles],
+            language
+        )
+
+    @classmethod
+    def from_segments(cls, segments: list, language: str = "en") -> "SubtitleTrack":
+        """Build a track from SubtitleSegment models"""
+        return cls(
+            [segment.start_time for segment in segments],
+            [segment.end_time for segment in segments],
+            [segment.text for segment in segments],
+            language
+        )
+
+    def to_dicts(self) -> List[dict]:
+        """Frontend subtitle dicts, ids numbered from 1"""
+        return [
+            {"id": str(i), "startTime": start, "endTime": end, "text": text, "language": self.language}
+            for i, (start, end, text) in enumerate(zip(self.starts.tolist(), self.ends.tolist(), self.texts), 1)
+        ]
+
+    def with_texts(self, texts: Sequence[str], language: Optional[str] = None) -> "SubtitleTrack":
+        """Same timings with new texts, e.g. after translation"""
+        return SubtitleTrack(self.starts, self.ends, texts, language or self.language)
+
+    def _milliseconds(self) -> Tuple[np.ndarray, np.ndarray]:
+        starts = np.rint(np.maximum(self.starts, 0) * 1000).astype(np.int64)
+        ends = np.rint(np.maximum(self.ends, 0) * 1000).astype(np.int64)
+        return starts, ends
+
+    # Serializers
+
+    def to_srt(self) -> str:
+        starts, ends = self._milliseconds()
+        rows = zip(range(1, len(self) + 1), *_split_ms(starts), *_split_ms(ends), self.texts)
+        template = "%d\n%02d:%02d:%02d,%03d --> %02d:%02d:%02d,%03d\n%s\n\n"
+        return "".join([template % row for row in rows])
+
+    def to_vtt(self) -> str:
+        starts, ends = self._milliseconds()
+        rows = zip(*_split_ms(starts), *_split_ms(ends), self.texts)
+        template = "%02d:%02d:%02d.%03d --> %02d:%02d:%02d.%03d\n%s\n\n"
+        return "WEBVTT\n\n" + "".join([template % row for row in rows])
+
+    def to_ass(
+        self,
+        font_name: str = "Arial",
+        font_size: int = 28,
+        primary_colour: str = "&H00FFFFFF",
+        outline_colour: str = "&H00000000",
+        outline: int = 2,
+        alignment: int = 2,
+        play_res: Tuple[int, int] = (1920, 1080)
+    ) -> str:
+        starts, ends = self._milliseconds()
+        # ASS timestamps have centisecond precision and a single-digit hour
+        start_h, start_m, start_s, start_ms = _split_ms(np.rint(starts / 10).astype(np.int64) * 10)
+        end_h, end_m, end_s, end_ms = _split_ms(np.rint(ends / 10).astype(np.int64) * 10)
+        texts = [text.replace("\r", "").replace("\n", "\\N") for text in self.texts]
+
+        header = (
+            "[Script Info]\n"
+            "ScriptType: v4.00+\n"
+            f"PlayResX: {play_res[0]}\n"
+            f"PlayResY: {play_res[1]}\n"
+            "WrapStyle: 0\n"
+            "\n"
+            "[V4+ Styles]\n"
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+            "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+            "Alignment, MarginL, MarginR, MarginV, Encoding\n"
+            f"Style: Default,{font_name},{font_size},{primary_colour},&H000000FF,{outline_colour},&H00000000,"
+            f"0,0,0,0,100,100,0,0,1,{outline},0,{alignment},10,10,10,1\n"
+            "\n"
+            "[Events]\n"
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+        )
+        rows = zip(
+            start_h, start_m, start_s, [ms // 10 for ms in start_ms],
+            end_h, end_m, end_s, [ms // 10 for ms in end_ms],
+            texts
+        )
+        template = "Dialogue: 0,%d:%02d:%02d.%02d,%d:%02d:%02d.%02d,Default,,0,0,0,,%s\n"
+        return header + "".join([template % row for row in rows])
+
+    def serialize(self, fmt: str) -> str:
+        if fmt == "srt":
+            return self.to_srt()
+        elif fmt == "vtt":
+            return self.to_vtt()
+        elif fmt == "ass":
+            return self.to_ass()
+        raise ValueError(f"Unsupported subtitle format: {fmt}")
+
+    # Parsers
+
+    @classmethod
+    def _from_timings(cls, content: str, timing: "re.Pattern", language: str) -> "SubtitleTrack":
+        """Locate every timing line, then slice the cue text between consecutive timings"""
+        content = content.lstrip("\ufeff").replace("\r\n", "\n")
+        matches = list(timing.finditer(content))
+        if not matches:
+            return cls([], [], [], language)
+
+        # Missing WebVTT hour groups default to "0"
+        groups = [match.groups("0") for match in matches]
+        bounds = [match.end() + 1 for match in matches] + [len(content)]
+        starts_of = [match.start() for match in matches[1:]] + [len(content)]
+
+        # Text runs up to the first blank line; what follows is the next cue's id
+        texts = [
+            _BLANK_LINE.split(content[bounds[i]:starts_of[i]], 1)[0].strip()
+            for i in range(len(matches))
+        ]
+        starts = _times_from_groups([group[0:4] for group in groups])
+        ends = _times_from_groups([group[4:8] for group in groups])
+        return cls(starts, ends, texts, language)
+
+    @classmethod
+    def from_srt(cls, content: str, language: str = "en") -> "SubtitleTrack":
+        return cls._from_timings(content, _SRT_TIMING, language)
+
+    @classmethod
+    def from_vtt(cls, content: str, language: str = "en") -> "SubtitleTrack":
+        return cls._from_timings(content, _VTT_TIMING, language)
+
+    @classmethod
+    def from_ass(cls, content: str, language: str = "en") -> "SubtitleTrack":
+        content = content.lstrip("\ufeff").replace("\r\n", "\n")
+
+        # Field order comes from the [Events] Format line
+        fields = ["layer", "start", "end", "style", "name", "marginl", "marginr", "marginv", "effect", "text"]
+        in_events = False
+        starts, ends, texts = [], [], []
+        for line in content.split("\n"):
+            stripped = line.strip()
+            if stripped.startswith("["):
+                in_events = stripped.lower() == "[events]"
+                continue
+            if not in_events:
+                continue
+            if stripped.lower().startswith("format:"):
+                fields = [field.strip().lower() for field in stripped[7:].split(",")]
+            elif stripped.lower().startswith("dialogue:"):
+                values = stripped[9:].split(",", len(fields) - 1)
+                if len(values) < len(fields):
+                    continue
+                row = dict(zip(fields, values))
+                starts.append(row["start"].strip())
+                ends.append(row["end"].strip())
+                texts.append(row["text"])
+
+        if not texts:
+            return cls([], [], [], language)
+
+        start_groups = [_ASS_TIME.match(value).groups() for value in starts]
+        end_groups = [_ASS_TIME.match(value).groups() for value in ends]
+        clean_texts = [
+            _ASS_OVERRIDE.sub("", text).replace("\\N", "\n").replace("\\n", "\n").replace("\\h", " ").strip()
+            for text in texts
+        ]
+        track = cls(_times_from_groups(start_groups), _times_from_groups(end_groups), clean_texts, language)
+
+        # Dialogue lines are not required to be in time order
+        order = np.argsort(track.starts, kind="stable")
+        return cls(track.starts[order], track.ends[order], [track.texts[i] for i in order], language)
+
+    @classmethod
+    def parse(cls, content: str, fmt: Optional[str] = None, language: str = "en") -> "SubtitleTrack":
+        """Parse subtitle file content, sniffing the format when not given"""
+        fmt = fmt or cls.detect_format(content)
+        if fmt == "srt":
+            return cls.from_srt(content, language)
+        elif fmt == "vtt":
+            return cls.from_vtt(content, language)
+        elif fmt == "ass":
+            return cls.from_ass(content, language)
+        raise ValueError(f"Unsupported subtitle format: {fmt}")
+
+    @staticmethod
+    def detect_format(content: str) -> str:
+        head = content.lstrip("\ufeff \t\r\n")[:2048]
+        if head.startswith("WEBVTT"):
+            return "vtt"
+        if "[Script Info]" in head or "[Events]" in head:
+            return "ass"
+        return "srt"
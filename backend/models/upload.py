@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class UploadCreateRequest(BaseModel):
+    filename: str
+    size: int
+    chunk_size: Optional[int] = None
+
+class UploadStatus(BaseModel):
+    upload_id: str
+    filename: str
+    size: int
+    chunk_size: int
+    chunk_count: int
+    received_bytes: int
+    # Byte offsets of chunks still to be sent
+    missing_offsets: List[int]
+    complete: bool
@@ -0,0 +1,317 @@
+import os
+import math
+import time
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+from services import metrics
+
+# How often queued requests re-check memory and CPU while a slot is free
+RESOURCE_POLL_SECONDS = 1.0
+# Resource samples are reused for this long so a burst does not hammer psutil
+SAMPLE_TTL_SECONDS = 1.0
+# Assumed job duration until real ones have been observed
+DEFAULT_JOB_SECONDS = 30.0
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; maps to 429 with Retry-After"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class _Pool:
+    """Concurrency slots for one kind of job, with per-client wait queues"""
+
+    def __init__(self, name: str, slots: int):
+        self.name = name
+        self.slots = max(slots, 1)
+        self.active = 0
+        # Client -> queued waiters; the least recently served client goes first
+        self.waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self.per_client: Dict[str, int] = {}
+        self.last_served: Dict[str, int] = {}
+        self.serial = 0
+        self.avg_seconds = DEFAULT_JOB_SECONDS
+        # Background work (batch items): served after every queued request, never all slots at once
+        self.background: Deque[asyncio.Future] = deque()
+        self.background_active = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self.waiters.values())
+
+class AdmissionController:
+    """Admission control and backpressure for heavy jobs.
+
+    Each pool has a fixed number of slots. A request that finds no free slot,
+    or arrives while memory or CPU load is above its limit, waits in a bounded
+    queue for up to max_wait seconds; past that, or when the queue is full, it
+    is rejected with a Retry-After estimate. Waiters are served round-robin by
+    client, least recently served first, and every client is capped at
+    max_per_client active plus queued requests per pool, so a single client
+    cannot monopolize the server. Background work such as batch items takes
+    the same slots through admit_background, behind every queued request.
+    """
+
+    def __init__(
+        self,
+        slots: Dict[str, int],
+        max_queue: int = 16,
+        max_wait: float = 30.0,
+        max_per_client: int = 2,
+        max_memory_percent: float = 90.0,
+        max_rss_mb: float = 0,
+        max_load_per_cpu: float = 2.0
+    ):
+        self.pools = {name: _Pool(name, count) for name, count in slots.items()}
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.max_per_client = max_per_client
+        self.max_memory_percent = max_memory_percent
+        self.max_rss_mb = max_rss_mb
+        self.max_load_per_cpu = max_load_per_cpu
+        self._sample: Optional[Dict[str, float]] = None
+        self._sampled_at = 0.0
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            slots={
+                "transcribe": int(os.getenv("MAX_CONCURRENT_TRANSCRIPTIONS", "2")),
+                "export": int(os.getenv("MAX_CONCURRENT_EXPORTS", "1"))
+            },
+            max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "16")),
+            max_wait=float(os.getenv("ADMISSION_MAX_WAIT", "30")),
+            max_per_client=int(os.getenv("ADMISSION_MAX_PER_CLIENT", "2")),
+            max_memory_percent=float(os.getenv("ADMISSION_MAX_MEMORY_PERCENT", "90")),
+            max_rss_mb=float(os.getenv("ADMISSION_MAX_RSS_MB", "0")),
+            max_load_per_cpu=float(os.getenv("ADMISSION_MAX_LOAD_PER_CPU", "2.0"))
+        )
+
+    @asynccontextmanager
+    async def admit(self, pool_name: str, client: str):
+        """Hold a slot of the given pool for the duration of the block"""
+        pool = self.pools[pool_name]
+        await self._acquire(pool, client)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(pool, client, time.monotonic() - start)
+
+    @asynccontextmanager
+    async def admit_background(self, pool_name: str):
+        """Hold a slot for background work; waits as long as it takes instead of being rejected.
+
+        A background job starts only when no request is queued for the pool,
+        and together they leave one slot free for requests (when the pool
+        has more than one), so interactive users are never locked out.
+        """
+        pool = self.pools[pool_name]
+        future = asyncio.get_event_loop().create_future()
+        pool.background.append(future)
+        self._dispatch(pool)
+        try:
+            while not future.done():
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), timeout=RESOURCE_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    self._dispatch(pool)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release_background(pool, 0.0)
+            elif future in pool.background:
+                pool.background.remove(future)
+            future.cancel()
+            raise
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release_background(pool, time.monotonic() - start)
+
+    def status(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "slots": pool.slots,
+                "active": pool.active,
+                "queued": pool.queued,
+                "background_active": pool.background_active,
+                "background_queued": len(pool.background),
+                "avg_seconds": round(pool.avg_seconds, 2)
+            }
+            for name, pool in self.pools.items()
+        }
+
+    async def _acquire(self, pool: _Pool, client: str):
+        if pool.per_client.get(client, 0) >= self.max_per_client:
+            self._reject(pool, "client_limit")
+
+        if pool.active < pool.slots and not pool.waiters and self._overload_reason() is None:
+            self._start(pool, client)
+            return
+
+        if sum(p.queued for p in self.pools.values()) >= self.max_queue:
+            self._reject(pool, "queue_full")
+
+        future = asyncio.get_event_loop().create_future()
+        pool.waiters.setdefault(client, deque()).append(future)
+        pool.per_client[client] = pool.per_client.get(client, 0) + 1
+        self._dispatch(pool)
+
+        deadline = time.monotonic() + self.max_wait
+        try:
+            while not future.done():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), timeout=min(remaining, RESOURCE_POLL_SECONDS))
+                except asyncio.TimeoutError:
+                    # A slot may be free while the load was too high; look again
+                    self._dispatch(pool)
+        except asyncio.CancelledError:
+            self._abandon(pool, client, future)
+            raise
+
+        if not future.done():
+            self._abandon(pool, client, future)
+            reason = "overloaded" if pool.active < pool.slots else "timeout"
+            self._reject(pool, reason)
+
+    def _start(self, pool: _Pool, client: str):
+        pool.active += 1
+        pool.per_client[client] = pool.per_client.get(client, 0) + 1
+        self._mark_served(pool, client)
+        self._update_gauges(pool)
+
+    def _mark_served(self, pool: _Pool, client: str):
+        pool.serial += 1
+        pool.last_served[client] = pool.serial
+
+    def _release(self, pool: _Pool, client: str, elapsed: float):
+        pool.active -= 1
+        self._forget_client(pool, client)
+        # Exponential moving average feeds the Retry-After estimate
+        pool.avg_seconds = 0.8 * pool.avg_seconds + 0.2 * elapsed
+        self._dispatch(pool)
+        self._update_gauges(pool)
+
+    def _release_background(self, pool: _Pool, elapsed: float):
+        pool.active -= 1
+        pool.background_active -= 1
+        if elapsed:
+            pool.avg_seconds = 0.8 * pool.avg_seconds + 0.2 * elapsed
+        self._dispatch(pool)
+        self._update_gauges(pool)
+
+    def _abandon(self, pool: _Pool, client: str, future: asyncio.Future):
+        """Drop a waiter that gave up; hand its slot on if it was granted meanwhile"""
+        queue = pool.waiters.get(client)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            if not queue:
+                del pool.waiters[client]
+            self._forget_client(pool, client)
+        elif future.done() and not future.cancelled():
+            pool.active -= 1
+            self._forget_client(pool, client)
+            self._dispatch(pool)
+        future.cancel()
+        self._update_gauges(pool)
+
+    def _dispatch(self, pool: _Pool):
+        """Grant free slots to waiting clients, least recently served first"""
+        while pool.waiters and pool.active < pool.slots:
+            # Always let one job run so other processes cannot stall the queue forever
+            if self._active_total() > 0 and self._overload_reason() is not None:
+                break
+
+            client = min(pool.waiters, key=lambda name: pool.last_served.get(name, 0))
+            queue = pool.waiters[client]
+            future = queue.popleft()
+            if not queue:
+                del pool.waiters[client]
+
+            if future.done():
+                self._forget_client(pool, client)
+                continue
+            pool.active += 1
+            self._mark_served(pool, client)
+            future.set_result(True)
+
+        background_slots = max(pool.slots - 1, 1)
+        while pool.background and not pool.waiters and pool.active < pool.slots and pool.background_active < background_slots:
+            if self._active_total() > 0 and self._overload_reason() is not None:
+                break
+            future = pool.background.popleft()
+            if future.done():
+                continue
+            pool.active += 1
+            pool.background_active += 1
+            future.set_result(True)
+        self._update_gauges(pool)
+
+    def _forget_client(self, pool: _Pool, client: str):
+        count = pool.per_client.get(client, 0) - 1
+        if count > 0:
+            pool.per_client[client] = count
+        else:
+            pool.per_client.pop(client, None)
+            pool.last_served.pop(client, None)
+
+    def _active_total(self) -> int:
+        return sum(pool.active for pool in self.pools.values())
+
+    def _reject(self, pool: _Pool, reason: str):
+        metrics.ADMISSION_REJECTED.inc(pool=pool.name, reason=reason)
+        backlog = pool.queued + pool.active
+        retry_after = math.ceil(pool.avg_seconds * max(backlog, 1) / pool.slots)
+        raise AdmissionRejected(reason, min(max(retry_after, 1), 300))
+
+    def _update_gauges(self, pool: _Pool):
+        metrics.ADMISSION_ACTIVE.set(pool.active, pool=pool.name)
+        metrics.ADMISSION_QUEUED.set(pool.queued, pool=pool.name)
+
+    def _overload_reason(self) -> Optional[str]:
+        """Name of the exceeded resource limit, or None"""
+        sample = self._resources()
+        if not sample:
+            return None
+        if self.max_memory_percent and sample["memory_percent"] > self.max_memory_percent:
+            return "memory"
+        if self.max_rss_mb and sample["rss_mb"] > self.max_rss_mb:
+            return "rss"
+        if self.max_load_per_cpu and sample["load_per_cpu"] > self.max_load_per_cpu:
+            return "cpu"
+        return None
+
+    def _resources(self) -> Optional[Dict[str, float]]:
+        now = time.monotonic()
+        if self._sample is not None and now - self._sampled_at < SAMPLE_TTL_SECONDS:
+            return self._sample
+
+        try:
+            import psutil
+            process = psutil.Process(os.getpid())
+            rss = process.memory_info().rss
+            for child in process.children(recursive=True):
+                try:
+                    rss += child.memory_info().rss
+                except Exception:
+                    pass
+            sample = {
+                "memory_percent": psutil.virtual_memory().percent,
+                "rss_mb": rss / 1024 / 1024,
+                "load_per_cpu": psutil.getloadavg()[0] / (psutil.cpu_count() or 1)
+            }
+        except Exception:
+            # Without psutil admission falls back to slot limits only
+            sample = None
+
+        self._sample, self._sampled_at = sample, now
+        return sample
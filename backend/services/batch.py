@@ -0,0 +1,228 @@
+import os
+import time
+import uuid
+import asyncio
+import functools
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from services import metrics
+from services.admission import AdmissionController, AdmissionRejected
+from services.state import StateBackend, WORKER_ID
+
+# Per-stage limits shared by every batch in this process: downloads are network bound,
+# extraction is FFmpeg (CPU) and STT is a remote API or the local model
+BATCH_DOWNLOAD_CONCURRENCY = int(os.getenv("BATCH_DOWNLOAD_CONCURRENCY", "3"))
+BATCH_EXTRACT_CONCURRENCY = int(os.getenv("BATCH_EXTRACT_CONCURRENCY", "2"))
+BATCH_STT_CONCURRENCY = int(os.getenv("BATCH_STT_CONCURRENCY", "2"))
+# Upper bound on items in one batch, playlist entries included
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+# Batches one client may have running at once; admission control only covers the submitting request
+BATCH_MAX_ACTIVE_PER_CLIENT = int(os.getenv("BATCH_MAX_ACTIVE_PER_CLIENT", "2"))
+
+def expand_playlist(url: str, limit: int = BATCH_MAX_ITEMS) -> List[Dict[str, str]]:
+    """Entry URLs and titles of a yt-dlp playlist (or the single video the URL points to)"""
+    import yt_dlp
+
+    options = {"quiet": True, "no_warnings": True, "extract_flat": "in_playlist", "playlistend": limit}
+    with yt_dlp.YoutubeDL(options) as ydl:
+        info = ydl.extract_info(url, download=False)
+
+    entries = info.get("entries")
+    if entries is None:
+        return [{"source": url, "title": info.get("title") or url}]
+
+    items = []
+    for entry in entries:
+        if not entry:
+            continue
+        entry_url = entry.get("webpage_url") or entry.get("url")
+        if entry_url:
+            items.append({"source": entry_url, "title": entry.get("title") or entry_url})
+        if len(items) >= limit:
+            break
+    return items
+
+class BatchTranscriber:
+    """Transcribe many videos as a pipeline with a concurrency limit per stage.
+
+    Every item moves through download (URLs only), audio extraction and STT;
+    each stage has its own semaphore, so one item can be transcribing while
+    the next is extracting and a third is downloading. The batch is a job in
+    the shared state backend holding a short status per item, so clients
+    poll /api/jobs/{batch_id} for progress; each item's transcription is
+    stored under its own "batch_result" cache key. State writes run in the
+    default executor. With an admission controller, each item's STT also
+    holds a background slot of its "transcribe" pool, so batches count
+    towards the same load as interactive transcriptions and queue behind them.
+    """
+
+    def __init__(
+        self,
+        state: StateBackend,
+        download: Callable[[str], str],
+        extract: Callable[[str], str],
+        transcribe: Callable[[Any, str, str], Dict[str, Any]],
+        cleanup: Callable[[str], Awaitable[None]],
+        download_concurrency: int = BATCH_DOWNLOAD_CONCURRENCY,
+        extract_concurrency: int = BATCH_EXTRACT_CONCURRENCY,
+        stt_concurrency: int = BATCH_STT_CONCURRENCY,
+        max_active_per_client: int = BATCH_MAX_ACTIVE_PER_CLIENT,
+        admission: Optional[AdmissionController] = None
+    ):
+        self.state = state
+        self.download = download
+        self.extract = extract
+        self.transcribe = transcribe
+        self.cleanup = cleanup
+        self.admission = admission
+        self.limits = {
+            "download": max(download_concurrency, 1),
+            "extract": max(extract_concurrency, 1),
+            "stt": max(stt_concurrency, 1),
+            # A local model is one set of weights in this process; items take turns on it
+            "stt_local": 1,
+        }
+        # Created on first use so they belong to the server's event loop
+        self.stages: Dict[str, asyncio.Semaphore] = {}
+        # Running batches, kept referenced so their tasks aren't garbage collected
+        self._tasks: Set[asyncio.Task] = set()
+        self.max_active_per_client = max(max_active_per_client, 1)
+        self.active: Dict[str, int] = {}
+
+    def check_client(self, client: str):
+        """Raise AdmissionRejected if the client already has its maximum of batches running"""
+        if self.active.get(client, 0) >= self.max_active_per_client:
+            raise AdmissionRejected(f"{self.max_active_per_client} batches already running for this client", 60)
+
+    async def start(self, items: List[Dict[str, Any]], model: Any, language: str, client: str) -> str:
+        """Record a batch and start processing it in the background; returns the batch id.
+
+        Items are dicts with "kind" ("url" or "file"), "source" (URL or local
+        path), a display "title" and optionally "keep" for files that must not
+        be deleted afterwards. Callers check_client() first, before accepting uploads.
+        """
+        if not self.stages:
+            self.stages = {stage: asyncio.Semaphore(limit) for stage, limit in self.limits.items()}
+
+        batch_id = uuid.uuid4().hex
+        self.active[client] = self.active.get(client, 0) + 1
+        try:
+            await self._write(
+                batch_id,
+                type="transcribe_batch",
+                status="running",
+                worker=WORKER_ID,
+                started=time.time(),
+                language=language,
+                total=len(items),
+                completed=0,
+                failed=0,
+                items=[{"index": index, "title": item["title"], "status": "queued"} for index, item in enumerate(items)]
+            )
+            task = asyncio.get_event_loop().create_task(self._run(batch_id, items, model, language))
+        except BaseException:
+            self._finish(client)
+            raise
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda _: self._finish(client))
+        return batch_id
+
+    @asynccontextmanager
+    async def _stt_slot(self, model: Any):
+        async with self.stages["stt" if isinstance(model, str) else "stt_local"]:
+            if self.admission is None:
+                yield
+            else:
+                async with self.admission.admit_background("transcribe"):
+                    yield
+
+    def _finish(self, client: str):
+        self.active[client] -= 1
+        if not self.active[client]:
+            del self.active[client]
+
+    async def _write(self, batch_id: str, **fields):
+        await asyncio.get_event_loop().run_in_executor(None, functools.partial(self.state.set_job, batch_id, **fields))
+
+    async def _run(self, batch_id: str, items: List[Dict[str, Any]], model: Any, language: str):
+        statuses = [{"index": index, "title": item["title"], "status": "queued"} for index, item in enumerate(items)]
+        lock = asyncio.Lock()
+
+        async def update(index: Optional[int] = None, **fields):
+            if index is not None:
+                statuses[index].update(fields)
+            async with lock:
+                # Snapshot under the lock so an older list never overwrites a newer one
+                snapshot = [dict(item) for item in statuses]
+                try:
+                    await self._write(
+                        batch_id,
+                        items=snapshot,
+                        completed=sum(item["status"] == "done" for item in snapshot),
+                        failed=sum(item["status"] == "error" for item in snapshot)
+                    )
+                except Exception as e:
+                    # Progress reporting must not fail the item itself
+                    print(f"Failed to record batch {batch_id} progress: {e}")
+
+        metrics.JOBS_IN_FLIGHT.inc(job="transcribe_batch")
+        status = "error"
+        try:
+            await asyncio.gather(*(self._process(batch_id, index, item, model, language, update) for index, item in enumerate(items)))
+            # Partial failures are reported per item; the batch only fails if nothing transcribed
+            if any(item["status"] == "done" for item in statuses):
+                status = "ok"
+        finally:
+            metrics.JOBS_IN_FLIGHT.dec(job="transcribe_batch")
+            metrics.JOBS_TOTAL.inc(job="transcribe_batch", status=status)
+            async with lock:
+                await self._write(batch_id, status=status, finished=time.time())
+
+    async def _process(self, batch_id: str, index: int, item: Dict[str, Any], model: Any, language: str, update: Callable):
+        loop = asyncio.get_event_loop()
+        video_path = audio_path = None
+        started = time.time()
+        try:
+            if item["kind"] == "url":
+                async with self.stages["download"]:
+                    await update(index, status="downloading")
+                    video_path = await loop.run_in_executor(None, self.download, item["source"])
+            else:
+                video_path = item["source"]
+
+            await update(index, status="waiting")
+            async with self.stages["extract"]:
+                await update(index, status="extracting")
+                audio_path = await loop.run_in_executor(None, self.extract, video_path)
+
+            await update(index, status="waiting")
+            async with self._stt_slot(model):
+                await update(index, status="transcribing")
+                result = await loop.run_in_executor(None, self.transcribe, model, audio_path, language)
+
+            segments = [
+                {"start": segment["start"], "end": segment["end"], "text": segment["text"].strip()}
+                for segment in result.get("segments", [])
+            ]
+            # Results live under their own key; the job record only carries short statuses
+            await loop.run_in_executor(
+                None,
+                self.state.cache_set,
+                "batch_result",
+                f"{batch_id}:{index}",
+                {"segments": segments, "language": result.get("language", language), "duration": result.get("duration", 0)}
+            )
+            await update(
+                index,
+                status="done",
+                seconds=round(time.time() - started, 2),
+                result_url=f"/api/transcribe/batch/{batch_id}/items/{index}"
+            )
+        except Exception as e:
+            print(f"Batch item {index} ({item['title']}) failed: {e}")
+            await update(index, status="error", seconds=round(time.time() - started, 2), error=str(getattr(e, "detail", e)))
+        finally:
+            for path in (audio_path, None if item.get("keep") else video_path):
+                if path:
+                    await self.cleanup(path)
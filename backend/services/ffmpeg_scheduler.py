@@ -0,0 +1,237 @@
+import os
+import json
+import heapq
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import ffmpeg
+from services import metrics
+
+# Probes, thumbnails and previews: short, and a user is waiting on them
+INTERACTIVE = "interactive"
+# Full renders: long, and they should use whatever the interactive jobs leave
+EXPORT = "export"
+PRIORITIES = (INTERACTIVE, EXPORT)
+
+class FFmpegScheduler:
+    """Thread budgeting and priorities for FFmpeg processes.
+
+    The machine's cores are a budget of threads. Every job is granted a fixed
+    number of threads (passed to FFmpeg's -threads, -filter_threads and
+    -filter_complex_threads) and only starts once they are free, so concurrent
+    encodes never oversubscribe the CPU. `reserved_cores` are kept for interactive jobs, which are also served
+    before any waiting export, so a probe or thumbnail never queues behind a
+    long render. FFmpeg runs as an asyncio subprocess instead of occupying a
+    thread of the default executor for its whole lifetime.
+
+    The budget belongs to one process. With several uvicorn workers each runs
+    its own scheduler, so from_env splits the cores between them
+    (FFMPEG_WORKERS, else WEB_CONCURRENCY) unless FFMPEG_CORES sets the
+    per-worker budget explicitly.
+    """
+
+    def __init__(
+        self,
+        cores: Optional[int] = None,
+        reserved_cores: Optional[int] = None,
+        interactive_threads: int = 2,
+        export_threads: Optional[int] = None
+    ):
+        self.cores = max(cores or os.cpu_count() or 1, 1)
+        # On one or two cores there is nothing to reserve; priority ordering still applies
+        default_reserved = self.cores // 4 if self.cores > 2 else 0
+        self.reserved_cores = min(max(reserved_cores if reserved_cores is not None else default_reserved, 0), self.cores - 1)
+        export_cores = self.cores - self.reserved_cores
+        self.threads = {
+            INTERACTIVE: max(1, min(interactive_threads, self.cores)),
+            # By default two exports share the non-reserved cores
+            EXPORT: max(1, min(export_threads or export_cores // 2 or 1, export_cores))
+        }
+        self.in_use = {priority: 0 for priority in PRIORITIES}
+        self.active = {priority: 0 for priority in PRIORITIES}
+        self._waiters: List[Tuple[int, int, int, str, asyncio.Future]] = []
+        self._serial = itertools.count()
+        # The server's event loop, for jobs submitted from worker threads
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_env(cls) -> "FFmpegScheduler":
+        reserved = os.getenv("FFMPEG_RESERVED_CORES")
+        export_threads = int(os.getenv("FFMPEG_EXPORT_THREADS", "0"))
+        cores = int(os.getenv("FFMPEG_CORES", "0"))
+        if not cores:
+            # Every worker process has its own scheduler: give each its share of the machine
+            workers = int(os.getenv("FFMPEG_WORKERS") or os.getenv("WEB_CONCURRENCY") or "1")
+            cores = max((os.cpu_count() or 1) // max(workers, 1), 1)
+        return cls(
+            cores=cores,
+            reserved_cores=int(reserved) if reserved else None,
+            interactive_threads=int(os.getenv("FFMPEG_INTERACTIVE_THREADS", "2")),
+            export_threads=export_threads or None
+        )
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Event loop that run_threadsafe queues jobs on; call once the server's loop runs"""
+        self.loop = loop
+
+    def status(self) -> Dict[str, Any]:
+        queued = self._queued()
+        return {
+            "cores": self.cores,
+            "reserved_cores": self.reserved_cores,
+            **{
+                priority: {
+                    "threads_per_job": self.threads[priority],
+                    "active": self.active[priority],
+                    "threads_in_use": self.in_use[priority],
+                    "queued": queued[priority]
+                }
+                for priority in PRIORITIES
+            }
+        }
+
+    @asynccontextmanager
+    async def slot(self, priority: str = EXPORT, threads: Optional[int] = None):
+        """Hold a thread budget for one job; yields the number of threads granted"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown FFmpeg priority: {priority}")
+        threads = max(1, min(threads or self.threads[priority], self._limit(priority)))
+
+        if not self._waiters and self._fits(priority, threads):
+            self._grant(priority, threads)
+        else:
+            future = asyncio.get_event_loop().create_future()
+            heapq.heappush(self._waiters, (PRIORITIES.index(priority), next(self._serial), threads, priority, future))
+            # An interactive job may fit right away even with exports waiting
+            self._dispatch()
+            try:
+                await future
+            except BaseException:
+                if future.done() and not future.cancelled():
+                    # Granted just as we were cancelled: give the threads back
+                    self._release(priority, threads)
+                else:
+                    self._waiters = [waiter for waiter in self._waiters if waiter[4] is not future]
+                    heapq.heapify(self._waiters)
+                    self._dispatch()
+                raise
+
+        try:
+            yield threads
+        finally:
+            self._release(priority, threads)
+
+    async def run(
+        self,
+        build: Callable[[int], Any],
+        priority: str = EXPORT,
+        threads: Optional[int] = None
+    ) -> Tuple[bytes, bytes]:
+        """Run the ffmpeg-python spec returned by build(threads) once its budget is free.
+
+        Returns (stdout, stderr); raises ffmpeg.Error on a non-zero exit like
+        ffmpeg.run does. The process is killed if the caller is cancelled.
+        """
+        async with self.slot(priority, threads) as granted:
+            return await self._exec(self._args(build, granted))
+
+    def run_threadsafe(
+        self,
+        build: Callable[[int], Any],
+        priority: str = EXPORT,
+        threads: Optional[int] = None
+    ) -> Tuple[bytes, bytes]:
+        """run() for code on a worker thread (never the event loop's own); blocks until FFmpeg exits.
+
+        The job queues on the attached loop like any other. Without one
+        (scripts, benchmarks) it starts at once with the same thread count,
+        outside the budget.
+        """
+        if self.loop is not None and self.loop.is_running():
+            try:
+                calling_loop = asyncio.get_running_loop()
+            except RuntimeError:
+                calling_loop = None
+            if calling_loop is self.loop:
+                # Blocking here would wait on the very loop that has to run the job
+                raise RuntimeError("run_threadsafe called on the scheduler's event loop; await run() or use an executor")
+            return asyncio.run_coroutine_threadsafe(self.run(build, priority, threads), self.loop).result()
+        threads = max(1, min(threads or self.threads[priority], self._limit(priority)))
+        return asyncio.run(self._exec(self._args(build, threads)))
+
+    async def probe(self, path: str) -> Dict[str, Any]:
+        """ffprobe as an interactive job; same result as ffmpeg.probe"""
+        async with self.slot(INTERACTIVE, threads=1):
+            args = ["ffprobe", "-v", "error", "-show_format", "-show_streams", "-of", "json", path]
+            stdout, _ = await self._exec(args, cmd="ffprobe")
+        return json.loads(stdout.decode("utf-8"))
+
+    async def _exec(self, args: List[str], cmd: str = "ffmpeg") -> Tuple[bytes, bytes]:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await process.communicate()
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        if process.returncode != 0:
+            raise ffmpeg.Error(cmd, stdout, stderr)
+        return stdout, stderr
+
+    def _args(self, build: Callable[[int], Any], threads: int) -> List[str]:
+        args = build(threads).compile(overwrite_output=True)
+        # .filter() chains compile to -filter_complex, which has its own thread option
+        threading = ["-filter_threads", str(threads), "-filter_complex_threads", str(threads)]
+        return args[:1] + ["-hide_banner", "-nostdin"] + threading + args[1:]
+
+    def _limit(self, priority: str) -> int:
+        return self.cores if priority == INTERACTIVE else self.cores - self.reserved_cores
+
+    def _fits(self, priority: str, threads: int) -> bool:
+        total = sum(self.in_use.values())
+        if priority == EXPORT and self.in_use[EXPORT] + threads > self.cores - self.reserved_cores:
+            return False
+        return total + threads <= self.cores
+
+    def _grant(self, priority: str, threads: int):
+        self.in_use[priority] += threads
+        self.active[priority] += 1
+        self._update_metrics()
+
+    def _release(self, priority: str, threads: int):
+        self.in_use[priority] -= threads
+        self.active[priority] -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Start waiters in priority order; an export never jumps a waiting interactive job"""
+        while self._waiters:
+            _, _, threads, priority, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._fits(priority, threads):
+                break
+            heapq.heappop(self._waiters)
+            self._grant(priority, threads)
+            future.set_result(threads)
+        self._update_metrics()
+
+    def _queued(self) -> Dict[str, int]:
+        queued = {priority: 0 for priority in PRIORITIES}
+        for _, _, _, priority, future in self._waiters:
+            if not future.done():
+                queued[priority] += 1
+        return queued
+
+    def _update_metrics(self):
+        queued = self._queued()
+        for priority in PRIORITIES:
+            metrics.FFMPEG_THREADS.set(self.in_use[priority], priority=priority)
+            metrics.FFMPEG_QUEUED.set(queued[priority], priority=priority)
@@ -0,0 +1,194 @@
+import os
+import json
+import uuid
+import shutil
+import asyncio
+import hashlib
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from services.video_processor import VideoProcessor, KEYFRAME_INTERVAL
+from services.state import StateBackend, file_fingerprint, unique_suffix
+from services import metrics
+
+# Past this share of changed segments a full re-encode costs about the same
+MAX_DIRTY_FRACTION = 0.5
+
+class IncrementalExporter:
+    """Re-export subtitled videos by re-encoding only the GOP ranges whose cues changed.
+
+    Every export records a render manifest in the shared state backend: the
+    source fingerprint, render settings, cue list and keyframe interval of the
+    output. The first export of a source keeps the encoder's own keyframes;
+    a second one is rendered in full with a keyframe every KEYFRAME_INTERVAL
+    seconds. From then on the new cues are diffed against the manifest,
+    keyframe-bounded ranges touched by a changed cue are re-encoded from the
+    source, everything else is stream-copied out of the previous export, and
+    the splice is only kept if it decodes frame-exact (see verify_splice).
+    """
+
+    def __init__(self, video_processor: VideoProcessor, state: StateBackend, work_dir: str = "temp/renders"):
+        self.video_processor = video_processor
+        self.state = state
+        self.work_dir = work_dir
+        os.makedirs(self.work_dir, exist_ok=True)
+
+    async def export(self, video_path: str, subtitle_path: str, subtitles: List[dict], settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Export with burned-in subtitles, reusing the previous render of this source when possible"""
+        loop = asyncio.get_event_loop()
+        key = await loop.run_in_executor(None, self.render_key, video_path, settings)
+        cues = self._cue_list(subtitles)
+        manifest = self._load_manifest(key)
+
+        result = None
+        if manifest:
+            try:
+                result = await self._export_incremental(video_path, subtitle_path, settings, manifest, cues)
+            except Exception as e:
+                print(f"Incremental export failed, falling back to a full render: {e}")
+        metrics.record_cache("render", result is not None)
+
+        keyframe_interval = KEYFRAME_INTERVAL
+        if result is None:
+            # Keyframes are forced only once this source has been exported before:
+            # a re-export is then likely, and one-off exports keep the encoder's own GOPs
+            keyframe_interval = KEYFRAME_INTERVAL if manifest else None
+            output_path = await self.video_processor.burn_subtitles(
+                video_path, subtitle_path, settings, keyframe_interval=keyframe_interval
+            )
+            result = {"output_path": output_path, "mode": "full", "reencoded_segments": None, "total_segments": None}
+
+        self._save_manifest(key, result["output_path"], cues, settings, keyframe_interval)
+        return result
+
+    def render_key(self, video_path: str, settings: Dict[str, Any]) -> str:
+        """Identify a (source, settings) pair without hashing the whole video"""
+        digest = hashlib.sha256()
+        digest.update(file_fingerprint(video_path).encode())
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        digest.update(str(KEYFRAME_INTERVAL).encode())
+        return digest.hexdigest()[:32]
+
+    def dirty_segments(self, old_cues: List[list], new_cues: List[list], segment_count: int) -> List[int]:
+        """Indexes of the keyframe-bounded segments in which any cue was added, removed or edited"""
+        old = Counter(tuple(cue) for cue in old_cues)
+        new = Counter(tuple(cue) for cue in new_cues)
+        changed = (old - new) + (new - old)
+
+        dirty = set()
+        for start, end, _ in changed:
+            first = int(max(start, 0) // KEYFRAME_INTERVAL)
+            last = int(max(end, start) // KEYFRAME_INTERVAL)
+            dirty.update(range(first, min(last, segment_count - 1) + 1))
+        return sorted(index for index in dirty if index < segment_count)
+
+    async def _export_incremental(
+        self,
+        video_path: str,
+        subtitle_path: str,
+        settings: Dict[str, Any],
+        manifest: Dict[str, Any],
+        cues: List[list]
+    ) -> Optional[Dict[str, Any]]:
+        previous_output = manifest.get("output")
+        if manifest.get("keyframe_interval") != KEYFRAME_INTERVAL or not previous_output or not os.path.exists(previous_output):
+            return None
+
+        work_dir = os.path.join(self.work_dir, f"work_{uuid.uuid4().hex}")
+        try:
+            segments = await self.video_processor.split_video_segments(previous_output, os.path.join(work_dir, "previous"))
+            if not segments:
+                return None
+
+            dirty = self.dirty_segments(manifest.get("cues", []), cues, len(segments))
+            if len(dirty) > len(segments) * MAX_DIRTY_FRACTION:
+                print(f"Incremental export: {len(dirty)}/{len(segments)} segments changed, doing a full render")
+                return None
+
+            print(f"Incremental export: re-encoding {len(dirty)}/{len(segments)} segments")
+
+            async def reencode(index: int) -> Tuple[int, str]:
+                last = index == len(segments) - 1
+                path = await self.video_processor.encode_video_segment(
+                    video_path,
+                    subtitle_path,
+                    settings,
+                    start=index * KEYFRAME_INTERVAL,
+                    duration=None if last else KEYFRAME_INTERVAL,
+                    output_path=os.path.join(work_dir, f"edited_{index:05d}.mp4")
+                )
+                return index, path
+
+            for index, path in await asyncio.gather(*(reencode(index) for index in dirty)):
+                segments[index] = path
+
+            video_name = Path(video_path).stem
+            output_path = os.path.join(
+                self.video_processor.output_dir,
+                f"{video_name}_with_subtitles_{unique_suffix()}.mp4"
+            )
+            await self.video_processor.concat_video_segments(segments, previous_output, output_path)
+            try:
+                await self.verify_splice(previous_output, output_path, dirty)
+            except Exception:
+                os.remove(output_path)
+                raise
+
+            return {
+                "output_path": output_path,
+                "mode": "incremental",
+                "reencoded_segments": len(dirty),
+                "total_segments": len(segments)
+            }
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    async def verify_splice(self, previous_output: str, output_path: str, dirty: List[int]):
+        """Check that the spliced export decodes frame-exact against the render it was cut from.
+
+        Both files are decoded: the splice must decode without errors, have the
+        same frames at the same timestamps, and match the previous render pixel
+        for pixel outside the re-encoded segments. Segment boundaries with
+        differing SPS/PPS or edit lists show up here as decode errors, dropped
+        or shifted frames.
+        """
+        (old_base, old_frames), (new_base, new_frames) = await asyncio.gather(
+            self.video_processor.frame_digests(previous_output),
+            self.video_processor.frame_digests(output_path)
+        )
+        if old_base != new_base or len(old_frames) != len(new_frames):
+            raise Exception(f"splice has {len(new_frames)} frames, previous render {len(old_frames)}")
+
+        dirty_segments = set(dirty)
+        for (old_pts, old_duration, old_digest), (new_pts, new_duration, new_digest) in zip(old_frames, new_frames):
+            if (old_pts, old_duration) != (new_pts, new_duration):
+                raise Exception(f"splice frame timing differs at pts {old_pts}")
+            segment = int((old_pts * old_base + 1e-6) // KEYFRAME_INTERVAL)
+            if segment not in dirty_segments and old_digest != new_digest:
+                raise Exception(f"splice frame at {old_pts * old_base:.3f}s differs outside the re-encoded segments")
+
+    def _cue_list(self, subtitles: List[dict]) -> List[list]:
+        return [[round(float(sub["startTime"]), 3), round(float(sub["endTime"]), 3), sub["text"]] for sub in subtitles]
+
+    def _load_manifest(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.state.cache_get("render", key)
+        except Exception as e:
+            print(f"Ignoring unreadable render manifest {key}: {e}")
+            return None
+
+    def _save_manifest(
+        self,
+        key: str,
+        output_path: str,
+        cues: List[list],
+        settings: Dict[str, Any],
+        keyframe_interval: Optional[float]
+    ):
+        self.state.cache_set("render", key, {
+            "output": output_path,
+            "cues": cues,
+            "settings": settings,
+            # None: no forced keyframes, so the next export renders in full (with them)
+            "keyframe_interval": keyframe_interval
+        })
@@ -0,0 +1,223 @@
+import sys
+import wave
+import asyncio
+from typing import Callable, Dict, Any, List, Optional
+from services.live_transcriber import LiveTranscriber, SAMPLE_RATE, SAMPLE_WIDTH, BYTES_PER_SECOND
+
+# Single-file formats only: yt-dlp can't merge separate video and audio streams into a pipe.
+# Audio-only comes first since nothing downstream needs the picture.
+STREAM_FORMAT = "bestaudio/best[height<=720]/best"
+
+READ_SIZE = 64 * 1024
+# Stream head inspected for an MP4 index before anything is decoded
+SNIFF_BYTES = 4 * 1024 * 1024
+
+class IngestError(Exception):
+    """The streaming pipeline failed; callers fall back to download-then-extract.
+
+    `segments` (start/end/text) are the cues already final when it failed,
+    covering the first `transcribed_seconds` of audio, so a fallback only has
+    to transcribe the rest.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        segments: Optional[List[Dict[str, Any]]] = None,
+        transcribed_seconds: float = 0.0,
+        language: Optional[str] = None
+    ):
+        super().__init__(message)
+        self.segments = segments or []
+        self.transcribed_seconds = transcribed_seconds
+        self.language = language
+
+def mp4_streamable(head: bytes) -> Optional[bool]:
+    """Whether a stream starting with `head` can be decoded as it arrives; None if undecided yet.
+
+    MP4/MOV files with the index (moov) after the media data (mdat) need the
+    whole file before the first sample decodes. Other containers, and
+    fragmented MP4, decode progressively.
+    """
+    if len(head) < 8:
+        return None
+    if head[4:8] != b"ftyp":
+        return True
+    position = 0
+    while position + 8 <= len(head):
+        size = int.from_bytes(head[position:position + 4], "big")
+        kind = head[position + 4:position + 8]
+        if kind in (b"moov", b"moof"):
+            return True
+        if kind == b"mdat":
+            return False
+        if size == 1:
+            if position + 16 > len(head):
+                return None
+            size = int.from_bytes(head[position + 8:position + 16], "big")
+        if size < 8:
+            # Box runs to the end of the file or is malformed; let FFmpeg decide
+            return True
+        position += size
+    return None
+
+class StreamingIngest:
+    """Transcribe a video URL while it is still downloading.
+
+    yt-dlp writes the media to a pipe, FFmpeg decodes it to 16 kHz mono PCM
+    as it arrives, and about every `chunk_seconds` of audio (cut at a quiet
+    point) is transcribed while the rest keeps downloading. An MP4 whose
+    index comes last is rejected from its first bytes, before any STT. The PCM is also kept as a WAV file (the same
+    format extract_audio produces) for anything that needs the full audio.
+    """
+
+    def __init__(
+        self,
+        transcribe: Callable[[str, str], Dict[str, Any]],
+        language: str = "en",
+        chunk_seconds: float = 30.0,
+        work_dir: str = "temp"
+    ):
+        self.transcribe = transcribe
+        self.language = language
+        self.chunk_seconds = chunk_seconds
+        self.work_dir = work_dir
+
+    async def run(self, url: str, audio_path: str) -> Dict[str, Any]:
+        """Download, decode and transcribe `url`; returns a transcription result like transcribe_audio"""
+        transcriber = LiveTranscriber(
+            self.transcribe,
+            language=self.language,
+            window_seconds=self.chunk_seconds,
+            partial_interval=0,
+            work_dir=self.work_dir,
+            split_at_silence=True
+        )
+
+        downloader = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "yt_dlp", "--quiet", "--no-warnings", "--no-part",
+            "-f", STREAM_FORMAT, "-o", "-", url,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        decoder = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+            "-vn", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+
+        downloader_errors = asyncio.create_task(downloader.stderr.read())
+        decoder_errors = asyncio.create_task(decoder.stderr.read())
+
+        async def forward_media():
+            """Copy the download into the decoder, refusing sources that can't decode until complete"""
+            head = bytearray()
+            streamable = None
+            try:
+                while True:
+                    data = await downloader.stdout.read(READ_SIZE)
+                    if not data:
+                        break
+                    if streamable is None:
+                        head.extend(data)
+                        streamable = mp4_streamable(bytes(head[:SNIFF_BYTES]))
+                        if streamable is None and len(head) < SNIFF_BYTES:
+                            continue
+                        if streamable is False:
+                            # Nothing has been decoded or transcribed yet
+                            raise IngestError("Streaming ingest not possible: MP4 index is at the end of the file")
+                        streamable = True
+                        data = bytes(head)
+                    decoder.stdin.write(data)
+                    await decoder.stdin.drain()
+                if streamable is None and head:
+                    decoder.stdin.write(bytes(head))
+                    await decoder.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                # The decoder exited; its exit code reports why
+                pass
+            finally:
+                decoder.stdin.close()
+
+        forwarder = asyncio.create_task(forward_media())
+
+        # The reader never waits for STT, so a slow chunk doesn't stall the download
+        chunks: asyncio.Queue = asyncio.Queue()
+
+        async def read_audio():
+            with wave.open(audio_path, "wb") as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(SAMPLE_WIDTH)
+                wav_file.setframerate(SAMPLE_RATE)
+                try:
+                    while True:
+                        chunk = await decoder.stdout.read(READ_SIZE)
+                        if not chunk:
+                            break
+                        wav_file.writeframes(chunk)
+                        await chunks.put(chunk)
+                finally:
+                    await chunks.put(None)
+
+        reader = asyncio.create_task(read_audio())
+        segments: List[Dict[str, Any]] = []
+        total_bytes = 0
+
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                total_bytes += len(chunk)
+                transcriber.feed(chunk)
+                # Only whole chunks decode here; the tail is flushed once the stream ends
+                for event in await transcriber.poll(partials=False):
+                    segments.extend(event["segments"])
+
+            await reader
+            await forwarder
+            download_code = await downloader.wait()
+            decode_code = await decoder.wait()
+            if download_code != 0 or decode_code != 0 or total_bytes == 0:
+                detail = (await downloader_errors or await decoder_errors or b"no audio decoded").decode(errors="replace")
+                raise IngestError(
+                    f"Streaming ingest failed: {detail.strip()[-500:]}",
+                    segments=self._segments(segments),
+                    transcribed_seconds=transcriber.finalized_seconds,
+                    language=self._language(segments)
+                )
+
+            for event in await transcriber.flush():
+                segments.extend(event["segments"])
+        except BaseException:
+            for process in (downloader, decoder):
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+            reader.cancel()
+            forwarder.cancel()
+            raise
+        finally:
+            downloader_errors.cancel()
+            decoder_errors.cancel()
+
+        return {
+            "segments": self._segments(segments),
+            "language": self._language(segments),
+            "duration": total_bytes / BYTES_PER_SECOND
+        }
+
+    @staticmethod
+    def _segments(segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {"start": segment["start_time"], "end": segment["end_time"], "text": segment["text"]}
+            for segment in segments
+        ]
+
+    def _language(self, segments: List[Dict[str, Any]]) -> Optional[str]:
+        for segment in segments:
+            if segment.get("language"):
+                return segment["language"]
+        return self.language
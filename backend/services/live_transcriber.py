@@ -0,0 +1,158 @@
+import os
+import uuid
+import wave
+import asyncio
+from typing import Callable, Dict, Any, List
+import numpy as np
+from models.subtitle import SubtitleSegment
+from services import profiler
+from services.stt_audio import quietest_point, SPLIT_SEARCH_SECONDS
+
+# Live audio is expected as raw 16 kHz mono pcm_s16le, the same format extract_audio produces
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+BYTES_PER_SECOND = SAMPLE_RATE * SAMPLE_WIDTH
+
+class LiveTranscriber:
+    """Incrementally transcribe a stream of PCM audio chunks into subtitle cues.
+
+    Audio is decoded in fixed windows. While a window is filling up it is
+    re-transcribed every `partial_interval` seconds and reported as partial
+    cues; once it is full its cues are finalized and the window advances.
+    With `split_at_silence`, a full window ends at the quietest point of its
+    last seconds instead, so words aren't cut at window boundaries; the
+    remainder starts the next window.
+    """
+
+    def __init__(
+        self,
+        transcribe: Callable[[str, str], Dict[str, Any]],
+        language: str = "en",
+        window_seconds: float = 10.0,
+        partial_interval: float = 3.0,
+        work_dir: str = "temp",
+        split_at_silence: bool = False
+    ):
+        self.transcribe = transcribe
+        self.language = language
+        self.work_dir = work_dir
+        self.window_bytes = self._to_bytes(window_seconds)
+        self.partial_bytes = self._to_bytes(partial_interval) if partial_interval > 0 else 0
+        self.split_at_silence = split_at_silence
+
+        self._pending = bytearray()
+        self._offset = 0.0  # Stream time (seconds) at the start of the pending window
+        self._partial_mark = 0
+        self._cue_count = 0
+
+    @staticmethod
+    def _to_bytes(seconds: float) -> int:
+        # Keep windows aligned to whole samples
+        return int(seconds * SAMPLE_RATE) * SAMPLE_WIDTH
+
+    @property
+    def buffered_bytes(self) -> int:
+        return len(self._pending)
+
+    @property
+    def finalized_seconds(self) -> float:
+        """Stream time up to which cues are final"""
+        return self._offset
+
+    def feed(self, chunk: bytes):
+        """Append raw PCM audio to the pending window"""
+        self._pending.extend(chunk)
+
+    async def poll(self, partials: bool = True) -> List[Dict[str, Any]]:
+        """Decode whatever the buffered audio allows and return the resulting events"""
+        events = []
+
+        while len(self._pending) >= self.window_bytes:
+            cut = self._window_end()
+            window = bytes(self._pending[:cut])
+            del self._pending[:cut]
+            events.append(await self._decode(window, final=True))
+            self._offset += cut / BYTES_PER_SECOND
+            self._partial_mark = 0
+
+        if partials and self.partial_bytes and len(self._pending) - self._partial_mark >= self.partial_bytes:
+            self._partial_mark = len(self._pending)
+            events.append(await self._decode(bytes(self._pending), final=False))
+
+        return events
+
+    async def flush(self) -> List[Dict[str, Any]]:
+        """Finalize the remaining audio at the end of the stream"""
+        events = await self.poll(partials=False)
+
+        if len(self._pending) >= SAMPLE_WIDTH:
+            window = bytes(self._pending)
+            self._pending.clear()
+            events.append(await self._decode(window, final=True))
+            self._offset += len(window) / BYTES_PER_SECOND
+
+        return events
+
+    def _window_end(self) -> int:
+        """Byte length of the next full window"""
+        if not self.split_at_silence:
+            return self.window_bytes
+        samples = np.frombuffer(bytes(self._pending[:self.window_bytes]), dtype="<i2")
+        window_seconds = self.window_bytes / BYTES_PER_SECOND
+        cut = quietest_point(samples, SAMPLE_RATE, window_seconds - min(SPLIT_SEARCH_SECONDS, window_seconds / 2), window_seconds)
+        return max(self._to_bytes(cut), SAMPLE_WIDTH)
+
+    async def _decode(self, pcm: bytes, final: bool) -> Dict[str, Any]:
+        """Transcribe one window of audio and convert it to SubtitleSegment-shaped cues"""
+        duration = len(pcm) / BYTES_PER_SECOND
+        wav_path = os.path.join(self.work_dir, f"live_{uuid.uuid4().hex}.wav")
+
+        def transcribe_window():
+            with wave.open(wav_path, "wb") as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(SAMPLE_WIDTH)
+                wav_file.setframerate(SAMPLE_RATE)
+                wav_file.writeframes(pcm)
+            try:
+                return self.transcribe(wav_path, self.language)
+            finally:
+                if os.path.exists(wav_path):
+                    os.remove(wav_path)
+
+        # The request's profile follows into the thread, so STT stages are recorded
+        result = await profiler.run_in_executor(transcribe_window)
+
+        segments = []
+        for index, segment in enumerate(result.get("segments", [])):
+            text = segment["text"].strip()
+            if not text:
+                continue
+
+            # Some backends return no timings; stretch those cues over the window
+            start = max(float(segment["start"]), 0.0)
+            if start >= duration:
+                continue
+            end = min(float(segment["end"]), duration)
+            if end <= start:
+                end = duration
+
+            if final:
+                self._cue_count += 1
+                cue_id = f"live-{self._cue_count}"
+            else:
+                cue_id = f"partial-{index + 1}"
+
+            segments.append(SubtitleSegment(
+                id=cue_id,
+                start_time=round(self._offset + start, 3),
+                end_time=round(self._offset + end, 3),
+                text=text,
+                language=result.get("language") or self.language
+            ).model_dump())
+
+        return {
+            "type": "final" if final else "partial",
+            "window_start": round(self._offset, 3),
+            "window_end": round(self._offset + duration, 3),
+            "segments": segments
+        }
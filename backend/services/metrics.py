@@ -0,0 +1,249 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+from services import profiler
+
+# Latency buckets (seconds) spanning quick probes up to long exports
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """Base class for a labelled metric family"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(float(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Process-local registry rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        lines.extend(_process_metrics())
+        return "\n".join(lines) + "\n"
+
+def _process_metrics() -> List[str]:
+    """Process memory and CPU, sampled at scrape time rather than on the hot path"""
+    try:
+        import psutil
+        process = psutil.Process(os.getpid())
+        memory = process.memory_info()
+        cpu = process.cpu_times()
+        children = process.children(recursive=True)
+    except Exception:
+        return []
+
+    child_rss = 0
+    for child in children:
+        try:
+            child_rss += child.memory_info().rss
+        except Exception:
+            pass
+
+    return [
+        "# HELP process_resident_memory_bytes Resident memory size in bytes.",
+        "# TYPE process_resident_memory_bytes gauge",
+        f"process_resident_memory_bytes {memory.rss}",
+        "# HELP process_virtual_memory_bytes Virtual memory size in bytes.",
+        "# TYPE process_virtual_memory_bytes gauge",
+        f"process_virtual_memory_bytes {memory.vms}",
+        "# HELP process_cpu_seconds_total Total user and system CPU time spent in seconds.",
+        "# TYPE process_cpu_seconds_total counter",
+        f"process_cpu_seconds_total {cpu.user + cpu.system}",
+        "# HELP process_children_resident_memory_bytes Resident memory of child processes (FFmpeg) in bytes.",
+        "# TYPE process_children_resident_memory_bytes gauge",
+        f"process_children_resident_memory_bytes {child_rss}",
+        "# HELP process_children Number of running child processes.",
+        "# TYPE process_children gauge",
+        f"process_children {len(children)}",
+    ]
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "subtitle_stage_duration_seconds",
+    "Time spent in each pipeline stage.",
+    ["stage"]
+)
+STAGE_TOTAL = registry.counter(
+    "subtitle_stage_total",
+    "Pipeline stage executions by outcome.",
+    ["stage", "status"]
+)
+JOBS_IN_FLIGHT = registry.gauge(
+    "subtitle_jobs_in_flight",
+    "Jobs currently being processed.",
+    ["job"]
+)
+JOBS_TOTAL = registry.counter(
+    "subtitle_jobs_total",
+    "Finished jobs by outcome.",
+    ["job", "status"]
+)
+CACHE_REQUESTS = registry.counter(
+    "subtitle_cache_requests_total",
+    "Cache lookups by cache and result (hit or miss).",
+    ["cache", "result"]
+)
+ADMISSION_ACTIVE = registry.gauge(
+    "subtitle_admission_active",
+    "Jobs holding an admission slot.",
+    ["pool"]
+)
+ADMISSION_QUEUED = registry.gauge(
+    "subtitle_admission_queued",
+    "Requests waiting for an admission slot.",
+    ["pool"]
+)
+FFMPEG_THREADS = registry.gauge(
+    "subtitle_ffmpeg_threads",
+    "FFmpeg threads granted by the scheduler.",
+    ["priority"]
+)
+FFMPEG_QUEUED = registry.gauge(
+    "subtitle_ffmpeg_queued",
+    "FFmpeg jobs waiting for a thread budget.",
+    ["priority"]
+)
+STT_UPLOAD_BYTES = registry.counter(
+    "subtitle_stt_upload_bytes_total",
+    "Audio bytes prepared for remote speech-to-text, as PCM and as actually encoded.",
+    ["backend", "audio"]
+)
+ADMISSION_REJECTED = registry.counter(
+    "subtitle_admission_rejected_total",
+    "Requests turned away with 429 by reason.",
+    ["pool", "reason"]
+)
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage (upload, download, extract_audio, stt, translation, encode, ...)
+
+    Also records the stage on the request's resource profile when profiling is on.
+    """
+    start = time.perf_counter()
+    status = "error"
+    try:
+        with profiler.profile_stage(name):
+            yield
+        status = "ok"
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+        STAGE_TOTAL.inc(stage=name, status=status)
+
+def record_cache(cache: str, hit: bool):
+    """Record a cache lookup; hit rate = hit / (hit + miss)"""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+def render_metrics() -> str:
+    return registry.render()
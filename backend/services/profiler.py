@@ -0,0 +1,222 @@
+import os
+import time
+import uuid
+import asyncio
+import functools
+import resource
+import threading
+import tracemalloc
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+# How often the sampler thread reads RSS of the process and its children
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.05"))
+# Allocation sites reported per stage
+TOP_ALLOCATIONS = int(os.getenv("PROFILE_TOP_ALLOCATIONS", "10"))
+
+_current: contextvars.ContextVar = contextvars.ContextVar("request_profile", default=None)
+
+# tracemalloc is process-wide; it runs while at least one profiled request is active
+_tracemalloc_users = 0
+# Only tracing the profiler started itself is stopped; someone else's (-X tracemalloc, a debugger) is left alone
+_tracemalloc_started = False
+_tracemalloc_lock = threading.Lock()
+
+def _mb(value: Optional[float]) -> Optional[float]:
+    return round(value / 1024 / 1024, 1) if value is not None else None
+
+def _cpu(usage) -> float:
+    return usage.ru_utime + usage.ru_stime
+
+def _rss() -> Dict[str, Optional[int]]:
+    """Current RSS of this process and the sum over its live children (FFmpeg)"""
+    try:
+        import psutil
+        process = psutil.Process(os.getpid())
+        children = 0
+        for child in process.children(recursive=True):
+            try:
+                children += child.memory_info().rss
+            except Exception:
+                pass
+        return {"rss": process.memory_info().rss, "children_rss": children}
+    except Exception:
+        return {"rss": None, "children_rss": None}
+
+def _snapshot() -> Optional[tracemalloc.Snapshot]:
+    if not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        # The sampler thread's own psutil reads
+        tracemalloc.Filter(False, "*/psutil/*"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ])
+
+def _top_allocations(before: Optional[tracemalloc.Snapshot], after: Optional[tracemalloc.Snapshot]) -> List[Dict[str, Any]]:
+    """Allocation sites that grew the most between two snapshots"""
+    if before is None or after is None:
+        return []
+    sites = []
+    for stat in after.compare_to(before, "lineno")[:TOP_ALLOCATIONS]:
+        if stat.size_diff <= 0:
+            break
+        frame = stat.traceback[0]
+        sites.append({
+            "site": f"{frame.filename}:{frame.lineno}",
+            "size_kb": round(stat.size_diff / 1024, 1),
+            "count": stat.count_diff
+        })
+    return sites
+
+class _Span:
+    """Resource usage between entering and leaving a stage (or the whole request)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.cpu = _cpu(resource.getrusage(resource.RUSAGE_SELF))
+        self.children_cpu = _cpu(resource.getrusage(resource.RUSAGE_CHILDREN))
+        self.snapshot = _snapshot()
+        self.peak_rss: Optional[int] = None
+        self.peak_children_rss: Optional[int] = None
+
+    def observe(self, sample: Dict[str, Optional[int]]):
+        if sample["rss"] is not None:
+            self.peak_rss = max(self.peak_rss or 0, sample["rss"])
+            self.peak_children_rss = max(self.peak_children_rss or 0, sample["children_rss"])
+
+    def finish(self) -> Dict[str, Any]:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return {
+            "name": self.name,
+            "wall_seconds": round(time.perf_counter() - self.started, 4),
+            # Process-wide, so concurrent requests inflate it
+            "cpu_seconds": round(_cpu(resource.getrusage(resource.RUSAGE_SELF)) - self.cpu, 4),
+            # Only counts children that exited (FFmpeg runs to completion inside a stage)
+            "children_cpu_seconds": round(_cpu(children) - self.children_cpu, 4),
+            "peak_rss_mb": _mb(self.peak_rss),
+            "peak_children_rss_mb": _mb(self.peak_children_rss),
+            "top_allocations": _top_allocations(self.snapshot, _snapshot())
+        }
+
+class RequestProfile:
+    """Resource profile of one request, broken down by pipeline stage.
+
+    A sampler thread polls RSS of the process and its children so every open
+    span keeps its own peak; CPU comes from getrusage deltas and allocation
+    sites from tracemalloc snapshots taken at span boundaries.
+    """
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.stages: List[Dict[str, Any]] = []
+        self._open: List[_Span] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._request: Optional[_Span] = None
+
+    def start(self):
+        global _tracemalloc_users, _tracemalloc_started
+        with _tracemalloc_lock:
+            if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracemalloc_started = True
+            _tracemalloc_users += 1
+
+        self._request = self._open_span("request")
+        self._sampler = threading.Thread(target=self._sample_loop, name=f"profiler-{self.id[:8]}", daemon=True)
+        self._sampler.start()
+
+    def finish(self, status_code: Optional[int] = None) -> Dict[str, Any]:
+        global _tracemalloc_users, _tracemalloc_started
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self._sample()
+        report = self._close_span(self._request)
+
+        with _tracemalloc_lock:
+            _tracemalloc_users -= 1
+            if _tracemalloc_users == 0 and _tracemalloc_started:
+                tracemalloc.stop()
+                _tracemalloc_started = False
+
+        report.pop("name")
+        report.update({
+            "profile_id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": status_code,
+            "children_max_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+            "stages": self.stages
+        })
+        return report
+
+    @contextmanager
+    def stage(self, name: str):
+        span = self._open_span(name)
+        try:
+            yield
+        finally:
+            self.stages.append(self._close_span(span))
+
+    def server_timing(self, report: Dict[str, Any]) -> str:
+        """Server-Timing header value (durations in ms) for browser devtools"""
+        entries = [f"{stage['name']};dur={stage['wall_seconds'] * 1000:.1f}" for stage in self.stages]
+        entries.append(f"total;dur={report['wall_seconds'] * 1000:.1f}")
+        return ", ".join(entries)
+
+    def _open_span(self, name: str) -> _Span:
+        span = _Span(name)
+        span.observe(_rss())
+        with self._lock:
+            self._open.append(span)
+        return span
+
+    def _close_span(self, span: _Span) -> Dict[str, Any]:
+        span.observe(_rss())
+        with self._lock:
+            self._open.remove(span)
+        return span.finish()
+
+    def _sample(self):
+        sample = _rss()
+        with self._lock:
+            for span in self._open:
+                span.observe(sample)
+
+    def _sample_loop(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            self._sample()
+
+def begin(method: str, path: str) -> RequestProfile:
+    """Attach a profile to the current request; stages entered from this context are recorded.
+
+    The caller then runs profile.start() in an executor: it may start
+    tracemalloc and takes a full snapshot, which would stall the event loop.
+    """
+    profile = RequestProfile(method, path)
+    _current.set(profile)
+    return profile
+
+async def run_in_executor(func: Callable, *args, executor=None) -> Any:
+    """loop.run_in_executor that carries the caller's context (request profile, job id) into the thread"""
+    call = functools.partial(contextvars.copy_context().run, func, *args)
+    return await asyncio.get_event_loop().run_in_executor(executor, call)
+
+@contextmanager
+def profile_stage(name: str):
+    """Record a stage on the active request profile, if any"""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    with profile.stage(name):
+        yield
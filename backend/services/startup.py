@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+from services import metrics
+
+# Dependencies that cost seconds and hundreds of MB to import; they should only
+# show up once a request actually needs the backend that uses them
+HEAVY_MODULES = (
+    "torch",
+    "whisper",
+    "transformers",
+    "librosa",
+    "openai",
+    "yt_dlp",
+    "deepl",
+    "googletrans",
+    "speech_recognition",
+    "google.cloud.speech",
+)
+
+STARTUP_SECONDS = metrics.registry.gauge(
+    "subtitle_startup_seconds",
+    "Cold start timings: module import and process start to ready.",
+    ["phase"]
+)
+
+def heavy_modules_loaded() -> List[str]:
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+class StartupReport:
+    """Import and startup timings of the API process"""
+
+    def __init__(self):
+        self.import_seconds: Optional[float] = None
+        self.ready_seconds: Optional[float] = None
+
+    def mark_imported(self, started: float):
+        """Record the import time of the app module, given perf_counter() at its first line"""
+        self.import_seconds = time.perf_counter() - started
+        STARTUP_SECONDS.set(round(self.import_seconds, 4), phase="import")
+
+    def mark_ready(self):
+        """Record time from process start (interpreter boot included) until the app can serve"""
+        try:
+            import psutil
+            self.ready_seconds = time.time() - psutil.Process(os.getpid()).create_time()
+            STARTUP_SECONDS.set(round(self.ready_seconds, 4), phase="ready")
+        except Exception:
+            self.ready_seconds = None
+
+    def report(self) -> Dict[str, Any]:
+        rss_mb = None
+        try:
+            import psutil
+            rss_mb = round(psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024, 1)
+        except Exception:
+            pass
+
+        return {
+            "import_seconds": round(self.import_seconds, 3) if self.import_seconds is not None else None,
+            "ready_seconds": round(self.ready_seconds, 3) if self.ready_seconds is not None else None,
+            "rss_mb": rss_mb,
+            "module_count": len(sys.modules),
+            "heavy_modules_loaded": heavy_modules_loaded()
+        }
+
+    def summary(self) -> str:
+        report = self.report()
+        heavy = ", ".join(report["heavy_modules_loaded"]) or "none"
+        return (
+            f"Startup: import {report['import_seconds']}s, ready {report['ready_seconds']}s, "
+            f"RSS {report['rss_mb']} MB, {report['module_count']} modules, heavy modules loaded: {heavy}"
+        )
+
+startup_report = StartupReport()
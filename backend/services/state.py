@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import socket
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+# Identifies this worker process in job and file ownership records
+NODE_ID = os.getenv("NODE_ID") or socket.gethostname()
+WORKER_ID = f"{NODE_ID}:{os.getpid()}"
+
+# Finished job records and cache entries are dropped after this long
+STATE_TTL_SECONDS = int(os.getenv("STATE_TTL_SECONDS", str(7 * 24 * 3600)))
+# How often a long-running SQLite backend sweeps expired rows
+EXPIRE_INTERVAL_SECONDS = 3600
+
+def unique_suffix() -> str:
+    """Collision-free filename suffix: wall-clock seconds plus a random token.
+
+    Safe across event loops, worker processes and nodes, unlike the loop's
+    monotonic clock which every worker starts near the same value.
+    """
+    return f"{int(time.time())}_{uuid.uuid4().hex[:8]}"
+
+def file_fingerprint(path: str) -> str:
+    """Content key for caches indexed by source file, without hashing the whole file.
+
+    Size plus the first and last MiB is enough to tell re-uploads of the same
+    video apart.
+    """
+    digest = hashlib.sha256()
+    size = os.path.getsize(path)
+    digest.update(str(size).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(1024 * 1024))
+        if size > 1024 * 1024:
+            f.seek(max(size - 1024 * 1024, 1024 * 1024))
+            digest.update(f.read())
+    return digest.hexdigest()[:32]
+
+class StateBackend(ABC):
+    """Shared state for job status, cache indexes and output file ownership.
+
+    Values are JSON-serializable dicts. Implementations must be safe to use
+    from several worker processes at once.
+    """
+
+    @abstractmethod
+    def set_job(self, job_id: str, **fields):
+        """Create or update a job record with the given fields"""
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def cache_get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def cache_set(self, namespace: str, key: str, value: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def claim_file(self, name: str, owner: Dict[str, Any]) -> bool:
+        """Record the owner of an output file; False if another owner already claimed it"""
+
+    @abstractmethod
+    def file_owner(self, name: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def release_file(self, name: str):
+        ...
+
+class SQLiteStateBackend(StateBackend):
+    """Single-host backend; WAL mode lets all uvicorn workers share one database file"""
+
+    def __init__(self, path: str = "state/state.db"):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._expired_at = 0.0
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, updated REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            db.execute("CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, owner TEXT NOT NULL, created REAL NOT NULL)")
+        self._expire()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; handlers and executor threads each get their own
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA busy_timeout=30000")
+            self._local.db = db
+        return db
+
+    def _expire(self):
+        self._expired_at = time.time()
+        cutoff = self._expired_at - STATE_TTL_SECONDS
+        db = self._connect()
+        db.execute("DELETE FROM jobs WHERE updated < ?", (cutoff,))
+        db.execute("DELETE FROM cache WHERE updated < ?", (cutoff,))
+        # Ownership of outputs older than the TTL; like Redis keys, they age out with everything else
+        db.execute("DELETE FROM files WHERE created < ?", (cutoff,))
+
+    def _maybe_expire(self):
+        # Writers sweep now and then, so a server that runs for weeks doesn't grow without bound
+        if time.time() - self._expired_at > EXPIRE_INTERVAL_SECONDS:
+            self._expire()
+
+    def set_job(self, job_id: str, **fields):
+        self._maybe_expire()
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            data = json.loads(row[0]) if row else {"id": job_id}
+            data.update(fields)
+            db.execute(
+                "INSERT OR REPLACE INTO jobs (id, data, updated) VALUES (?, ?, ?)",
+                (job_id, json.dumps(data), time.time())
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def cache_get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def cache_set(self, namespace: str, key: str, value: Dict[str, Any]):
+        self._maybe_expire()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, updated) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), time.time())
+        )
+
+    def claim_file(self, name: str, owner: Dict[str, Any]) -> bool:
+        self._maybe_expire()
+        cursor = self._connect().execute(
+            "INSERT OR IGNORE INTO files (name, owner, created) VALUES (?, ?, ?)",
+            (name, json.dumps(owner), time.time())
+        )
+        return cursor.rowcount == 1
+
+    def file_owner(self, name: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT owner FROM files WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def release_file(self, name: str):
+        self._connect().execute("DELETE FROM files WHERE name = ?", (name,))
+
+class RedisStateBackend(StateBackend):
+    """Cluster backend for any Redis-protocol server (Redis, Valkey, KeyDB, Dragonfly).
+
+    The URL "memory://" uses fakeredis as an in-process stand-in so the
+    cluster code path can be run locally without a server.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "subtitle"):
+        self.prefix = prefix
+        if url.startswith("memory://"):
+            try:
+                import fakeredis
+            except ImportError:
+                raise RuntimeError("STATE_REDIS_URL=memory:// requires the fakeredis package")
+            self.client = fakeredis.FakeStrictRedis(decode_responses=True)
+        else:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("STATE_BACKEND=redis requires the redis package")
+            self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    def set_job(self, job_id: str, **fields):
+        key = self._key("job", job_id)
+        encoded = {name: json.dumps(value) for name, value in fields.items()}
+        encoded.setdefault("id", json.dumps(job_id))
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping=encoded)
+        pipe.expire(key, STATE_TTL_SECONDS)
+        pipe.execute()
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        data = self.client.hgetall(self._key("job", job_id))
+        return {name: json.loads(value) for name, value in data.items()} if data else None
+
+    def cache_get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        value = self.client.get(self._key("cache", namespace, key))
+        return json.loads(value) if value else None
+
+    def cache_set(self, namespace: str, key: str, value: Dict[str, Any]):
+        self.client.set(self._key("cache", namespace, key), json.dumps(value), ex=STATE_TTL_SECONDS)
+
+    def claim_file(self, name: str, owner: Dict[str, Any]) -> bool:
+        return bool(self.client.set(self._key("file", name), json.dumps(owner), nx=True, ex=STATE_TTL_SECONDS))
+
+    def file_owner(self, name: str) -> Optional[Dict[str, Any]]:
+        value = self.client.get(self._key("file", name))
+        return json.loads(value) if value else None
+
+    def release_file(self, name: str):
+        self.client.delete(self._key("file", name))
+
+def create_state_backend() -> StateBackend:
+    """Build the backend selected by STATE_BACKEND (sqlite or redis)"""
+    backend = os.getenv("STATE_BACKEND", "sqlite").lower()
+    if backend == "redis":
+        return RedisStateBackend(os.getenv("STATE_REDIS_URL", "redis://localhost:6379/0"))
+    if backend == "sqlite":
+        return SQLiteStateBackend(os.getenv("STATE_SQLITE_PATH", "state/state.db"))
+    raise ValueError(f"Unknown STATE_BACKEND: {backend}")
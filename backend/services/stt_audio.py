@@ -0,0 +1,203 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+import numpy as np
+import ffmpeg
+from services import metrics
+from services.ffmpeg_scheduler import FFmpegScheduler, INTERACTIVE
+from services.state import unique_suffix
+from services.waveform import read_wav_samples
+
+# Encode audio for remote speech-to-text instead of uploading 16-bit PCM
+STT_AUDIO_COMPRESSION = os.getenv("STT_AUDIO_COMPRESSION", "true").lower() in ("1", "true", "yes")
+# Parts of one file transcribed at the same time
+STT_PARALLEL_PARTS = int(os.getenv("STT_PARALLEL_PARTS", "3"))
+# Split points move to the quietest spot within this many seconds before the limit
+SPLIT_SEARCH_SECONDS = 10.0
+SILENCE_WINDOW_SECONDS = 0.05
+
+class AudioProfile(NamedTuple):
+    """How one speech-to-text backend wants its audio"""
+    extension: str
+    options: Dict[str, Any]
+    # Expected bytes per second including container overhead, used to size parts before encoding
+    bytes_per_second: float
+    max_bytes: int
+    max_seconds: Optional[float]
+
+# Opus at speech bitrates is about 10x smaller than PCM. Google Cloud's synchronous
+# recognize caps requests at 60 s and 10 MB and takes FLAC; the free Web Speech API
+# goes through speech_recognition, which reads WAV, so it is only split.
+PROFILES: Dict[str, AudioProfile] = {
+    "openai_api": AudioProfile(
+        "ogg", {"acodec": "libopus", "audio_bitrate": "24k", "application": "voip"}, 4300, 25 * 1000 * 1000, None
+    ),
+    "assemblyai_api": AudioProfile(
+        "ogg", {"acodec": "libopus", "audio_bitrate": "32k", "application": "voip"}, 5100, 2 * 1000 * 1000 * 1000, None
+    ),
+    "google_speech_api": AudioProfile(
+        "flac", {"acodec": "flac", "compression_level": 8}, 20000, 10 * 1000 * 1000, 55.0
+    ),
+    "free_google_speech": AudioProfile(
+        "wav", {"acodec": "pcm_s16le"}, 32000, 10 * 1000 * 1000, 50.0
+    ),
+}
+
+class AudioPart(NamedTuple):
+    path: str
+    offset: float
+    duration: float
+
+def quietest_point(samples: np.ndarray, sample_rate: int, start: float, end: float) -> float:
+    """Middle of the quietest SILENCE_WINDOW_SECONDS window between start and end (seconds)"""
+    window = max(int(SILENCE_WINDOW_SECONDS * sample_rate), 1)
+    first, last = int(start * sample_rate), int(end * sample_rate)
+    region = samples[first:last].astype(np.float32)
+    windows = len(region) // window
+    if not windows:
+        return end
+    energy = np.square(region[:windows * window]).reshape(windows, window).mean(axis=1)
+    return (first + int(np.argmin(energy)) * window + window // 2) / sample_rate
+
+def split_points(samples: np.ndarray, sample_rate: int, part_seconds: float) -> List[float]:
+    """Cut times at most part_seconds apart, each moved to the quietest nearby window.
+
+    Cutting in a pause keeps words whole, so the parts transcribe like the
+    original file would.
+    """
+    duration = len(samples) / sample_rate
+    window_seconds = max(int(SILENCE_WINDOW_SECONDS * sample_rate), 1) / sample_rate
+    points = []
+    position = 0.0
+    while duration - position > part_seconds:
+        limit = position + part_seconds
+        search_start = max(limit - min(SPLIT_SEARCH_SECONDS, part_seconds / 2), position + window_seconds)
+        cut = quietest_point(samples, sample_rate, search_start, limit)
+        points.append(round(cut, 3))
+        position = cut
+    return points
+
+class SpeechAudioEncoder:
+    """Prepare extracted audio for a remote speech-to-text backend.
+
+    Re-encodes the 16 kHz PCM WAV with the backend's profile and splits it
+    into parts that fit its size and duration limits, in one FFmpeg pass
+    with the segment muxer. transcribe() runs a backend over the parts and
+    shifts every part's segment timings back onto the original timeline.
+    FFmpeg goes through the scheduler's run_threadsafe, so encodes count
+    against its thread budget; callers must run transcribe() off the event
+    loop (in an executor), as the API handlers do.
+    """
+
+    def __init__(
+        self,
+        scheduler: Optional[FFmpegScheduler] = None,
+        work_dir: str = "temp",
+        parallel_parts: int = STT_PARALLEL_PARTS
+    ):
+        self.scheduler = scheduler or FFmpegScheduler.from_env()
+        self.work_dir = work_dir
+        self.parallel_parts = max(parallel_parts, 1)
+
+    def supports(self, backend: str) -> bool:
+        return backend in PROFILES
+
+    def encode(self, wav_path: str, backend: str, output_dir: str) -> List[AudioPart]:
+        profile = PROFILES[backend]
+        samples, sample_rate = read_wav_samples(wav_path)
+        duration = len(samples) / sample_rate
+
+        # Leave a margin: encoded size is an estimate and containers add overhead
+        part_seconds = profile.max_bytes * 0.85 / profile.bytes_per_second
+        if profile.max_seconds:
+            part_seconds = min(part_seconds, profile.max_seconds)
+
+        for _ in range(4):
+            points = split_points(samples, sample_rate, part_seconds)
+            parts = self._encode_parts(wav_path, profile, points, duration, output_dir)
+            if all(os.path.getsize(part.path) <= profile.max_bytes for part in parts):
+                return parts
+            # Estimate was off (unusually complex audio); try again with shorter parts
+            part_seconds /= 2
+        raise Exception(f"Could not fit audio into {profile.max_bytes} byte parts for {backend}")
+
+    def transcribe(
+        self,
+        backend: str,
+        wav_path: str,
+        language: str,
+        transcribe_part: Callable[[str, str], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Encode, split, transcribe every part and merge the results into one transcription"""
+        output_dir = os.path.join(self.work_dir, f"stt_{unique_suffix()}")
+        os.makedirs(output_dir, exist_ok=True)
+        try:
+            with metrics.stage("stt_encode"):
+                parts = self.encode(wav_path, backend, output_dir)
+            metrics.STT_UPLOAD_BYTES.inc(os.path.getsize(wav_path), backend=backend, audio="pcm")
+            metrics.STT_UPLOAD_BYTES.inc(sum(os.path.getsize(part.path) for part in parts), backend=backend, audio="encoded")
+            print(f"STT audio for {backend}: {len(parts)} part(s), "
+                  f"{sum(os.path.getsize(part.path) for part in parts)} bytes (PCM {os.path.getsize(wav_path)} bytes)")
+
+            with ThreadPoolExecutor(max_workers=min(self.parallel_parts, len(parts)), thread_name_prefix="stt-part") as pool:
+                results = list(pool.map(lambda part: transcribe_part(part.path, language), parts))
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+        return self.merge(parts, results, language)
+
+    @staticmethod
+    def merge(parts: List[AudioPart], results: List[Dict[str, Any]], language: str) -> Dict[str, Any]:
+        segments = []
+        for part, result in zip(parts, results):
+            for segment in result.get("segments", []):
+                start = float(segment["start"]) + part.offset
+                end = float(segment["end"]) + part.offset
+                if float(segment["end"]) <= 0:
+                    # Backends without timings: the text covers the whole part
+                    start, end = part.offset, part.offset + part.duration
+                segments.append({"start": start, "end": min(end, part.offset + part.duration), "text": segment["text"]})
+
+        detected = next((result.get("language") for result in results if result.get("language")), language)
+        return {
+            "text": " ".join(result.get("text", "").strip() for result in results).strip(),
+            "language": detected,
+            "segments": segments,
+            "duration": parts[-1].offset + parts[-1].duration if parts else 0
+        }
+
+    def _encode_parts(
+        self,
+        wav_path: str,
+        profile: AudioProfile,
+        points: List[float],
+        duration: float,
+        output_dir: str
+    ) -> List[AudioPart]:
+        for name in os.listdir(output_dir):
+            os.remove(os.path.join(output_dir, name))
+        pattern = os.path.join(output_dir, f"part_%04d.{profile.extension}")
+
+        output_options = dict(profile.options)
+        if points:
+            output_options.update(f="segment", segment_times=",".join(f"{point:.3f}" for point in points), reset_timestamps=1)
+            output_path = pattern
+        else:
+            output_path = pattern % 0
+
+        def build(threads: int):
+            return ffmpeg.input(wav_path).output(output_path, ac=1, ar=16000, threads=threads, **output_options)
+
+        try:
+            # Speech codecs encode far faster than real time: a short job a user is waiting on
+            self.scheduler.run_threadsafe(build, INTERACTIVE, threads=1)
+        except ffmpeg.Error as e:
+            raise Exception(f"STT audio encoding failed: {e}")
+
+        bounds = [0.0] + points + [duration]
+        paths = sorted(os.path.join(output_dir, name) for name in os.listdir(output_dir))
+        return [
+            AudioPart(path, bounds[index], bounds[index + 1] - bounds[index])
+            for index, path in enumerate(paths[:len(bounds) - 1])
+        ]
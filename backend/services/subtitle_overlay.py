@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import tempfile
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+import numpy as np
+import ffmpeg
+from models.subtitle_track import SubtitleTrack
+from services.ffmpeg_scheduler import FFmpegScheduler, EXPORT
+from services.state import unique_suffix
+
+# Past this many cues the overlay chain costs more than libass saves
+OVERLAY_MAX_CUES = int(os.getenv("SUBTITLE_OVERLAY_MAX_CUES", "150"))
+# Raw RGBA frames held in memory per rasterizing run (one 1080p frame is about 8 MiB)
+OVERLAY_BATCH_BYTES = int(os.getenv("SUBTITLE_OVERLAY_BATCH_MB", "64")) * 1024 * 1024
+# Cue image cache: entries unused this long go first, then the least recently used until it fits
+OVERLAY_CACHE_MAX_AGE = float(os.getenv("SUBTITLE_OVERLAY_CACHE_DAYS", "7")) * 24 * 3600
+OVERLAY_CACHE_MAX_BYTES = int(os.getenv("SUBTITLE_OVERLAY_CACHE_MB", "512")) * 1024 * 1024
+# Entries used this recently may still be read by a running export and are never pruned
+OVERLAY_IN_USE_SECONDS = 3600
+
+class Overlay(NamedTuple):
+    """One distinct cue image and the intervals it is shown in"""
+    path: str
+    x: int
+    y: int
+    width: int
+    height: int
+    intervals: List[tuple]
+
+class SubtitleRasterizer:
+    """Pre-render subtitle cues to cropped RGBA images for time-gated overlays.
+
+    Every distinct cue text is rendered once by libass itself (same
+    force_style and frame size as the libass burn-in, on a transparent
+    canvas), cropped to the bounding box of its visible pixels and cached on
+    disk, so re-exports only render cues that changed. Exports then overlay
+    each image only while its cue is active instead of running libass on
+    every frame. prune() keeps the cache within its age and size limits.
+    """
+
+    def __init__(self, scheduler: FFmpegScheduler, cache_dir: str = "temp/overlays", max_cues: int = OVERLAY_MAX_CUES):
+        self.scheduler = scheduler
+        self.cache_dir = cache_dir
+        self.max_cues = max_cues
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def unsupported_reason(self, track: SubtitleTrack, content: str) -> Optional[str]:
+        """Why a track must be burned with libass instead, or None when overlays give the same output"""
+        if SubtitleTrack.detect_format(content) != "srt":
+            return "styled subtitle format"
+        if len(track) == 0:
+            return "no cues"
+        if len(track) > self.max_cues:
+            return f"more than {self.max_cues} cues"
+        if any("{\\" in text for text in track.texts):
+            # Override tags may animate (\fad, \move, \k), which a still image can't reproduce
+            return "ASS override tags"
+        order = np.argsort(track.starts, kind="stable")
+        if np.any(track.starts[order][1:] < track.ends[order][:-1]):
+            # libass stacks overlapping cues; rendered alone they would collide
+            return "overlapping cues"
+        return None
+
+    async def plan(self, subtitle_path: str, width: int, height: int, force_style: str) -> Optional[List[Overlay]]:
+        """Overlays for a subtitle file at the given frame size; None means use libass"""
+        with open(subtitle_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        track = SubtitleTrack.parse(content)
+        reason = self.unsupported_reason(track, content)
+        if reason:
+            print(f"Subtitle overlays not used ({reason}), burning with libass")
+            return None
+
+        # Distinct texts in order of first appearance, each with all of its intervals
+        intervals: "OrderedDict[str, List[tuple]]" = OrderedDict()
+        for start, end, text in zip(track.starts.tolist(), track.ends.tolist(), track.texts):
+            if end > start and text.strip():
+                intervals.setdefault(text, []).append((start, end))
+
+        keys = {text: self._key(text, width, height, force_style) for text in intervals}
+        metas = {text: self._load_meta(keys[text]) for text in intervals}
+        missing = [text for text in intervals if metas[text] is None]
+        if missing:
+            try:
+                await self._rasterize(missing, [keys[text] for text in missing], width, height, force_style)
+            except Exception as e:
+                print(f"Subtitle rasterization failed, burning with libass: {e}")
+                return None
+            metas.update((text, self._load_meta(keys[text])) for text in missing)
+            await asyncio.get_event_loop().run_in_executor(None, self.prune)
+            if any(meta is None for meta in metas.values()):
+                print("Subtitle overlay cache entries vanished, burning with libass")
+                return None
+
+        overlays = []
+        for text, spans in intervals.items():
+            meta = metas[text]
+            if meta["width"] == 0:
+                # Nothing visible (e.g. only whitespace markup)
+                continue
+            overlays.append(Overlay(self._image_path(keys[text]), meta["x"], meta["y"], meta["width"], meta["height"], spans))
+        return overlays
+
+    async def _rasterize(self, texts: List[str], keys: List[str], width: int, height: int, force_style: str):
+        """Render the texts in runs of at most OVERLAY_BATCH_BYTES of raw frames, storing each run's crops"""
+        loop = asyncio.get_event_loop()
+        batch = max(OVERLAY_BATCH_BYTES // (width * height * 4), 1)
+        for first in range(0, len(texts), batch):
+            stdout = await self._render(texts[first:first + batch], width, height, force_style)
+            # Cropping and writing scan every pixel; keep it off the event loop
+            await loop.run_in_executor(None, self._store, stdout, keys[first:first + batch], width, height)
+
+    async def _render(self, texts: List[str], width: int, height: int, force_style: str) -> bytes:
+        """Each text as one frame of a transparent 1 fps canvas, in a single FFmpeg run"""
+        # Cue i is on screen for the frame at t = i
+        track = SubtitleTrack([float(i) for i in range(len(texts))], [i + 0.5 for i in range(len(texts))], texts)
+        fd, srt_path = tempfile.mkstemp(suffix=".srt", dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(track.to_srt())
+
+            def build(threads: int):
+                return (
+                    ffmpeg
+                    # RGBA inside the lavfi graph, or the canvas is converted to opaque YUV first
+                    .input(f"color=c=black@0:s={width}x{height}:r=1:d={len(texts)},format=rgba", f="lavfi")
+                    .filter('subtitles', srt_path, force_style=force_style, alpha=1)
+                    .output('pipe:', f='rawvideo', pix_fmt='rgba', vframes=len(texts))
+                )
+
+            stdout, _ = await self.scheduler.run(build, EXPORT, threads=1)
+        finally:
+            os.remove(srt_path)
+
+        if len(stdout) != len(texts) * height * width * 4:
+            raise Exception(f"expected {len(texts)} frames, got {len(stdout) // (height * width * 4)}")
+        return stdout
+
+    def _store(self, stdout: bytes, keys: List[str], width: int, height: int):
+        """Crop each rendered frame to its visible pixels and cache it under its key"""
+        frames = np.frombuffer(stdout, dtype=np.uint8).reshape(len(keys), height, width, 4)
+        for key, frame in zip(keys, frames):
+            visible = frame[:, :, 3] > 0
+            rows = np.flatnonzero(visible.any(axis=1))
+            cols = np.flatnonzero(visible.any(axis=0))
+            meta: Dict[str, int] = {"x": 0, "y": 0, "width": 0, "height": 0}
+            if len(rows):
+                top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+                # overlay snaps positions to the chroma grid on YUV 4:2:0 video; start on it
+                top, left = top - top % 2, left - left % 2
+                self._write_atomic(self._image_path(key), np.ascontiguousarray(frame[top:bottom, left:right]).tobytes())
+                meta = {"x": int(left), "y": int(top), "width": int(right - left), "height": int(bottom - top)}
+            # Metadata last: its presence marks the cache entry complete
+            self._write_atomic(self._meta_path(key), json.dumps(meta).encode("utf-8"))
+
+    def _write_atomic(self, path: str, data: bytes):
+        # A concurrent export (or a crash) never sees a half-written file; unique per thread and process
+        partial = f"{path}.{unique_suffix()}.tmp"
+        try:
+            with open(partial, "wb") as f:
+                f.write(data)
+            os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+
+    def _load_meta(self, key: str) -> Optional[Dict[str, int]]:
+        """A complete cache entry's crop box, or None to render it again; marks the entry used"""
+        try:
+            with open(self._meta_path(key)) as f:
+                meta = json.load(f)
+            if meta["width"] and not os.path.exists(self._image_path(key)):
+                return None
+            os.utime(self._meta_path(key))
+            return meta
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def prune(self):
+        """Drop entries past OVERLAY_CACHE_MAX_AGE, then the least recently used beyond OVERLAY_CACHE_MAX_BYTES"""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if name.endswith(".tmp") or name.endswith(".srt"):
+                    # Left behind by a crashed render
+                    if now - os.path.getmtime(path) > OVERLAY_IN_USE_SECONDS:
+                        os.remove(path)
+                elif name.endswith(".json"):
+                    key = name[:-len(".json")]
+                    image = self._image_path(key)
+                    size = os.path.getsize(path) + (os.path.getsize(image) if os.path.exists(image) else 0)
+                    entries.append((os.path.getmtime(path), key, size))
+            except OSError:
+                continue
+
+        total = sum(size for _, _, size in entries)
+        for used, key, size in sorted(entries):
+            age = now - used
+            if age < OVERLAY_IN_USE_SECONDS or (age <= OVERLAY_CACHE_MAX_AGE and total <= OVERLAY_CACHE_MAX_BYTES):
+                break
+            # Metadata first, so the entry reads as missing before its image goes
+            for path in (self._meta_path(key), self._image_path(key)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+    def _key(self, text: str, width: int, height: int, force_style: str) -> str:
+        return hashlib.sha256(f"{width}x{height}\n{force_style}\n{text}".encode("utf-8")).hexdigest()[:32]
+
+    def _image_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.rgba")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
@@ -1,24 +1,146 @@
 import os
+import re
+import bisect
 import asyncio
-from typing import List
-import deepl
-from googletrans import Translator
+import itertools
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
 from dotenv import load_dotenv
+from models.subtitle_track import SubtitleTrack
 
 load_dotenv()
 
+# Text ending a sentence: terminal punctuation, optionally followed by closing quotes/brackets
+_SENTENCE_END = re.compile(r"[.!?\u2026\u3002\uff01\uff1f][\"'\u201d\u2019)\]]*$")
+
+# Sentence units are capped so a run-on transcript cannot become one huge provider item
+MAX_UNIT_CUES = int(os.getenv("TRANSLATION_MAX_UNIT_CUES", "6"))
+MAX_UNIT_CHARS = int(os.getenv("TRANSLATION_MAX_UNIT_CHARS", "400"))
+# A pause this long between cues ends a unit even without punctuation
+MAX_UNIT_GAP = float(os.getenv("TRANSLATION_MAX_UNIT_GAP", "1.5"))
+
+# Provider calls block on the network; they get their own threads instead of the
+# default executor that file hashing and other short CPU work share
+TRANSLATION_WORKERS = int(os.getenv("TRANSLATION_WORKERS", "4"))
+
+def group_sentences(texts: Sequence[str], timings: Optional[Sequence[Sequence[float]]] = None) -> List[List[int]]:
+    """Group adjacent cue indexes into sentence units"""
+    units: List[List[int]] = []
+    current: List[int] = []
+    chars = 0
+    for i, text in enumerate(texts):
+        stripped = text.strip()
+        if current and (
+            len(current) >= MAX_UNIT_CUES
+            or chars + len(stripped) > MAX_UNIT_CHARS
+            or (timings and timings[i][0] - timings[current[-1]][1] > MAX_UNIT_GAP)
+        ):
+            units.append(current)
+            current, chars = [], 0
+
+        current.append(i)
+        chars += len(stripped) + 1
+        if not stripped or _SENTENCE_END.search(stripped):
+            units.append(current)
+            current, chars = [], 0
+    if current:
+        units.append(current)
+    return units
+
+# Scripts written without spaces between words (Thai, Lao, Myanmar, Khmer, kana, CJK ideographs):
+# each character is a split point. Other text is only split between words.
+_UNSPACED = "\u0e00-\u0eff\u1000-\u109f\u1780-\u17ff\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff66-\uff9f"
+# Combining marks (Thai vowels and tones, ...), CJK and fullwidth punctuation stay with the character before them
+_ATTACHED = "".join(
+    char for char in map(chr, itertools.chain(range(0x0e00, 0x0f00), range(0x1000, 0x10a0), range(0x1780, 0x1800)))
+    if unicodedata.category(char).startswith("M")
+) + "\u3000-\u303f\uff01-\uff65"
+_TOKEN = re.compile(f"[{_UNSPACED}][{_ATTACHED}]*|[^\\s{_UNSPACED}]+")
+
+def split_translation(text: str, weights: Sequence[float]) -> List[str]:
+    """Split a translated sentence into len(weights) parts sized proportionally to the weights.
+
+    Splits fall on word boundaries, or between characters of scripts written
+    without spaces; a word is never cut. With fewer words than parts, the
+    trailing parts are empty.
+    """
+    if len(weights) == 1:
+        return [text]
+
+    matches = list(_TOKEN.finditer(text))
+    tokens = [match.group() for match in matches]
+    # Whether whitespace separated each token from the one before, to rejoin parts as written
+    spaced = [i > 0 and match.start() > matches[i - 1].end() for i, match in enumerate(matches)]
+
+    total_weight = float(sum(weights))
+    if total_weight <= 0:
+        weights, total_weight = [1.0] * len(weights), float(len(weights))
+
+    # Character offset at the end of each token
+    ends = list(itertools.accumulate(len(token) for token in tokens))
+    total_chars = ends[-1] if ends else 0
+
+    parts, start, cumulative = [], 0, 0.0
+    remaining = len(weights)
+    for weight in weights[:-1]:
+        remaining -= 1
+        cumulative += weight
+        target = cumulative / total_weight * total_chars
+
+        # Cut at whichever token boundary lands closest to the target ...
+        j = bisect.bisect_left(ends, target)
+        before = ends[j - 1] if j > 0 else 0
+        cut = j if j >= len(ends) or target - before <= ends[j] - target else j + 1
+        # ... but give every part at least one token while tokens last, earlier parts first
+        cut = min(max(cut, start + 1), max(len(tokens) - remaining, start + 1), len(tokens))
+        parts.append((start, cut))
+        start = cut
+    parts.append((start, len(tokens)))
+
+    return [
+        "".join((" " if spaced[i] and i > first else "") + tokens[i] for i in range(first, last))
+        for first, last in parts
+    ]
+
 class TranslationService:
+    """Translation through DeepL with Google Translate as fallback.
+
+    Provider clients (and their packages) are created on first use, so
+    processes that never translate don't pay for them at startup.
+    """
+
     def __init__(self):
         self.deepl_key = os.getenv("DEEPL_API_KEY")
-        self.google_translator = Translator()
-        self.deepl_translator = None
-        
-        if self.deepl_key:
-            try:
-                self.deepl_translator = deepl.Translator(self.deepl_key)
-                print("DeepL translator initialized")
-            except Exception as e:
-                print(f"Failed to initialize DeepL: {e}")
+        self._google_translator = None
+        self._deepl_translator = None
+        self._deepl_initialized = False
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max(TRANSLATION_WORKERS, 1), thread_name_prefix="translate")
+    
+    @property
+    def deepl_translator(self):
+        if not self._deepl_initialized:
+            with self._lock:
+                if not self._deepl_initialized and self.deepl_key:
+                    try:
+                        import deepl
+                        self._deepl_translator = deepl.Translator(self.deepl_key)
+                        print("DeepL translator initialized")
+                    except Exception as e:
+                        print(f"Failed to initialize DeepL: {e}")
+                self._deepl_initialized = True
+        return self._deepl_translator
+    
+    @property
+    def google_translator(self):
+        if self._google_translator is None:
+            with self._lock:
+                if self._google_translator is None:
+                    from googletrans import Translator
+                    self._google_translator = Translator()
+        return self._google_translator
     
     async def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
         """Translate a batch of texts using available translation service"""
@@ -33,6 +155,53 @@ class TranslationService:
         # Fallback to Google Translate
         return await self._translate_with_google(texts, source_lang, target_lang)
     
+    async def translate_sentences(
+        self,
+        texts: List[str],
+        source_lang: str,
+        target_lang: str,
+        timings: Optional[Sequence[Sequence[float]]] = None
+    ) -> List[str]:
+        """Translate cues as whole sentences, one translation per input cue.
+
+        Adjacent cues are merged into sentence units so the provider sees
+        complete sentences and fewer items; each translated unit is then spread
+        back over its cues in proportion to their durations (or, without
+        timings, their source text lengths).
+        """
+        if timings is not None and len(timings) != len(texts):
+            raise ValueError("timings must have one [start, end] pair per subtitle")
+
+        units = group_sentences(texts, timings)
+        sources = [" ".join(texts[i].strip() for i in unit) for unit in units]
+        translated = await self.translate_batch(sources, source_lang, target_lang)
+
+        results: List[str] = [""] * len(texts)
+        for unit, text in zip(units, translated):
+            if timings:
+                weights = [max(timings[i][1] - timings[i][0], 0.0) for i in unit]
+            else:
+                weights = [len(texts[i].strip()) for i in unit]
+            for i, part in zip(unit, split_translation(text, weights)):
+                results[i] = part
+        print(f"Sentence units: {len(texts)} cues translated as {len(units)} items")
+        return results
+    
+    async def translate_track(
+        self,
+        track: SubtitleTrack,
+        source_lang: str,
+        target_lang: str,
+        sentence_units: bool = False
+    ) -> SubtitleTrack:
+        """Translate every cue of a subtitle track, keeping its timings"""
+        if sentence_units:
+            timings = list(zip(track.starts.tolist(), track.ends.tolist()))
+            translations = await self.translate_sentences(track.texts, source_lang, target_lang, timings)
+        else:
+            translations = await self.translate_batch(track.texts, source_lang, target_lang)
+        return track.with_texts(translations, target_lang)
+    
     async def _translate_with_deepl(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
         """Translate using DeepL API"""
         # DeepL language code mapping
@@ -65,9 +234,9 @@ class TranslationService:
             else:
                 return [results.text]
         
-        # Run in thread pool to avoid blocking
+        # Run in the translation thread pool to avoid blocking
         loop = asyncio.get_event_loop()
-        translations = await loop.run_in_executor(None, translate_sync)
+        translations = await loop.run_in_executor(self.executor, translate_sync)
         
         return translations
     
@@ -85,9 +254,9 @@ class TranslationService:
                 translations.append(result.text)
             return translations
         
-        # Run in thread pool to avoid blocking
+        # Run in the translation thread pool to avoid blocking
         loop = asyncio.get_event_loop()
-        translations = await loop.run_in_executor(None, translate_sync)
+        translations = await loop.run_in_executor(self.executor, translate_sync)
         
         return translations
     
@@ -0,0 +1,242 @@
+import os
+import time
+import uuid
+import fcntl
+import shutil
+import hashlib
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+from services.state import StateBackend, NODE_ID
+
+# Chunk size bounds; clients may pick any size in between when creating an upload
+DEFAULT_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(10 * 1024 * 1024 * 1024)))
+# Unfinished and finished chunked uploads are removed after this long
+UPLOAD_TTL_SECONDS = int(os.getenv("UPLOAD_TTL_SECONDS", str(24 * 3600)))
+
+class UploadError(Exception):
+    """Chunked upload failure carrying the HTTP status it maps to"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+class ChunkedUploads:
+    """Resumable uploads assembled in place.
+
+    An upload is created with its total size, which fixes the chunk layout.
+    Chunks may then arrive in any order and in parallel: each one is written
+    with pwrite straight to its offset in a preallocated file, checked against
+    the client's SHA-256, and only then marked received in a one-byte-per-chunk
+    map next to the data. Finalizing renames the file into a "file"
+    subdirectory under the client's filename, apart from the bookkeeping
+    files, so the bytes are never copied after they land on disk.
+    """
+
+    def __init__(self, state: StateBackend, root: str = "uploads/chunked", node_url: str = ""):
+        self.state = state
+        self.root = root
+        self.node_url = node_url
+        os.makedirs(self.root, exist_ok=True)
+
+    def create(self, filename: str, size: int, chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        if size <= 0 or size > MAX_UPLOAD_SIZE:
+            raise UploadError(413 if size > 0 else 400, f"Upload size must be between 1 and {MAX_UPLOAD_SIZE} bytes")
+        chunk_size = min(max(chunk_size or DEFAULT_CHUNK_SIZE, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+        chunk_count = (size + chunk_size - 1) // chunk_size
+
+        self.purge_expired()
+
+        upload_id = uuid.uuid4().hex
+        upload_dir = os.path.join(self.root, upload_id)
+        os.makedirs(upload_dir)
+        # Sparse preallocation: every chunk has a fixed home from the start
+        with open(os.path.join(upload_dir, "data.part"), "wb") as f:
+            f.truncate(size)
+        with open(os.path.join(upload_dir, "chunks"), "wb") as f:
+            f.write(bytes(chunk_count))
+
+        meta = {
+            "upload_id": upload_id,
+            "filename": Path(os.path.basename(filename or "upload")).name or "upload",
+            "size": size,
+            "chunk_size": chunk_size,
+            "chunk_count": chunk_count,
+            "dir": upload_dir,
+            "node": NODE_ID,
+            "url": self.node_url,
+            "created": time.time(),
+            "complete": False
+        }
+        self.state.cache_set("upload", upload_id, meta)
+        return self.status(upload_id)
+
+    def meta(self, upload_id: str) -> Dict[str, Any]:
+        meta = self.state.cache_get("upload", upload_id)
+        if meta is None:
+            raise UploadError(404, "Upload not found")
+        return meta
+
+    def is_local(self, meta: Dict[str, Any]) -> bool:
+        return meta.get("node") == NODE_ID
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        meta = self.meta(upload_id)
+        chunk_size, size = meta["chunk_size"], meta["size"]
+        if meta["complete"]:
+            received = [1] * meta["chunk_count"]
+        else:
+            received = self._received(meta)
+
+        missing = [index * chunk_size for index, done in enumerate(received) if not done]
+        received_bytes = sum(self._chunk_length(meta, index) for index, done in enumerate(received) if done)
+        return {
+            "upload_id": upload_id,
+            "filename": meta["filename"],
+            "size": size,
+            "chunk_size": chunk_size,
+            "chunk_count": meta["chunk_count"],
+            "received_bytes": received_bytes,
+            "missing_offsets": missing,
+            "complete": meta["complete"]
+        }
+
+    async def write_chunk(self, upload_id: str, offset: int, body: AsyncIterator[bytes], sha256: Optional[str]) -> Dict[str, Any]:
+        """Write one chunk at its offset; chunks must start on a chunk boundary"""
+        meta = self.meta(upload_id)
+        if meta["complete"]:
+            raise UploadError(409, "Upload already finalized")
+        if offset < 0 or offset % meta["chunk_size"] or offset >= meta["size"]:
+            raise UploadError(400, f"Offset must be a multiple of {meta['chunk_size']} below {meta['size']}")
+        if not sha256:
+            raise UploadError(400, "Missing chunk checksum")
+
+        index = offset // meta["chunk_size"]
+        expected = self._chunk_length(meta, index)
+        digest = hashlib.sha256()
+        written = 0
+
+        try:
+            fd = os.open(os.path.join(meta["dir"], "data.part"), os.O_WRONLY)
+        except FileNotFoundError:
+            raise self._gone(upload_id)
+        try:
+            async for piece in body:
+                if written + len(piece) > expected:
+                    raise UploadError(400, f"Chunk at offset {offset} must be {expected} bytes")
+                os.pwrite(fd, piece, offset + written)
+                digest.update(piece)
+                written += len(piece)
+        finally:
+            os.close(fd)
+
+        if written != expected:
+            raise UploadError(400, f"Chunk at offset {offset} must be {expected} bytes, got {written}")
+        if digest.hexdigest() != sha256.lower():
+            # Not marked received, so the client simply sends it again
+            raise UploadError(422, f"Checksum mismatch for chunk at offset {offset}")
+
+        try:
+            fd = os.open(os.path.join(meta["dir"], "chunks"), os.O_WRONLY)
+            try:
+                os.pwrite(fd, b"\x01", index)
+            finally:
+                os.close(fd)
+            # pwrite doesn't touch the directory; its mtime is the last activity purge_expired goes by
+            os.utime(meta["dir"])
+        except FileNotFoundError:
+            # Finalized or purged while this chunk was arriving
+            raise self._gone(upload_id)
+        return self.status(upload_id)
+
+    def finalize(self, upload_id: str, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Check every chunk arrived, optionally verify the whole file, and move it into place.
+
+        Blocking (it may hash the whole file); run it in an executor. Concurrent
+        calls for one upload, from any worker on this node, take turns on a lock
+        file, and the later ones return the finished status.
+        """
+        meta = self.meta(upload_id)
+        if meta["complete"]:
+            return self.status(upload_id)
+
+        try:
+            lock = open(os.path.join(meta["dir"], "finalize.lock"), "w")
+        except FileNotFoundError:
+            raise UploadError(410, "Upload expired")
+        with lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            meta = self.meta(upload_id)
+            if meta["complete"]:
+                return self.status(upload_id)
+            return self._finalize(upload_id, meta, sha256)
+
+    def _finalize(self, upload_id: str, meta: Dict[str, Any], sha256: Optional[str]) -> Dict[str, Any]:
+        status = self.status(upload_id)
+        if status["missing_offsets"]:
+            raise UploadError(409, f"{len(status['missing_offsets'])} chunks missing")
+
+        part_path = os.path.join(meta["dir"], "data.part")
+        if sha256:
+            digest = hashlib.sha256()
+            with open(part_path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(block)
+            if digest.hexdigest() != sha256.lower():
+                raise UploadError(422, "Checksum mismatch for the assembled file")
+
+        with open(part_path, "rb+") as f:
+            os.fsync(f.fileno())
+        final_path = self._final_path(meta)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(part_path, final_path)
+        os.remove(os.path.join(meta["dir"], "chunks"))
+
+        meta["complete"] = True
+        self.state.cache_set("upload", upload_id, meta)
+        return self.status(upload_id)
+
+    def path_for(self, upload_id: str) -> str:
+        """Local path of a finalized upload"""
+        meta = self.meta(upload_id)
+        if not meta["complete"]:
+            raise UploadError(409, "Upload not finalized")
+        if not self.is_local(meta):
+            raise UploadError(409, f"Upload is stored on node {meta['node']}")
+        path = self._final_path(meta)
+        if not os.path.exists(path):
+            raise UploadError(410, "Upload expired")
+        return path
+
+    def purge_expired(self):
+        cutoff = time.time() - UPLOAD_TTL_SECONDS
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
+
+    def _gone(self, upload_id: str) -> UploadError:
+        if self.meta(upload_id)["complete"]:
+            return UploadError(409, "Upload already finalized")
+        return UploadError(410, "Upload expired")
+
+    @staticmethod
+    def _final_path(meta: Dict[str, Any]) -> str:
+        # Its own directory: a client filename can never clash with "chunks" or the lock file
+        return os.path.join(meta["dir"], "file", meta["filename"])
+
+    def _received(self, meta: Dict[str, Any]) -> bytes:
+        try:
+            with open(os.path.join(meta["dir"], "chunks"), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise UploadError(410, "Upload expired")
+
+    def _chunk_length(self, meta: Dict[str, Any], index: int) -> int:
+        return min(meta["chunk_size"], meta["size"] - index * meta["chunk_size"])
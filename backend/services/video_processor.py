@@ -1,22 +1,441 @@
 import os
-import asyncio
+import re
+import math
 import ffmpeg
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
+from services.state import unique_suffix
+from services.ffmpeg_scheduler import FFmpegScheduler, INTERACTIVE, EXPORT
+from services.subtitle_overlay import SubtitleRasterizer
+from models.subtitle_track import SubtitleTrack
+
+# Adaptive bitrate ladder: (height, video bitrate, audio bitrate)
+RENDITION_LADDER = [
+    (360, "800k", "96k"),
+    (480, "1400k", "128k"),
+    (720, "2800k", "128k"),
+    (1080, "5000k", "192k"),
+    (1440, "8000k", "192k"),
+]
+DEFAULT_RENDITIONS = [360, 720, 1080]
+SEGMENT_SECONDS = 4
+
+# Exports of sources that are being re-exported force a keyframe every KEYFRAME_INTERVAL
+# seconds so later edits can be re-encoded one GOP range at a time (see
+# services/incremental_export.py); other exports keep the encoder's own keyframe placement
+KEYFRAME_INTERVAL = 2
+
+# Scrubbing preview sprite sheets
+THUMBNAIL_COUNT = 100
+THUMBNAIL_COLUMNS = 10
+THUMBNAIL_WIDTH = 160
+
+# How burn_subtitles draws cues: "libass" runs the subtitles filter on every frame,
+# "overlay" composites pre-rendered cue images only while they are on screen, and
+# "auto" uses overlays whenever they give the same result (settings["renderer"] overrides)
+SUBTITLE_RENDERER = os.getenv("SUBTITLE_RENDERER", "auto").lower()
+
+_SHOWINFO_PTS = re.compile(r"Parsed_showinfo.*?pts_time:\s*([0-9.]+)")
 
 class VideoProcessor:
-    def __init__(self):
+    def __init__(self, scheduler: Optional[FFmpegScheduler] = None):
         self.output_dir = "outputs"
         os.makedirs(self.output_dir, exist_ok=True)
+        # Every FFmpeg run goes through the scheduler: probes and thumbnails as
+        # interactive jobs, renders as exports
+        self.scheduler = scheduler or FFmpegScheduler.from_env()
+        self.rasterizer = SubtitleRasterizer(self.scheduler)
     
-    async def burn_subtitles(self, video_path: str, subtitle_path: str, settings: Dict[str, Any]) -> str:
-        """Burn subtitles into video using FFmpeg"""
+    async def burn_subtitles(
+        self,
+        video_path: str,
+        subtitle_path: str,
+        settings: Dict[str, Any],
+        keyframe_interval: Optional[float] = None
+    ) -> str:
+        """Burn subtitles into video using FFmpeg; keyframe_interval forces keyframes for incremental re-exports"""
         
         # Generate output filename
         video_name = Path(video_path).stem
-        output_filename = f"{video_name}_with_subtitles_{int(asyncio.get_event_loop().time())}.mp4"
+        output_filename = f"{video_name}_with_subtitles_{unique_suffix()}.mp4"
         output_path = os.path.join(self.output_dir, output_filename)
         
+        quality_opts, force_style = self._render_options(settings)
+        subtitle_filter = f"subtitles={subtitle_path}:force_style='{force_style}'"
+        keyframe_options = {}
+        if keyframe_interval:
+            keyframe_options["force_key_frames"] = f"expr:gte(t,n_forced*{keyframe_interval})"
+        
+        overlays = None
+        if settings.get("renderer", SUBTITLE_RENDERER) != "libass":
+            width, height = (int(value) for value in quality_opts["scale"].split(":"))
+            overlays = await self.rasterizer.plan(subtitle_path, width, height, force_style)
+        
+        def build_overlays(threads: int):
+            """Scale, then composite each cue image only during its intervals"""
+            input_stream = ffmpeg.input(video_path, threads=threads)
+            video = input_stream.video.filter('scale', width, height)
+            
+            for overlay in overlays:
+                image = ffmpeg.input(overlay.path, f='rawvideo', pix_fmt='rgba', s=f"{overlay.width}x{overlay.height}")
+                # A cue repeated several times is still read and decoded once
+                copies = image.filter_multi_output('split', len(overlay.intervals)) if len(overlay.intervals) > 1 else None
+                for index, (start, end) in enumerate(overlay.intervals):
+                    video = video.overlay(
+                        copies.stream(index) if copies else image,
+                        x=overlay.x,
+                        y=overlay.y,
+                        # Same interval libass shows a cue for: start inclusive, end exclusive
+                        enable=f"gte(t,{start:.3f})*lt(t,{end:.3f})"
+                    )
+            
+            return ffmpeg.output(
+                video,
+                input_stream['a?'],
+                output_path,
+                vcodec='libx264',
+                acodec='aac',
+                crf=quality_opts["crf"],
+                preset=quality_opts["preset"],
+                movflags='faststart',
+                threads=threads,
+                **keyframe_options
+            )
+        
+        def build(threads: int):
+            """FFmpeg command for the thread budget the scheduler grants"""
+            input_stream = ffmpeg.input(video_path, threads=threads)
+            
+            # Apply subtitle filter and video settings
+            return ffmpeg.output(
+                input_stream,
+                output_path,
+                vcodec='libx264',
+                acodec='aac',
+                crf=quality_opts["crf"],
+                preset=quality_opts["preset"],
+                vf=f"scale={quality_opts['scale']},{subtitle_filter}",
+                movflags='faststart',  # Optimize for web streaming
+                threads=threads,
+                **keyframe_options
+            )
+        
+        try:
+            await self.scheduler.run(build_overlays if overlays is not None else build, EXPORT)
+        except ffmpeg.Error as e:
+            raise Exception(f"FFmpeg processing failed: {e}")
+        
+        return output_path
+    
+    async def burn_subtitles_batch(self, video_path: str, variants: List[Dict[str, Any]]) -> List[str]:
+        """Burn several subtitle variants into one source with a single FFmpeg pass.
+
+        Each variant is a dict with "subtitle_path", "settings" and an optional
+        "label". The source is decoded once and fanned out with the split
+        filter to one scale + subtitles chain and encoder per variant.
+        """
+        if not variants:
+            return []
+        
+        video_name = Path(video_path).stem
+        suffix = unique_suffix()
+        output_paths = []
+        
+        for index, variant in enumerate(variants):
+            # Labels come from the request (e.g. the language); keep them to a filename-safe slug
+            label = re.sub(r"[^A-Za-z0-9_-]+", "-", str(variant.get("label") or "")).strip("-")[:40] or str(index)
+            output_paths.append(os.path.join(self.output_dir, f"{video_name}_{label}_with_subtitles_{suffix}.mp4"))
+        
+        def build(threads: int):
+            """One decode fanned out to every variant; the encoders share the thread budget"""
+            input_stream = ffmpeg.input(video_path, threads=threads)
+            branches = input_stream.video.filter_multi_output('split', len(variants))
+            encoder_threads = max(1, threads // len(variants))
+            outputs = []
+            
+            for index, variant in enumerate(variants):
+                quality_opts, force_style = self._render_options(variant.get("settings", {}))
+                width, height = quality_opts["scale"].split(":")
+                video = (
+                    branches.stream(index)
+                    .filter('scale', width, height)
+                    .filter('subtitles', variant["subtitle_path"], force_style=force_style)
+                )
+                outputs.append(ffmpeg.output(
+                    video,
+                    input_stream['a?'],  # Source audio (if any) is encoded to AAC for every output
+                    output_paths[index],
+                    vcodec='libx264',
+                    acodec='aac',
+                    crf=quality_opts["crf"],
+                    preset=quality_opts["preset"],
+                    movflags='faststart',
+                    threads=encoder_threads
+                ))
+            return ffmpeg.merge_outputs(*outputs)
+        
+        try:
+            # A multi-variant render is worth a larger budget than a single export
+            await self.scheduler.run(build, EXPORT, threads=self.scheduler.threads[EXPORT] * min(len(variants), 2))
+        except ffmpeg.Error as e:
+            raise Exception(f"FFmpeg processing failed: {e}")
+        return output_paths
+    
+    async def export_rendition_ladder(
+        self,
+        video_path: str,
+        subtitle_path: str,
+        settings: Dict[str, Any],
+        packaging: str = "hls"
+    ) -> Dict[str, Any]:
+        """Export an adaptive bitrate ladder (HLS or DASH) with burned-in subtitles in one FFmpeg run.
+
+        Subtitles are rendered once at source resolution, then the picture is
+        split and scaled to each rendition, so every rung shows identical
+        captions. Rungs above the source height are dropped.
+        """
+        if packaging not in ("hls", "dash"):
+            raise Exception(f"Unsupported packaging: {packaging}")
+        
+        _, force_style = self._render_options(settings)
+        requested = settings.get("renditions") or DEFAULT_RENDITIONS
+        
+        video_name = Path(video_path).stem
+        output_name = f"{video_name}_abr_{unique_suffix()}"
+        output_dir = os.path.join(self.output_dir, output_name)
+        
+        try:
+            probe = await self.scheduler.probe(video_path)
+        except ffmpeg.Error as e:
+            raise Exception(f"FFmpeg processing failed: {e}")
+        video_stream = next(stream for stream in probe['streams'] if stream['codec_type'] == 'video')
+        has_audio = any(stream['codec_type'] == 'audio' for stream in probe['streams'])
+        source_height = int(video_stream.get('height', 0))
+        
+        rungs = [rung for rung in RENDITION_LADDER if rung[0] in requested and rung[0] <= source_height]
+        if not rungs:
+            # Source is smaller than every rung: keep a single rendition at source height
+            rungs = [(source_height - source_height % 2, RENDITION_LADDER[0][1], RENDITION_LADDER[0][2])]
+        
+        os.makedirs(output_dir, exist_ok=True)
+        
+        def build(threads: int):
+            """FFmpeg command for the whole ladder within the granted thread budget"""
+            input_stream = ffmpeg.input(video_path, threads=threads)
+            subtitled = input_stream.video.filter('subtitles', subtitle_path, force_style=force_style)
+            branches = subtitled.filter_multi_output('split', len(rungs))
+            
+            streams = [branches.stream(index).filter('scale', -2, height) for index, (height, _, _) in enumerate(rungs)]
+            
+            # Aligned keyframes on segment boundaries let players switch rungs cleanly
+            options = {
+                'vcodec': 'libx264',
+                'preset': 'medium',
+                'force_key_frames': f"expr:gte(t,n_forced*{SEGMENT_SECONDS})",
+                'sc_threshold': 0,
+                'threads': threads,
+            }
+            for index, (_, video_bitrate, _) in enumerate(rungs):
+                kbps = int(video_bitrate.rstrip('k'))
+                options[f'b:v:{index}'] = video_bitrate
+                options[f'maxrate:v:{index}'] = f"{int(kbps * 1.07)}k"
+                options[f'bufsize:v:{index}'] = f"{int(kbps * 1.5)}k"
+            
+            if packaging == "hls":
+                for index in range(len(rungs)):
+                    os.makedirs(os.path.join(output_dir, f"stream_{index}"), exist_ok=True)
+                
+                if has_audio:
+                    # HLS variants each carry their own audio rendition
+                    streams += [input_stream['a']] * len(rungs)
+                    for index, (_, _, audio_bitrate) in enumerate(rungs):
+                        options[f'b:a:{index}'] = audio_bitrate
+                    stream_map = " ".join(f"v:{index},a:{index}" for index in range(len(rungs)))
+                    options['acodec'] = 'aac'
+                else:
+                    stream_map = " ".join(f"v:{index}" for index in range(len(rungs)))
+                
+                return ffmpeg.output(
+                    *streams,
+                    os.path.join(output_dir, "stream_%v", "index.m3u8"),
+                    f='hls',
+                    hls_time=SEGMENT_SECONDS,
+                    hls_playlist_type='vod',
+                    hls_segment_filename=os.path.join(output_dir, "stream_%v", "segment_%05d.ts"),
+                    master_pl_name="master.m3u8",
+                    var_stream_map=stream_map,
+                    **options
+                )
+            
+            adaptation_sets = "id=0,streams=v"
+            if has_audio:
+                # DASH shares one audio adaptation set across all video rungs
+                streams.append(input_stream['a'])
+                options['acodec'] = 'aac'
+                options['b:a'] = rungs[-1][2]
+                adaptation_sets += " id=1,streams=a"
+            
+            return ffmpeg.output(
+                *streams,
+                os.path.join(output_dir, "manifest.mpd"),
+                f='dash',
+                seg_duration=SEGMENT_SECONDS,
+                use_template=1,
+                use_timeline=1,
+                adaptation_sets=adaptation_sets,
+                **options
+            )
+        
+        try:
+            await self.scheduler.run(build, EXPORT)
+        except ffmpeg.Error as e:
+            raise Exception(f"FFmpeg processing failed: {e}")
+        
+        manifest = "master.m3u8" if packaging == "hls" else "manifest.mpd"
+        return {
+            "packaging": packaging,
+            "output_dir": output_name,
+            "manifest": f"{output_name}/{manifest}",
+            "renditions": [
+                {"height": height, "video_bitrate": video_bitrate, "audio_bitrate": audio_bitrate if has_audio else None}
+                for height, video_bitrate, audio_bitrate in rungs
+            ]
+        }
+    
+    async def split_video_segments(self, video_path: str, segment_dir: str) -> List[str]:
+        """Stream-copy the video track of an export into KEYFRAME_INTERVAL-long MP4 segments"""
+        os.makedirs(segment_dir, exist_ok=True)
+        pattern = os.path.join(segment_dir, "segment_%05d.mp4")
+        
+        def build(threads: int):
+            return (
+                ffmpeg
+                .input(video_path)['v']
+                .output(
+                    pattern,
+                    vcodec='copy',
+                    f='segment',
+                    segment_time=KEYFRAME_INTERVAL,
+                    segment_format='mp4',
+                    reset_timestamps=1
+                )
+            )
+        
+        try:
+            # Stream copy: part of an export, but it needs almost no CPU
+            await self.scheduler.run(build, EXPORT, threads=1)
+        except ffmpeg.Error as e:
+            raise Exception(f"Segment split failed: {e}")
+        return sorted(
+            os.path.join(segment_dir, name)
+            for name in os.listdir(segment_dir)
+            if name.startswith("segment_")
+        )
+    
+    async def encode_video_segment(
+        self,
+        video_path: str,
+        subtitle_path: str,
+        settings: Dict[str, Any],
+        start: float,
+        duration: Optional[float],
+        output_path: str
+    ) -> str:
+        """Re-encode one time range of the source with subtitles, matching burn_subtitles' encoder settings"""
+        quality_opts, force_style = self._render_options(settings)
+        width, height = quality_opts["scale"].split(":")
+        
+        def build(threads: int):
+            input_options = {"ss": start, "threads": threads}
+            if duration is not None:
+                input_options["t"] = duration
+            
+            # Shift timestamps back to source time so cues line up, then rebase to zero
+            video = (
+                ffmpeg
+                .input(video_path, **input_options)
+                .video
+                .filter('setpts', f"PTS+{start}/TB")
+                .filter('scale', width, height)
+                .filter('subtitles', subtitle_path, force_style=force_style)
+                .filter('setpts', "PTS-STARTPTS")
+            )
+            return ffmpeg.output(
+                video,
+                output_path,
+                vcodec='libx264',
+                crf=quality_opts["crf"],
+                preset=quality_opts["preset"],
+                force_key_frames=f"expr:gte(t,n_forced*{KEYFRAME_INTERVAL})",
+                f='mp4',
+                threads=threads
+            )
+        
+        try:
+            # Segments are a couple of seconds long; several small budgets beat one large one
+            await self.scheduler.run(build, EXPORT, threads=2)
+        except ffmpeg.Error as e:
+            raise Exception(f"Segment encode failed: {e}")
+        return output_path
+    
+    async def concat_video_segments(self, segment_paths: List[str], audio_source: str, output_path: str) -> str:
+        """Join video segments without re-encoding and copy the audio track from an earlier export"""
+        list_path = output_path + ".concat.txt"
+        
+        with open(list_path, "w") as f:
+            for path in segment_paths:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        
+        def build(threads: int):
+            video = ffmpeg.input(list_path, f='concat', safe=0)['v']
+            audio = ffmpeg.input(audio_source)['a?']
+            return ffmpeg.output(video, audio, output_path, c='copy', movflags='faststart')
+        
+        try:
+            await self.scheduler.run(build, EXPORT, threads=1)
+            return output_path
+        except ffmpeg.Error as e:
+            raise Exception(f"Segment concat failed: {e}")
+        finally:
+            if os.path.exists(list_path):
+                os.remove(list_path)
+    
+    async def frame_digests(self, video_path: str) -> Tuple[float, List[Tuple[int, int, str]]]:
+        """Decode the video track; returns its time base and (pts, duration, MD5) per frame.
+
+        Raises if FFmpeg reports any decode error, so a broken splice never
+        passes as valid.
+        """
+        def build(threads: int):
+            return (
+                ffmpeg
+                .input(video_path, threads=threads)['v']
+                .output('pipe:', f='framemd5')
+                .global_args('-v', 'error', '-xerror')
+            )
+        
+        try:
+            stdout, stderr = await self.scheduler.run(build, EXPORT, threads=1)
+        except ffmpeg.Error as e:
+            raise Exception(f"Decoding {video_path} failed: {e.stderr.decode(errors='replace')[-500:]}")
+        if stderr.strip():
+            raise Exception(f"Decoding {video_path} reported errors: {stderr.decode(errors='replace')[-500:]}")
+        
+        time_base = None
+        frames = []
+        for line in stdout.decode().splitlines():
+            if line.startswith("#tb 0:"):
+                numerator, denominator = line.split(":", 1)[1].strip().split("/")
+                time_base = int(numerator) / int(denominator)
+            elif line and not line.startswith("#"):
+                _, _, pts, duration, _, digest = (field.strip() for field in line.split(","))
+                frames.append((int(pts), int(duration), digest))
+        if time_base is None:
+            raise Exception(f"No video frames decoded from {video_path}")
+        return time_base, frames
+    
+    def _render_options(self, settings: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """Map export settings to encoder options and a libass force_style string"""
         # Map quality settings
         quality_settings = {
             "low": {"crf": 28, "preset": "fast", "scale": "1280:720"},
@@ -45,45 +464,12 @@ class VideoProcessor:
         }
         
         alignment = position_map.get(position, "Alignment=10")
-        subtitle_filter = (
-            f"subtitles={subtitle_path}:force_style="
-            f"'FontSize={font_size},PrimaryColour=&H{self._hex_to_bgr(font_color)}&,"
-            f"OutlineColour=&H000000&,Outline=2,{alignment}'"
+        force_style = (
+            f"FontSize={font_size},PrimaryColour=&H{self._hex_to_bgr(font_color)}&,"
+            f"OutlineColour=&H000000&,Outline=2,{alignment}"
         )
         
-        quality_opts = quality_settings[quality]
-        
-        def process_video():
-            """Synchronous video processing function"""
-            try:
-                # Build FFmpeg command
-                input_stream = ffmpeg.input(video_path)
-                
-                # Apply subtitle filter and video settings
-                output_stream = ffmpeg.output(
-                    input_stream,
-                    output_path,
-                    vcodec='libx264',
-                    acodec='aac',
-                    crf=quality_opts["crf"],
-                    preset=quality_opts["preset"],
-                    vf=f"scale={quality_opts['scale']},{subtitle_filter}",
-                    movflags='faststart'  # Optimize for web streaming
-                )
-                
-                # Run the command
-                ffmpeg.run(output_stream, overwrite_output=True, quiet=True)
-                
-                return output_path
-                
-            except ffmpeg.Error as e:
-                raise Exception(f"FFmpeg processing failed: {e}")
-        
-        # Run video processing in thread pool
-        loop = asyncio.get_event_loop()
-        result_path = await loop.run_in_executor(None, process_video)
-        
-        return result_path
+        return quality_settings[quality], force_style
     
     def _hex_to_bgr(self, hex_color: str) -> str:
         """Convert hex color to BGR format for FFmpeg"""
@@ -101,51 +487,111 @@ class VideoProcessor:
     async def extract_video_info(self, video_path: str) -> Dict[str, Any]:
         """Extract video information using FFprobe"""
         
-        def get_info():
-            try:
-                probe = ffmpeg.probe(video_path)
-                video_stream = next(
-                    stream for stream in probe['streams'] 
-                    if stream['codec_type'] == 'video'
-                )
-                
-                return {
-                    "duration": float(probe.get('format', {}).get('duration', 0)),
-                    "width": int(video_stream.get('width', 0)),
-                    "height": int(video_stream.get('height', 0)),
-                    "fps": eval(video_stream.get('r_frame_rate', '0/1')),
-                    "codec": video_stream.get('codec_name', 'unknown')
-                }
-                
-            except Exception as e:
-                raise Exception(f"Failed to extract video info: {e}")
+        try:
+            probe = await self.scheduler.probe(video_path)
+            video_stream = next(
+                stream for stream in probe['streams'] 
+                if stream['codec_type'] == 'video'
+            )
+            
+            return {
+                "duration": float(probe.get('format', {}).get('duration', 0)),
+                "width": int(video_stream.get('width', 0)),
+                "height": int(video_stream.get('height', 0)),
+                "fps": eval(video_stream.get('r_frame_rate', '0/1')),
+                "codec": video_stream.get('codec_name', 'unknown')
+            }
+            
+        except Exception as e:
+            raise Exception(f"Failed to extract video info: {e}")
+    
+    async def create_thumbnail_sprites(
+        self,
+        video_path: str,
+        count: int = THUMBNAIL_COUNT,
+        columns: int = THUMBNAIL_COLUMNS,
+        width: int = THUMBNAIL_WIDTH
+    ) -> Dict[str, Any]:
+        """Tile evenly spaced thumbnails into one sprite sheet plus a WebVTT thumbnail track.
+
+        Runs a single FFmpeg pass that only decodes keyframes (skip_frame=nokey),
+        keeps the first keyframe of every duration/count interval, and tiles
+        them; showinfo reports the real timestamp of each kept frame, which
+        becomes the cue timing in the VTT index.
+        """
+        info = await self.extract_video_info(video_path)
+        duration = info["duration"]
+        if duration <= 0 or not info["width"]:
+            raise Exception("Cannot build thumbnails for a video without duration or size")
+        
+        count = max(1, count)
+        columns = max(1, min(columns, count))
+        rows = math.ceil(count / columns)
+        height = max(2, round(width * info["height"] / info["width"] / 2) * 2)
+        interval = duration / count
+        
+        output_name = f"{Path(video_path).stem}_thumbs_{unique_suffix()}"
+        output_dir = os.path.join(self.output_dir, output_name)
+        os.makedirs(output_dir, exist_ok=True)
+        sprite_path = os.path.join(output_dir, "sprite.jpg")
+        vtt_path = os.path.join(output_dir, "thumbnails.vtt")
+        
+        def build(threads: int):
+            stream = (
+                ffmpeg
+                .input(video_path, skip_frame='nokey', threads=threads)
+                .video
+                .filter('select', f"isnan(prev_selected_t)+gte(t-prev_selected_t,{interval:.3f})")
+                .filter('showinfo')
+                .filter('scale', width, height)
+                .filter('tile', f"{columns}x{rows}")
+            )
+            return ffmpeg.output(stream, sprite_path, vframes=1, q=4)
         
-        loop = asyncio.get_event_loop()
-        info = await loop.run_in_executor(None, get_info)
+        try:
+            _, stderr = await self.scheduler.run(build, INTERACTIVE)
+        except ffmpeg.Error as e:
+            raise Exception(f"Thumbnail sprite generation failed: {e}")
+        times = [float(value) for value in _SHOWINFO_PTS.findall(stderr.decode("utf-8", errors="replace"))][:columns * rows]
+        if not times:
+            raise Exception("No keyframes found for thumbnails")
         
-        return info
+        # Each tile covers the time until the next one; the first starts at zero
+        starts = [0.0] + times[1:]
+        ends = times[1:] + [duration]
+        texts = [
+            f"sprite.jpg#xywh={(i % columns) * width},{(i // columns) * height},{width},{height}"
+            for i in range(len(times))
+        ]
+        with open(vtt_path, "w", encoding="utf-8") as f:
+            f.write(SubtitleTrack(starts, ends, texts).to_vtt())
+        
+        return {
+            "output_dir": output_name,
+            "sprite": f"{output_name}/sprite.jpg",
+            "vtt": f"{output_name}/thumbnails.vtt",
+            "count": len(times),
+            "columns": columns,
+            "tile_width": width,
+            "tile_height": height
+        }
     
     async def create_thumbnail(self, video_path: str, timestamp: float = 10.0) -> str:
         """Create a thumbnail from video at specified timestamp"""
         
-        thumbnail_filename = f"thumb_{int(asyncio.get_event_loop().time())}.jpg"
+        thumbnail_filename = f"thumb_{unique_suffix()}.jpg"
         thumbnail_path = os.path.join(self.output_dir, thumbnail_filename)
         
-        def generate_thumbnail():
-            try:
-                (
-                    ffmpeg
-                    .input(video_path, ss=timestamp)
-                    .output(thumbnail_path, vframes=1, q=2)
-                    .overwrite_output()
-                    .run(quiet=True)
-                )
-                return thumbnail_path
-                
-            except ffmpeg.Error as e:
-                raise Exception(f"Thumbnail generation failed: {e}")
+        def build(threads: int):
+            return (
+                ffmpeg
+                .input(video_path, ss=timestamp, threads=threads)
+                .output(thumbnail_path, vframes=1, q=2)
+            )
         
-        loop = asyncio.get_event_loop()
-        result_path = await loop.run_in_executor(None, generate_thumbnail)
+        try:
+            await self.scheduler.run(build, INTERACTIVE)
+        except ffmpeg.Error as e:
+            raise Exception(f"Thumbnail generation failed: {e}")
         
-        return result_path 
\ No newline at end of file
+        return thumbnail_path 
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""Multi-resolution min/max waveform peaks.
+
+File layout (little endian):
+
+    header   "WFPK", version u16, sample rate u32, level count u16
+    levels   per level: samples per peak u32, peak count u32, data offset u64
+    data     per level: peak count pairs of (min i8, max i8)
+
+Level 0 holds one peak per BASE_SAMPLES_PER_PEAK samples and every further
+level halves the resolution, so any zoom level of the timeline reads a
+contiguous slice of at most a few thousand bytes.
+"""
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+MAGIC = b"WFPK"
+VERSION = 1
+HEADER = struct.Struct("<4sHIH")
+LEVEL = struct.Struct("<IIQ")
+
+# 64 samples per peak at 16 kHz = 250 peaks per second at the finest level
+BASE_SAMPLES_PER_PEAK = 64
+# Coarsest level: about 4 seconds per peak at 16 kHz
+MAX_SAMPLES_PER_PEAK = 65536
+
+def read_wav_samples(wav_path: str) -> Tuple[np.ndarray, int]:
+    """Memory-map the PCM data of a 16-bit WAV file (downmixed to mono)"""
+    with open(wav_path, "rb") as f:
+        riff = f.read(12)
+        if riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            raise ValueError(f"Not a WAV file: {wav_path}")
+
+        channels = sample_rate = bits = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                raise ValueError(f"No audio data in {wav_path}")
+            chunk_id, size = struct.unpack("<4sI", chunk)
+            if chunk_id == b"fmt ":
+                fmt = f.read(size)
+                _, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", fmt[:16])
+                f.seek(size % 2, 1)
+            elif chunk_id == b"data":
+                offset = f.tell()
+                break
+            else:
+                f.seek(size + size % 2, 1)
+
+    if bits != 16 or not channels:
+        raise ValueError("Waveform peaks need 16-bit PCM audio")
+
+    # FFmpeg may leave the data size unset when writing to a pipe; trust the file length instead
+    samples = np.memmap(wav_path, dtype="<i2", mode="r", offset=offset)
+    samples = samples[:len(samples) - len(samples) % channels]
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, sample_rate
+
+def compute_levels(samples: np.ndarray, base: int = BASE_SAMPLES_PER_PEAK) -> List[Tuple[int, np.ndarray]]:
+    """(samples per peak, int8 [count, 2] min/max array) for every level, finest first"""
+    if len(samples) == 0:
+        return [(base, np.zeros((0, 2), dtype=np.int8))]
+
+    # One pass over the audio for the finest level; a partial last window still gets a peak
+    starts = np.arange(0, len(samples), base)
+    peaks = np.empty((len(starts), 2), dtype=np.int8)
+    peaks[:, 0] = np.minimum.reduceat(samples, starts) >> 8
+    peaks[:, 1] = np.maximum.reduceat(samples, starts) >> 8
+
+    levels = [(base, peaks)]
+    samples_per_peak = base
+    # Coarser levels come from the previous level, never from the audio again
+    while len(peaks) > 1 and samples_per_peak * 2 <= MAX_SAMPLES_PER_PEAK:
+        if len(peaks) % 2:
+            peaks = np.concatenate([peaks, peaks[-1:]])
+        pairs = peaks.reshape(-1, 2, 2)
+        peaks = np.stack([pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)], axis=1)
+        samples_per_peak *= 2
+        levels.append((samples_per_peak, peaks))
+    return levels
+
+def write_peaks(wav_path: str, output_path: str) -> Dict[str, Any]:
+    """Compute all peak levels of a WAV file and store them in the binary peaks format"""
+    samples, sample_rate = read_wav_samples(wav_path)
+    levels = compute_levels(samples)
+
+    offset = HEADER.size + LEVEL.size * len(levels)
+    table = []
+    for samples_per_peak, peaks in levels:
+        table.append(LEVEL.pack(samples_per_peak, len(peaks), offset))
+        offset += peaks.nbytes
+
+    with open(output_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, sample_rate, len(levels)))
+        f.write(b"".join(table))
+        for _, peaks in levels:
+            f.write(np.ascontiguousarray(peaks).tobytes())
+
+    return {
+        "sample_rate": sample_rate,
+        "duration": len(samples) / sample_rate,
+        "levels": [samples_per_peak for samples_per_peak, _ in levels]
+    }
+
+def read_levels(f) -> Tuple[int, List[Tuple[int, int, int]]]:
+    magic, version, sample_rate, count = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Unsupported waveform peaks file")
+    table = f.read(LEVEL.size * count)
+    return sample_rate, [LEVEL.unpack_from(table, i * LEVEL.size) for i in range(count)]
+
+def read_range(peaks_path: str, start: float, end: Optional[float], pixels: int) -> Dict[str, Any]:
+    """Peaks covering [start, end) seconds at the coarsest level that still gives at least `pixels` peaks.
+
+    Only the selected slice is read from disk. An end of None means the end of the audio.
+    """
+    with open(peaks_path, "rb") as f:
+        sample_rate, levels = read_levels(f)
+        duration = levels[0][0] * levels[0][1] / sample_rate
+        end = duration if end is None else min(end, duration)
+        span = max(end - start, 0.0)
+
+        chosen = levels[0]
+        for level in levels:
+            if span * sample_rate / level[0] >= pixels:
+                chosen = level
+        samples_per_peak, count, offset = chosen
+
+        first = min(max(int(start * sample_rate // samples_per_peak), 0), count)
+        last = min(max(int(-(-end * sample_rate // samples_per_peak)), first), count)
+        f.seek(offset + first * 2)
+        data = f.read((last - first) * 2)
+
+    return {
+        "sample_rate": sample_rate,
+        "samples_per_peak": samples_per_peak,
+        "start_peak": first,
+        "peak_count": last - first,
+        "data": data
+    }
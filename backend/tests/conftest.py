@@ -0,0 +1,45 @@
+import os
+import sys
+import wave
+import shutil
+import tempfile
+import subprocess
+import numpy as np
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# The app writes uploads/, outputs/, temp/ and state/ relative to the working
+# directory; keep them out of the tree. Admission runs on slot limits only, so
+# a loaded test machine can't queue requests behind its CPU or memory limits.
+os.chdir(tempfile.mkdtemp(prefix="subtitle-tests-"))
+os.environ.setdefault("ADMISSION_MAX_MEMORY_PERCENT", "0")
+os.environ.setdefault("ADMISSION_MAX_LOAD_PER_CPU", "0")
+os.environ.setdefault("STATE_BACKEND", "sqlite")
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int = 16000) -> str:
+    """Write mono 16-bit PCM"""
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.astype("<i2").tobytes())
+    return path
+
+@pytest.fixture
+def tone_video(tmp_path):
+    """A few seconds of video with a sine tone, made by ffmpeg"""
+    path = str(tmp_path / "tone.mkv")
+    subprocess.run(
+        [
+            "ffmpeg", "-v", "error", "-y",
+            "-f", "lavfi", "-i", "testsrc=size=160x90:rate=10:duration=4",
+            "-f", "lavfi", "-i", "sine=frequency=440:duration=4",
+            "-shortest", "-c:v", "mpeg4", "-c:a", "pcm_s16le", path
+        ],
+        check=True
+    )
+    return path
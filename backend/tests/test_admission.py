@@ -0,0 +1,138 @@
+import asyncio
+import pytest
+from services.admission import AdmissionController, AdmissionRejected
+
+def controller(**options):
+    # Slot limits only; the resource checks would depend on the test machine
+    options.setdefault("max_memory_percent", 0)
+    options.setdefault("max_load_per_cpu", 0)
+    return AdmissionController({"transcribe": 1}, **options)
+
+async def hold(admission, client, order, release):
+    async with admission.admit("transcribe", client):
+        order.append(client)
+        await release.wait()
+
+def test_waiters_served_least_recently_served_client_first():
+    async def scenario():
+        admission = controller(max_per_client=3)
+        order = []
+        gate = asyncio.Event()
+        first = asyncio.ensure_future(hold(admission, "a", order, gate))
+        await asyncio.sleep(0)
+
+        # "a" queues two more before "b" shows up; "b" still goes next
+        waiters = [asyncio.ensure_future(hold(admission, client, order, gate)) for client in ("a", "a", "b")]
+        await asyncio.sleep(0)
+        assert admission.status()["transcribe"]["queued"] == 3
+
+        gate.set()
+        await asyncio.gather(first, *waiters)
+        return order
+
+    assert asyncio.run(scenario()) == ["a", "b", "a", "a"]
+
+def test_client_limit_rejected_with_retry_after():
+    async def scenario():
+        admission = controller(max_per_client=1)
+        gate = asyncio.Event()
+        task = asyncio.ensure_future(hold(admission, "a", [], gate))
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(AdmissionRejected) as rejected:
+                async with admission.admit("transcribe", "a"):
+                    pass
+        finally:
+            gate.set()
+            await task
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.reason == "client_limit"
+    assert 1 <= rejected.retry_after <= 300
+
+def test_full_queue_rejected():
+    async def scenario():
+        admission = controller(max_queue=1)
+        gate = asyncio.Event()
+        tasks = [asyncio.ensure_future(hold(admission, client, [], gate)) for client in ("a", "b")]
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(AdmissionRejected) as rejected:
+                async with admission.admit("transcribe", "c"):
+                    pass
+        finally:
+            gate.set()
+            await asyncio.gather(*tasks)
+        return rejected.value
+
+    assert asyncio.run(scenario()).reason == "queue_full"
+
+def test_wait_timeout_retry_after_scales_with_backlog():
+    async def scenario():
+        admission = controller(max_wait=0.05)
+        admission.pools["transcribe"].avg_seconds = 20
+        gate = asyncio.Event()
+        task = asyncio.ensure_future(hold(admission, "a", [], gate))
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(AdmissionRejected) as rejected:
+                async with admission.admit("transcribe", "b"):
+                    pass
+        finally:
+            gate.set()
+            await task
+        return rejected.value, admission.status()["transcribe"]
+
+    rejected, status = asyncio.run(scenario())
+    assert rejected.reason == "timeout"
+    # One active job of about 20 s ahead of it on one slot
+    assert rejected.retry_after == 20
+    assert status["active"] == 0 and status["queued"] == 0
+
+def test_background_waits_behind_requests():
+    async def scenario():
+        admission = AdmissionController({"transcribe": 2}, max_memory_percent=0, max_load_per_cpu=0)
+        order = []
+        gate = asyncio.Event()
+
+        async def background(name):
+            async with admission.admit_background("transcribe"):
+                order.append(name)
+                await gate.wait()
+
+        running = [asyncio.ensure_future(hold(admission, client, order, gate)) for client in ("a", "b")]
+        await asyncio.sleep(0)
+        queued = [asyncio.ensure_future(background("bg")), asyncio.ensure_future(hold(admission, "c", order, gate))]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(*running, *queued)
+        return order, admission.status()["transcribe"]
+
+    order, status = asyncio.run(scenario())
+    assert order == ["a", "b", "c", "bg"]
+    assert status["active"] == 0 and status["background_active"] == 0
+
+def test_background_leaves_a_slot_for_requests():
+    async def scenario():
+        admission = AdmissionController({"transcribe": 2}, max_memory_percent=0, max_load_per_cpu=0)
+        gate = asyncio.Event()
+
+        async def background():
+            async with admission.admit_background("transcribe"):
+                await gate.wait()
+
+        jobs = [asyncio.ensure_future(background()) for _ in range(3)]
+        await asyncio.sleep(0)
+        busy = dict(admission.status()["transcribe"])
+
+        # The free slot goes straight to a request
+        async with admission.admit("transcribe", "a"):
+            pass
+        gate.set()
+        await asyncio.gather(*jobs)
+        return busy
+
+    busy = asyncio.run(scenario())
+    assert busy["background_active"] == 1
+    assert busy["background_queued"] == 2
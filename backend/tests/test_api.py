@@ -0,0 +1,79 @@
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from conftest import requires_ffmpeg
+
+import main
+
+# A deadlocked request would hang the whole run; give up on it instead
+REQUEST_TIMEOUT = 60
+
+@pytest.fixture
+def client():
+    # Entering the client runs the startup handlers (e.g. attaching the FFmpeg scheduler to the loop)
+    with TestClient(main.app) as client:
+        yield client
+
+def post_with_timeout(client, url, **kwargs):
+    outcome = {}
+
+    def run():
+        try:
+            outcome["response"] = client.post(url, **kwargs)
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(REQUEST_TIMEOUT)
+    if thread.is_alive():
+        pytest.fail(f"POST {url} did not finish within {REQUEST_TIMEOUT}s")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["response"]
+
+def upload(video_path):
+    return {"video": ("tone.mkv", open(video_path, "rb"), "video/x-matroska")}
+
+def test_transcribe_needs_input(client):
+    response = client.post("/api/transcribe", data={"language": "en"})
+    assert response.status_code == 400
+
+@requires_ffmpeg
+def test_transcribe_dummy_backend(client, monkeypatch, tone_video):
+    monkeypatch.setattr(main, "get_whisper_model", lambda: "dummy_transcription")
+    response = post_with_timeout(client, "/api/transcribe", files=upload(tone_video), data={"language": "en"})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert [segment["text"] for segment in body["segments"]] == [
+        "This is a test transcription.",
+        "The audio file was successfully processed and would contain speech here."
+    ]
+    assert body["waveform_id"]
+
+@requires_ffmpeg
+def test_transcribe_remote_backend_encodes_off_the_loop(client, monkeypatch, tone_video):
+    # Remote backends get their audio re-encoded through the FFmpeg scheduler from a
+    # worker thread; run on the event loop that wait deadlocked the request
+    parts = []
+
+    def fake_openai(audio_path, language):
+        parts.append(audio_path)
+        return {"text": "tone", "language": language, "segments": [{"start": 0.5, "end": 1.5, "text": " tone "}]}
+
+    monkeypatch.setattr(main, "get_whisper_model", lambda: "openai_api")
+    monkeypatch.setattr(main, "transcribe_with_openai_api", fake_openai)
+    monkeypatch.setattr(main, "STT_AUDIO_COMPRESSION", True)
+
+    response = post_with_timeout(client, "/api/transcribe", files=upload(tone_video), data={"language": "de"})
+    assert response.status_code == 200, response.text
+    assert len(parts) == 1 and parts[0].endswith(".ogg")
+    body = response.json()
+    assert body["segments"] == [{"start": 0.5, "end": 1.5, "text": "tone"}]
+    assert body["language"] == "de"
+
+def test_translate_rejects_mismatched_timings(client):
+    request = {"subtitles": ["a", "b"], "source_language": "en", "target_language": "de"}
+    assert client.post("/api/translate", json={**request, "timings": [[0, 1]]}).status_code == 422
+    assert client.post("/api/translate", json={**request, "timings": [[0, 1], [3, 2]]}).status_code == 422
+    assert client.post("/api/translate", json={**request, "timings": [[0, 1, 2], [3, 4]]}).status_code == 422
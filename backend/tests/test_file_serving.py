@@ -0,0 +1,65 @@
+import os
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from services.file_serving import MediaFileResponse, media_type_for
+
+CONTENT = bytes(range(256)) * 40
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(CONTENT)
+    app = FastAPI()
+
+    @app.api_route("/file", methods=["GET", "HEAD"])
+    def serve():
+        return MediaFileResponse(str(path), filename="clip.mp4")
+
+    return TestClient(app)
+
+def test_full_response_validators(client):
+    response = client.get("/file")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["content-type"] == "video/mp4"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"] and response.headers["last-modified"]
+
+def test_not_modified(client):
+    first = client.get("/file")
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+
+    for headers in ({"If-None-Match": etag}, {"If-None-Match": f'W/{etag}, "other"'}, {"If-Modified-Since": last_modified}):
+        response = client.get("/file", headers=headers)
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    # If-None-Match wins over If-Modified-Since
+    response = client.get("/file", headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified})
+    assert response.status_code == 200
+
+def test_range(client):
+    response = client.get("/file", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(CONTENT)}"
+
+    suffix = client.get("/file", headers={"Range": "bytes=-10"})
+    assert suffix.status_code == 206
+    assert suffix.content == CONTENT[-10:]
+
+def test_invalid_range_serves_whole_file(client):
+    response = client.get("/file", headers={"Range": "bytes=5-2"})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+def test_unsatisfiable_range(client):
+    response = client.get("/file", headers={"Range": f"bytes={len(CONTENT) + 10}-"})
+    assert response.status_code == 416
+
+def test_media_types():
+    assert media_type_for("a.m3u8") == "application/vnd.apple.mpegurl"
+    assert media_type_for("A.SRT") == "application/x-subrip"
+    assert media_type_for("noext") == "application/octet-stream"
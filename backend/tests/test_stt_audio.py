@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from services.stt_audio import AudioPart, SpeechAudioEncoder, split_points, PROFILES
+from conftest import write_wav, requires_ffmpeg
+
+RATE = 16000
+
+def speech_with_pauses(seconds, pauses):
+    """Noise with silent gaps centred on the given times"""
+    samples = (np.random.default_rng(0).standard_normal(seconds * RATE) * 8000).astype(np.int16)
+    for pause in pauses:
+        samples[int((pause - 0.2) * RATE):int((pause + 0.2) * RATE)] = 0
+    return samples
+
+def test_split_points_land_in_pauses():
+    samples = speech_with_pauses(130, [52.0, 101.0])
+    points = split_points(samples, RATE, 55.0)
+    assert len(points) == 2
+    assert points[0] == pytest.approx(52.0, abs=0.2)
+    assert points[1] == pytest.approx(101.0, abs=0.2)
+    assert all(b - a <= 55.0 for a, b in zip([0.0] + points, points + [130.0]))
+
+def test_split_points_respect_limit_without_pauses():
+    samples = speech_with_pauses(100, [])
+    points = split_points(samples, RATE, 30.0)
+    bounds = [0.0] + points + [100.0]
+    assert all(0 < b - a <= 30.0 for a, b in zip(bounds, bounds[1:]))
+
+def test_no_split_when_short():
+    assert split_points(np.zeros(10 * RATE, dtype=np.int16), RATE, 55.0) == []
+
+def test_merge_shifts_segments_onto_timeline():
+    parts = [AudioPart("a", 0.0, 50.0), AudioPart("b", 50.0, 40.0)]
+    results = [
+        {"text": "first ", "language": "de", "segments": [{"start": 1.0, "end": 2.0, "text": "first"}]},
+        {"text": "second", "segments": [{"start": 0.5, "end": 45.0, "text": "second"}]},
+    ]
+    merged = SpeechAudioEncoder.merge(parts, results, "en")
+    assert merged["text"] == "first second"
+    assert merged["language"] == "de"
+    assert merged["duration"] == 90.0
+    # The second segment is clipped to its part
+    assert [(s["start"], s["end"]) for s in merged["segments"]] == [(1.0, 2.0), (50.5, 90.0)]
+
+def test_merge_untimed_segments_cover_their_part():
+    parts = [AudioPart("a", 0.0, 50.0), AudioPart("b", 50.0, 10.0)]
+    results = [{"text": "x", "segments": [{"start": 0, "end": 0, "text": "x"}]}, {"text": "y", "segments": [{"start": 0, "end": 0, "text": "y"}]}]
+    merged = SpeechAudioEncoder.merge(parts, results, "en")
+    assert [(s["start"], s["end"]) for s in merged["segments"]] == [(0.0, 50.0), (50.0, 60.0)]
+
+@requires_ffmpeg
+def test_encode_splits_within_profile_limits(tmp_path):
+    wav_path = write_wav(str(tmp_path / "speech.wav"), speech_with_pauses(130, [52.0, 101.0]))
+    output_dir = tmp_path / "parts"
+    output_dir.mkdir()
+    encoder = SpeechAudioEncoder(work_dir=str(tmp_path))
+
+    parts = encoder.encode(wav_path, "google_speech_api", str(output_dir))
+    profile = PROFILES["google_speech_api"]
+    assert len(parts) == 3
+    assert all(part.duration <= profile.max_seconds for part in parts)
+    assert sum(part.duration for part in parts) == pytest.approx(130.0)
+    assert all(part.path.endswith(".flac") for part in parts)
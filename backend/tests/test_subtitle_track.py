@@ -0,0 +1,62 @@
+import pytest
+from models.subtitle_track import SubtitleTrack
+
+CUES = [
+    (0.0, 1.5, "Hello there."),
+    (1.75, 4.2, "Two lines\nof text"),
+    (3725.005, 3727.99, "After an hour"),
+]
+
+def make_track():
+    return SubtitleTrack([c[0] for c in CUES], [c[1] for c in CUES], [c[2] for c in CUES])
+
+@pytest.mark.parametrize("fmt", ["srt", "vtt", "ass"])
+def test_round_trip(fmt):
+    content = make_track().serialize(fmt)
+    parsed = SubtitleTrack.parse(content)
+
+    # ASS keeps centiseconds, SRT and WebVTT milliseconds
+    tolerance = 0.01 if fmt == "ass" else 0.001
+    assert SubtitleTrack.detect_format(content) == fmt
+    assert parsed.texts == [c[2] for c in CUES]
+    assert parsed.starts.tolist() == pytest.approx([c[0] for c in CUES], abs=tolerance)
+    assert parsed.ends.tolist() == pytest.approx([c[1] for c in CUES], abs=tolerance)
+
+def test_srt_output():
+    assert make_track().to_srt().startswith("1\n00:00:00,000 --> 00:00:01,500\nHello there.\n\n2\n")
+
+def test_parse_srt_with_bom_crlf_and_short_fractions():
+    content = "﻿1\r\n00:00:01,5 --> 00:00:02,05\r\nFirst\r\n\r\n2\r\n00:00:03,000 --> 00:00:04,000\r\nSecond\r\n"
+    track = SubtitleTrack.from_srt(content)
+    assert track.texts == ["First", "Second"]
+    assert track.starts.tolist() == [1.5, 3.0]
+    assert track.ends.tolist() == [2.05, 4.0]
+
+def test_parse_vtt_without_hours():
+    track = SubtitleTrack.from_vtt("WEBVTT\n\nintro\n01:02.500 --> 01:04.000 align:start\nHi\n")
+    assert track.starts.tolist() == [62.5]
+    assert track.ends.tolist() == [64.0]
+    assert track.texts == ["Hi"]
+
+def test_parse_ass_sorts_dialogue_and_strips_overrides():
+    content = make_track().to_ass()
+    lines = content.rstrip("\n").split("\n")
+    # Dialogue lines may come in any order
+    content = "\n".join(lines[:-3] + [lines[-1], lines[-3], lines[-2]]).replace("Hello there.", "{\\b1}Hello there.")
+    track = SubtitleTrack.from_ass(content)
+    assert track.texts == [c[2] for c in CUES]
+    assert track.starts.tolist() == sorted(track.starts.tolist())
+
+def test_dicts_round_trip():
+    track = make_track()
+    again = SubtitleTrack.from_dicts(track.to_dicts())
+    assert again.texts == track.texts
+    assert again.starts.tolist() == track.starts.tolist()
+    assert track.to_dicts()[0]["id"] == "1"
+
+def test_empty_and_mismatched():
+    assert len(SubtitleTrack.parse("")) == 0
+    with pytest.raises(ValueError):
+        SubtitleTrack([0.0], [1.0, 2.0], ["x"])
+    with pytest.raises(ValueError):
+        make_track().serialize("sub")
@@ -0,0 +1,39 @@
+from services.translation import group_sentences, split_translation, MAX_UNIT_CUES
+
+def test_group_sentences_on_punctuation():
+    texts = ["This is", "one sentence.", "Another!", "And a", "trailing one"]
+    assert group_sentences(texts) == [[0, 1], [2], [3, 4]]
+
+def test_group_sentences_on_pause():
+    texts = ["no punctuation", "after a long pause"]
+    assert group_sentences(texts, [[0.0, 1.0], [1.2, 2.0]]) == [[0, 1]]
+    assert group_sentences(texts, [[0.0, 1.0], [5.0, 6.0]]) == [[0], [1]]
+
+def test_group_sentences_caps_unit_length():
+    units = group_sentences(["word"] * (MAX_UNIT_CUES + 2))
+    assert [len(unit) for unit in units] == [MAX_UNIT_CUES, 2]
+
+def test_group_sentences_empty_cue_ends_unit():
+    assert group_sentences(["a", "", "b."]) == [[0, 1], [2]]
+
+def test_split_translation_proportional():
+    parts = split_translation("one two three four five six", [1, 1, 1])
+    assert parts == ["one two", "three four", "five six"]
+
+def test_split_translation_keeps_words_whole():
+    text = "internationalization is hard"
+    parts = split_translation(text, [3, 1])
+    assert " ".join(parts) == text
+    assert all(part for part in parts)
+
+def test_split_translation_unspaced_script():
+    parts = split_translation("今日はいい天気ですね", [1, 1])
+    assert "".join(parts) == "今日はいい天気ですね"
+    assert all(part for part in parts)
+
+def test_split_translation_fewer_words_than_parts():
+    assert split_translation("hello", [1, 1, 1]) == ["hello", "", ""]
+
+def test_split_translation_single_part_and_zero_weights():
+    assert split_translation("as is", [5]) == ["as is"]
+    assert split_translation("a b", [0, 0]) == ["a", "b"]
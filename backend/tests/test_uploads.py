@@ -0,0 +1,99 @@
+import os
+import asyncio
+import hashlib
+import pytest
+from services.state import SQLiteStateBackend
+from services.uploads import ChunkedUploads, UploadError, MIN_CHUNK_SIZE
+
+CHUNK = MIN_CHUNK_SIZE
+
+@pytest.fixture
+def uploads(tmp_path):
+    return ChunkedUploads(SQLiteStateBackend(str(tmp_path / "state.db")), root=str(tmp_path / "chunked"))
+
+def send(uploads, upload_id, offset, data, sha256=None):
+    async def body():
+        # Arrives in pieces, like a request stream
+        for start in range(0, len(data), 65536):
+            yield data[start:start + 65536]
+    return asyncio.run(uploads.write_chunk(upload_id, offset, body(), sha256 or hashlib.sha256(data).hexdigest()))
+
+def test_chunks_in_any_order_then_finalize(uploads):
+    data = os.urandom(CHUNK * 2 + 1000)
+    status = uploads.create("movie.mp4", len(data), CHUNK)
+    upload_id = status["upload_id"]
+    assert status["chunk_count"] == 3
+    assert status["missing_offsets"] == [0, CHUNK, CHUNK * 2]
+
+    send(uploads, upload_id, CHUNK * 2, data[CHUNK * 2:])
+    status = send(uploads, upload_id, 0, data[:CHUNK])
+    assert status["missing_offsets"] == [CHUNK]
+    assert status["received_bytes"] == CHUNK + 1000
+
+    with pytest.raises(UploadError) as missing:
+        uploads.finalize(upload_id)
+    assert missing.value.status_code == 409
+
+    send(uploads, upload_id, CHUNK, data[CHUNK:CHUNK * 2])
+    status = uploads.finalize(upload_id, hashlib.sha256(data).hexdigest())
+    assert status["complete"] and status["received_bytes"] == len(data)
+
+    path = uploads.path_for(upload_id)
+    assert os.path.basename(path) == "movie.mp4"
+    with open(path, "rb") as f:
+        assert f.read() == data
+    # Finalizing again is a no-op
+    assert uploads.finalize(upload_id)["complete"]
+
+@pytest.mark.parametrize("filename", ["chunks", "finalize.lock", "data.part"])
+def test_filename_never_clashes_with_bookkeeping(uploads, filename):
+    data = b"x" * 100
+    upload_id = uploads.create(filename, len(data), CHUNK)["upload_id"]
+    send(uploads, upload_id, 0, data)
+    uploads.finalize(upload_id)
+    with open(uploads.path_for(upload_id), "rb") as f:
+        assert f.read() == data
+
+def test_bad_chunks_rejected(uploads):
+    data = os.urandom(CHUNK + 10)
+    upload_id = uploads.create("a.bin", len(data), CHUNK)["upload_id"]
+
+    cases = [
+        (1, data[:CHUNK], None, 400),                          # not on a chunk boundary
+        (0, data[:CHUNK - 1], None, 400),                      # short chunk
+        (0, data[:CHUNK], "0" * 64, 422),                      # checksum mismatch
+        (CHUNK, data[CHUNK:] + b"extra", None, 400),           # long last chunk
+    ]
+    for offset, chunk, sha256, status_code in cases:
+        with pytest.raises(UploadError) as rejected:
+            send(uploads, upload_id, offset, chunk, sha256)
+        assert rejected.value.status_code == status_code
+    # None of them counted as received
+    assert uploads.status(upload_id)["received_bytes"] == 0
+
+def test_whole_file_checksum_checked(uploads):
+    data = b"abc" * 1000
+    upload_id = uploads.create("a.bin", len(data), CHUNK)["upload_id"]
+    send(uploads, upload_id, 0, data)
+    with pytest.raises(UploadError) as rejected:
+        uploads.finalize(upload_id, "0" * 64)
+    assert rejected.value.status_code == 422
+    assert not uploads.status(upload_id)["complete"]
+
+def test_late_and_unknown_uploads(uploads):
+    data = b"abc"
+    upload_id = uploads.create("a.bin", len(data), CHUNK)["upload_id"]
+    send(uploads, upload_id, 0, data)
+    uploads.finalize(upload_id)
+
+    with pytest.raises(UploadError) as late:
+        send(uploads, upload_id, 0, data)
+    assert late.value.status_code == 409
+    with pytest.raises(UploadError) as unknown:
+        uploads.status("missing")
+    assert unknown.value.status_code == 404
+
+def test_create_size_limits(uploads):
+    with pytest.raises(UploadError) as empty:
+        uploads.create("a.bin", 0)
+    assert empty.value.status_code == 400
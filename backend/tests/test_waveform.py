@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from services import waveform
+from conftest import write_wav
+
+@pytest.fixture
+def peaks_file(tmp_path):
+    # 10 seconds at 16 kHz: silence for the first half, a full-scale square wave after
+    samples = np.zeros(160000, dtype=np.int16)
+    samples[80000:] = np.where(np.arange(80000) % 32 < 16, 32767, -32768)
+    wav_path = write_wav(str(tmp_path / "audio.wav"), samples)
+    peaks_path = str(tmp_path / "audio.peaks")
+    info = waveform.write_peaks(wav_path, peaks_path)
+    return peaks_path, info
+
+def test_write_peaks_header(peaks_file):
+    peaks_path, info = peaks_file
+    assert info["sample_rate"] == 16000
+    assert info["duration"] == pytest.approx(10.0)
+    assert info["levels"][0] == waveform.BASE_SAMPLES_PER_PEAK
+    assert all(b == a * 2 for a, b in zip(info["levels"], info["levels"][1:]))
+
+    with open(peaks_path, "rb") as f:
+        sample_rate, levels = waveform.read_levels(f)
+    assert sample_rate == 16000
+    assert [level[0] for level in levels] == info["levels"]
+
+def test_read_range_picks_level_for_pixels(peaks_file):
+    peaks_path, _ = peaks_file
+    full = waveform.read_range(peaks_path, 0, None, 100)
+    # Coarsest level that still gives at least 100 peaks over 10 s
+    assert full["peak_count"] >= 100
+    assert full["peak_count"] < 200 or full["samples_per_peak"] == waveform.BASE_SAMPLES_PER_PEAK
+    assert len(full["data"]) == full["peak_count"] * 2
+
+    zoomed = waveform.read_range(peaks_path, 2.0, 3.0, 100)
+    assert zoomed["samples_per_peak"] < full["samples_per_peak"]
+    assert zoomed["start_peak"] == 2 * 16000 // zoomed["samples_per_peak"]
+
+def test_read_range_values(peaks_file):
+    peaks_path, _ = peaks_file
+    quiet = np.frombuffer(waveform.read_range(peaks_path, 1.0, 4.0, 50)["data"], dtype=np.int8)
+    loud = np.frombuffer(waveform.read_range(peaks_path, 6.0, 9.0, 50)["data"], dtype=np.int8)
+    assert not quiet.any()
+    # (min, max) pairs
+    assert loud[0::2].max() < -100 and loud[1::2].min() > 100
+
+def test_read_range_clamps_to_duration(peaks_file):
+    peaks_path, _ = peaks_file
+    past_end = waveform.read_range(peaks_path, 20.0, 30.0, 100)
+    assert past_end["peak_count"] == 0
+    assert past_end["data"] == b""
+
+def test_read_levels_rejects_other_files(tmp_path):
+    path = tmp_path / "bogus"
+    path.write_bytes(b"RIFF" + bytes(32))
+    with open(path, "rb") as f, pytest.raises(ValueError):
+        waveform.read_levels(f)
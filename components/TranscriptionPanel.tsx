@@ -197,6 +197,7 @@ export default function TranscriptionPanel() {
         },
         body: JSON.stringify({
           subtitles: originalSubtitles.map(sub => sub.text),
+          timings: originalSubtitles.map(sub => [sub.startTime, sub.endTime]),
           source_language: originalLanguage,
           target_language: targetLang
         }),
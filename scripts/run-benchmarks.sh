@@ -0,0 +1,31 @@
+#!/bin/bash
+
+echo "📊 Running pipeline benchmarks..."
+
+if ! command -v ffmpeg > /dev/null; then
+    echo "❌ FFmpeg is required to generate the synthetic benchmark media"
+    exit 1
+fi
+
+if ! python3 -c "import httpx" 2> /dev/null; then
+    echo "❌ httpx is required; install backend/requirements-dev.txt"
+    exit 1
+fi
+
+cd backend
+
+echo "🚀 Checking cold start against its budget..."
+if ! python3 -m benchmarks.cold_start; then
+    echo "❌ Cold start exceeds its time, memory or heavy-import budget"
+    exit 1
+fi
+
+# First run on a machine: record the baseline the later runs compare against
+if [ ! -f benchmarks/baseline.json ]; then
+    echo "📝 No baseline yet, recording one..."
+    python3 -m benchmarks.pipeline --update-baseline
+    exit $?
+fi
+
+# Pass extra flags through, e.g. --update-baseline or --cases srt,extract_audio
+python3 -m benchmarks.pipeline "$@"